@@ -58,4 +58,20 @@ class BannerAdmin(admin.ModelAdmin):
 class FlashSaleAdmin(admin.ModelAdmin):
     list_display = ('sku', 'discounted_price', 'is_active', 'start_time', 'end_time', 'percentage_sold')
     # Ye line add karein:
-    list_editable = ('is_active', 'end_time')
\ No newline at end of file
+    list_editable = ('is_active', 'end_time')
+
+
+from .models import PriceBook, PriceBookEntry
+
+
+class PriceBookEntryInline(admin.TabularInline):
+    model = PriceBookEntry
+    raw_id_fields = ('sku',)
+    extra = 0
+
+
+@admin.register(PriceBook)
+class PriceBookAdmin(admin.ModelAdmin):
+    list_display = ('name', 'warehouse', 'priority', 'starts_at', 'ends_at', 'is_active')
+    list_filter = ('is_active', 'warehouse')
+    inlines = [PriceBookEntryInline]
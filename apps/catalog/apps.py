@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class CatalogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.catalog'
+
+    def ready(self):
+        # Home feed invalidation only (marks blobs dirty, no business logic)
+        import apps.catalog.receivers
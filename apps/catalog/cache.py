@@ -0,0 +1,99 @@
+"""
+Versioned response cache for the public catalog endpoints.
+
+One global counter (catalog:version) is bumped after any catalog write
+(receivers.py). Each rendered response is cached under
+(version, endpoint, lookup, query string) with a strong ETag, which is a
+hash of the body. A bump simply orphans the old entries until their TTL
+runs out, so no key scanning or invalidation lists are needed.
+
+Hit path: version GET + entry GET, then the stored bytes or a 304.
+No ORM query and no serializer run.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "catalog:version"
+
+
+class CatalogCache:
+
+    @staticmethod
+    def version():
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, 1, timeout=None)
+            version = cache.get(VERSION_KEY, 1)
+        return version
+
+    @staticmethod
+    def bump():
+        """
+        Safe inside a transaction: bumps after commit so a reader can't cache
+        pre-commit data under the new version.
+        """
+        def _bump():
+            try:
+                cache.add(VERSION_KEY, 1, timeout=None)
+                cache.incr(VERSION_KEY)
+            except Exception as e:
+                logger.warning(f"Catalog version bump failed: {e}")
+        transaction.on_commit(_bump)
+
+    @staticmethod
+    def key(request, scope):
+        query = request.META.get('QUERY_STRING', '')
+        digest = hashlib.sha1("&".join(sorted(query.split("&"))).encode()).hexdigest()[:16]
+        return f"catalog:resp:{CatalogCache.version()}:{scope}:{digest}"
+
+
+class VersionedCacheMixin:
+    """
+    For public read-only catalog viewsets. list/retrieve are served from
+    CatalogCache with ETag / If-None-Match support.
+    """
+    # Token claims only (no user row fetch): per-user throttling still works, Postgres isn't touched
+    authentication_classes = [JWTStatelessUserAuthentication]
+
+    def _headers(self, response, etag):
+        response['ETag'] = etag
+        response['Cache-Control'] = f"public, max-age={getattr(settings, 'CATALOG_CACHE_MAX_AGE', 60)}"
+        return response
+
+    def cache_scope(self, name):
+        """
+        Override to partition entries further (e.g. by time window for time-bound listings).
+        """
+        return f"{self.basename}:{name}"
+
+    def cached(self, request, scope, produce):
+        key = CatalogCache.key(request, scope)
+        entry = cache.get(key)
+        if entry is None:
+            response = produce()
+            if response.status_code != 200:
+                return response
+            body = JSONRenderer().render(response.data)
+            entry = (f'"{hashlib.sha256(body).hexdigest()[:32]}"', body)
+            cache.set(key, entry, timeout=getattr(settings, 'CATALOG_CACHE_TTL', 3600))
+
+        etag, body = entry
+        if etag in [t.strip() for t in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+            return self._headers(HttpResponseNotModified(), etag)
+        return self._headers(HttpResponse(body, content_type='application/json'), etag)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(request, self.cache_scope("list"), lambda: super(VersionedCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        return self.cached(request, self.cache_scope(lookup), lambda: super(VersionedCacheMixin, self).retrieve(request, *args, **kwargs))
@@ -0,0 +1,208 @@
+"""
+Flash-sale counters.
+
+Sale traffic lands on a handful of FlashSale rows, so the hot path never
+writes them. All of these live in Redis:
+    flash:{id}:remaining      units left (primed from the DB on first use)
+    flash:{id}:user:{uid}     units this user has bought (max_per_user)
+    flash:{id}:pending        units sold but not yet written to sold_quantity
+    flash:order:{order_id}    {sale_id: qty} so a cancellation can give units back
+One Lua script checks and takes stock and the per-user quota atomically.
+
+flush_flash_sales_task folds the pending counters into sold_quantity with
+one UPDATE per sale. It also retires sales past end_time.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from apps.utils.exceptions import BusinessLogicException
+from .models import FlashSale
+
+logger = logging.getLogger(__name__)
+
+REMAINING = "flash:{}:remaining"
+USER = "flash:{}:user:{}"
+PENDING = "flash:{}:pending"
+ORDER = "flash:order:{}"
+DIRTY_SET = "flash:dirty"
+
+KEY_GRACE_SECONDS = 3600  # counters outlive end_time so late cancels can still release
+
+RESERVE_SCRIPT = """
+local remaining = tonumber(redis.call('GET', KEYS[1]) or '-1')
+if remaining < 0 then return -1 end
+local qty = tonumber(ARGV[1])
+if remaining < qty then return -2 end
+local bought = tonumber(redis.call('GET', KEYS[2]) or '0')
+if bought + qty > tonumber(ARGV[2]) then return -3 end
+redis.call('DECRBY', KEYS[1], qty)
+redis.call('INCRBY', KEYS[2], qty)
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('INCRBY', KEYS[3], qty)
+redis.call('HINCRBY', KEYS[4], ARGV[4], qty)
+redis.call('EXPIRE', KEYS[4], ARGV[3])
+redis.call('SADD', KEYS[5], ARGV[4])
+return remaining - qty
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+redis.call('DECRBY', KEYS[2], ARGV[1])
+redis.call('DECRBY', KEYS[3], ARGV[1])
+redis.call('SADD', KEYS[4], ARGV[2])
+return 1
+"""
+
+# Read-and-subtract, so units sold while the DB write runs stay pending
+TAKE_PENDING_SCRIPT = """
+local v = tonumber(redis.call('GET', KEYS[1]) or '0')
+if v ~= 0 then redis.call('DECRBY', KEYS[1], v) end
+return v
+"""
+
+
+class FlashSaleEngine:
+    _scripts = {}
+
+    @staticmethod
+    def _conn():
+        return get_redis_connection("default")
+
+    @classmethod
+    def _script(cls, name, source):
+        if name not in cls._scripts:
+            cls._scripts[name] = cls._conn().register_script(source)
+        return cls._scripts[name]
+
+    @staticmethod
+    def _ttl(sale):
+        return max(60, int((sale.end_time - timezone.now()).total_seconds()) + KEY_GRACE_SECONDS)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    @staticmethod
+    def live_queryset(now=None):
+        now = now or timezone.now()
+        return FlashSale.objects.filter(
+            is_active=True, start_time__lte=now, end_time__gt=now, sold_quantity__lt=F('total_quantity')
+        )
+
+    # ------------------------------------------------------------------
+    # Hot path
+    # ------------------------------------------------------------------
+    @staticmethod
+    def prime(sale):
+        """
+        Seeds the remaining counter from the DB if it isn't there yet (NX: never overwrites live counts).
+        """
+        remaining = max(0, sale.total_quantity - sale.sold_quantity)
+        FlashSaleEngine._conn().set(REMAINING.format(sale.id), remaining, ex=FlashSaleEngine._ttl(sale), nx=True)
+
+    @staticmethod
+    def reserve(sale, user_id, qty, order_id, name=None):
+        """
+        Takes `qty` units of the sale for this user/order, or raises.
+        `sale` is a FlashSale or a pricing.LiveSale. Returns the units left.
+        """
+        script = FlashSaleEngine._script('reserve', RESERVE_SCRIPT)
+        keys = [
+            REMAINING.format(sale.id), USER.format(sale.id, user_id), PENDING.format(sale.id),
+            ORDER.format(order_id), DIRTY_SET,
+        ]
+        args = [qty, sale.max_per_user, FlashSaleEngine._ttl(sale), sale.id]
+
+        result = script(keys=keys, args=args)
+        if result == -1:
+            FlashSaleEngine.prime(FlashSale.objects.get(pk=sale.id))
+            result = script(keys=keys, args=args)
+
+        if result in (-2, -3):
+            name = name or sale.sku.name
+        if result == -2:
+            raise BusinessLogicException(f"The flash sale on {name} is sold out.")
+        if result == -3:
+            raise BusinessLogicException(f"Flash sale limit is {sale.max_per_user} per customer for {name}.")
+        if result < 0:
+            raise BusinessLogicException("Flash sale is unavailable right now, please retry.")
+
+        if result == 0:
+            # Sold out: drop it from the cached listings/home feed after commit
+            FlashSaleEngine._listings_changed()
+        return result
+
+    @staticmethod
+    def release_order(order_id, user_id):
+        """
+        Gives back every flash-sale unit held by an order (cancel / failed create).
+        """
+        conn = FlashSaleEngine._conn()
+        held = conn.hgetall(ORDER.format(order_id))
+        if not held:
+            return
+        script = FlashSaleEngine._script('release', RELEASE_SCRIPT)
+        for sale_id, qty in held.items():
+            sale_id, qty = int(sale_id), int(qty)
+            script(
+                keys=[REMAINING.format(sale_id), USER.format(sale_id, user_id), PENDING.format(sale_id), DIRTY_SET],
+                args=[qty, sale_id],
+            )
+        conn.delete(ORDER.format(order_id))
+
+    @staticmethod
+    def _listings_changed():
+        from .cache import CatalogCache
+        from .home_feed import HomeFeed
+        from .pricing import PricingEngine
+        CatalogCache.bump()
+        PricingEngine.bump()
+        HomeFeed.mark_dirty(("flash_sales",))
+
+    # ------------------------------------------------------------------
+    # Write-back / expiry (beat)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def flush():
+        """
+        Folds pending Redis sales into FlashSale.sold_quantity. Returns units written.
+        """
+        conn = FlashSaleEngine._conn()
+        take = FlashSaleEngine._script('take', TAKE_PENDING_SCRIPT)
+        written = 0
+        for raw_id in conn.smembers(DIRTY_SET):
+            # SREM before reading: a sale racing in re-adds itself for the next run
+            conn.srem(DIRTY_SET, raw_id)
+            sale_id = int(raw_id)
+            delta = int(take(keys=[PENDING.format(sale_id)]))
+            if not delta:
+                continue
+            try:
+                FlashSale.objects.filter(pk=sale_id).update(sold_quantity=F('sold_quantity') + delta)
+                written += delta
+            except Exception as e:
+                # Put it back; nothing is lost
+                conn.incrby(PENDING.format(sale_id), delta)
+                conn.sadd(DIRTY_SET, sale_id)
+                logger.error(f"Flash sale {sale_id} write-back failed: {e}")
+        return written
+
+    @staticmethod
+    def expire():
+        """
+        Deactivates sales past end_time (after a final flush) and drops their stock counters.
+        """
+        ended = list(FlashSale.objects.filter(is_active=True, end_time__lte=timezone.now()).values_list('id', flat=True))
+        if not ended:
+            return 0
+        FlashSaleEngine.flush()
+        with transaction.atomic():
+            FlashSale.objects.filter(pk__in=ended).update(is_active=False)
+            FlashSaleEngine._listings_changed()
+        FlashSaleEngine._conn().delete(*[REMAINING.format(pk) for pk in ended])
+        return len(ended)
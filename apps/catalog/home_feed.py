@@ -0,0 +1,284 @@
+"""
+Precomputed home feed.
+
+Each section is built once, serialized to JSON and stored in Redis:
+    home_feed:global:{section}      banners, categories (same for everyone)
+    home_feed:{warehouse}:{section} flash_sales, featured (in stock there only)
+
+A home screen request is one MGET. The raw section blobs are spliced into
+the response body without decoding, and only a small per-user section is
+merged in.
+
+Writes never rebuild inline. Catalog saves (receivers.py) and stock
+crossings (InventoryService) add "warehouse:section" tokens to a dirty set.
+A debounced task then rebuilds just those blobs, so a burst of edits costs
+one rebuild.
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from .models import Banner, Category, FlashSale, SKU
+from .serializers import CARD_FIELDS, ProductCardSerializer
+from .images import srcset
+
+logger = logging.getLogger(__name__)
+
+KEY = "home_feed:{}:{}"
+DIRTY_SET = "home_feed:dirty"
+GLOBAL = "global"
+ALL_WAREHOUSES = "*"
+
+GLOBAL_SECTIONS = ("banners", "categories")
+WAREHOUSE_SECTIONS = ("flash_sales", "featured")
+SECTION_ORDER = ("banners", "flash_sales", "categories", "featured")
+
+
+def in_stock_sku_ids(warehouse_id):
+    """
+    Subquery of SKU ids with sellable stock at a warehouse.
+    """
+    from apps.inventory.models import InventoryStock
+    return InventoryStock.objects.filter(
+        warehouse_id=warehouse_id, quantity__gt=F('reserved_quantity')
+    ).values('product_id')
+
+
+def _dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":"))
+
+
+class HomeFeed:
+
+    @staticmethod
+    def _conn():
+        return get_redis_connection("default")
+
+    @staticmethod
+    def ttl_seconds():
+        # Safety net only; freshness comes from the dirty-set rebuilds
+        return getattr(settings, 'HOME_FEED_TTL_SECONDS', 3600)
+
+    # ------------------------------------------------------------------
+    # Section builders
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _build_banners(warehouse_id=None):
+        items = list(Banner.objects.filter(is_active=True).order_by('sort_order').values(
+            'title', 'image_url', 'target_url', 'position', 'bg_gradient'
+        ))
+        return {"type": "banners", "items": items}, None
+
+    @staticmethod
+    def _build_categories(warehouse_id=None):
+        items = list(Category.objects.filter(is_active=True, parent__isnull=True).values(
+            'id', 'name', 'slug', 'icon_url'
+        ))
+        return {"type": "categories", "items": items}, None
+
+    @staticmethod
+    def _build_flash_sales(warehouse_id):
+        now = timezone.now()
+        sales = list(
+            FlashSale.objects.filter(
+                is_active=True, end_time__gt=now, sold_quantity__lt=F('total_quantity'),
+                sku__is_active=True, sku_id__in=in_stock_sku_ids(warehouse_id),
+            ).values(
+                'id', 'sku_id', 'sku__name', 'sku__image_url', 'sku__image_variants', 'sku__sale_price',
+                'discounted_price', 'start_time', 'end_time'
+            )
+        )
+        live = [s for s in sales if s['start_time'] <= now]
+        if live:
+            # sold_quantity lags the Redis counters by up to a flush; drop sales already sold out there
+            from .flash_sales import REMAINING
+            remaining = get_redis_connection("default").mget([REMAINING.format(s['id']) for s in live])
+            live = [s for s, left in zip(live, remaining) if left != b"0"]
+        items = [{
+            "sku_id": s['sku_id'],
+            "sku_name": s['sku__name'],
+            "sku_image": s['sku__image_url'],
+            "sku_images": srcset(s['sku__image_variants']),
+            "mrp": s['sku__sale_price'],
+            "discounted_price": s['discounted_price'],
+            "end_time": s['end_time'],
+        } for s in sorted(live, key=lambda s: s['end_time'])]
+
+        # Expire the blob at the next start/end so sales appear and vanish on time
+        boundaries = [s['end_time'] for s in live] + [s['start_time'] for s in sales if s['start_time'] > now]
+        expires_in = None
+        if boundaries:
+            expires_in = max(1, int((min(boundaries) - now).total_seconds()))
+        return {"type": "flash_sales", "items": items}, expires_in
+
+    @staticmethod
+    def _build_featured(warehouse_id):
+        limit = getattr(settings, 'HOME_FEED_FEATURED_LIMIT', 20)
+        rows = SKU.objects.filter(
+            is_active=True, is_featured=True, id__in=in_stock_sku_ids(warehouse_id)
+        ).order_by('-created_at').values(*CARD_FIELDS)[:limit]
+        return {"type": "featured", "items": ProductCardSerializer(rows, many=True).data}, None
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+    @staticmethod
+    def build(section, warehouse_id=None):
+        """
+        Rebuilds and stores one blob. Returns the serialized JSON.
+        """
+        scope = GLOBAL if section in GLOBAL_SECTIONS else str(warehouse_id)
+        payload, expires_in = getattr(HomeFeed, f"_build_{section}")(warehouse_id)
+        blob = _dumps(payload)
+        ttl = min(expires_in or HomeFeed.ttl_seconds(), HomeFeed.ttl_seconds())
+        try:
+            HomeFeed._conn().set(KEY.format(scope, section), blob, ex=ttl)
+        except Exception as e:
+            logger.warning(f"Home feed store failed for {scope}:{section}: {e}")
+        return blob
+
+    @staticmethod
+    def sections(warehouse_id=None):
+        """
+        Ordered list of section blobs (raw JSON strings) for a warehouse.
+        One MGET; anything missing (first request, expired, flushed) is built inline.
+        """
+        wanted = [
+            (s, GLOBAL if s in GLOBAL_SECTIONS else str(warehouse_id))
+            for s in SECTION_ORDER
+            if s in GLOBAL_SECTIONS or warehouse_id
+        ]
+        try:
+            blobs = HomeFeed._conn().mget([KEY.format(scope, s) for s, scope in wanted])
+        except Exception as e:
+            logger.warning(f"Home feed read failed: {e}")
+            blobs = [None] * len(wanted)
+
+        result = []
+        for (section, _), blob in zip(wanted, blobs):
+            if blob is None:
+                blob = HomeFeed.build(section, warehouse_id)
+            result.append(blob.decode() if isinstance(blob, bytes) else blob)
+        return result
+
+    @staticmethod
+    def personal_section(user, limit=10):
+        """
+        "Buy again": the user's most recent distinct products. Cached per user,
+        short TTL; this is the only per-request part of the feed.
+        """
+        from django.core.cache import cache
+        from apps.orders.models import OrderItem
+
+        cache_key = f"home_feed:user:{user.pk}:buy_again"
+        blob = cache.get(cache_key)
+        if blob is None:
+            seen, items = set(), []
+            recent = OrderItem.objects.filter(order__user=user).order_by('-order__created_at').values(
+                'product_id', 'product_name', 'sku_code'
+            )[:limit * 3]
+            for row in recent:
+                if row['product_id'] in seen:
+                    continue
+                seen.add(row['product_id'])
+                items.append(row)
+                if len(items) == limit:
+                    break
+            blob = _dumps({"type": "buy_again", "items": items})
+            cache.set(cache_key, blob, timeout=getattr(settings, 'HOME_FEED_PERSONAL_TTL_SECONDS', 600))
+        return blob
+
+    @staticmethod
+    def render(warehouse_id=None, user=None):
+        """
+        Response body as a JSON string: cached blobs spliced in, not re-encoded.
+        """
+        blobs = HomeFeed.sections(warehouse_id)
+        if user is not None and user.is_authenticated:
+            blobs.insert(1, HomeFeed.personal_section(user))
+        head = _dumps({"warehouse_id": str(warehouse_id) if warehouse_id else None})
+        return f'{head[:-1]},"sections":[{",".join(blobs)}]}}'
+
+    # ------------------------------------------------------------------
+    # Incremental refresh
+    # ------------------------------------------------------------------
+    @staticmethod
+    def mark_dirty(sections, warehouse_ids=None):
+        """
+        Event hook (catalog saves, stock crossings). Safe inside a transaction:
+        the rebuild is scheduled after commit and debounced.
+        `warehouse_ids=None` means every warehouse (for per-warehouse sections).
+        """
+        tokens = []
+        for section in sections:
+            if section in GLOBAL_SECTIONS:
+                tokens.append(f"{GLOBAL}:{section}")
+            else:
+                for wh in (warehouse_ids or [ALL_WAREHOUSES]):
+                    tokens.append(f"{wh}:{section}")
+
+        def _schedule():
+            from django.core.cache import cache
+            from .tasks import rebuild_home_feed_task
+            try:
+                HomeFeed._conn().sadd(DIRTY_SET, *tokens)
+            except Exception as e:
+                logger.warning(f"Home feed dirty mark failed: {e}")
+                return
+            delay = getattr(settings, 'HOME_FEED_REBUILD_DELAY_SECONDS', 5)
+            if cache.add("home_feed:rebuild_scheduled", 1, timeout=delay):
+                try:
+                    rebuild_home_feed_task.apply_async(countdown=delay)
+                except Exception as e:
+                    # Tokens stay in the set; the next event or the TTL catches up
+                    logger.warning(f"Could not enqueue home feed rebuild: {e}")
+
+        transaction.on_commit(_schedule)
+
+    @staticmethod
+    def rebuild_dirty():
+        """
+        Pops every dirty token and rebuilds each blob once. Returns the count.
+        """
+        from apps.warehouse.models import Warehouse
+
+        conn = HomeFeed._conn()
+        pipe = conn.pipeline()
+        pipe.smembers(DIRTY_SET)
+        pipe.delete(DIRTY_SET)
+        raw, _ = pipe.execute()
+
+        todo = set()
+        active = None
+        for token in raw:
+            scope, section = (token.decode() if isinstance(token, bytes) else token).split(":", 1)
+            if scope == ALL_WAREHOUSES:
+                if active is None:
+                    active = [str(pk) for pk in Warehouse.objects.filter(is_active=True).values_list('id', flat=True)]
+                todo.update((wh, section) for wh in active)
+            else:
+                todo.add((None if scope == GLOBAL else scope, section))
+
+        rebuilt = 0
+        for warehouse_id, section in todo:
+            try:
+                HomeFeed.build(section, warehouse_id)
+                rebuilt += 1
+            except Exception as e:
+                logger.error(f"Home feed rebuild failed for {warehouse_id}:{section}: {e}")
+                HomeFeed.mark_dirty([section], [warehouse_id] if warehouse_id else None)
+        return rebuilt
+
+
+def stock_crossed(warehouse_id, before_available, after_available):
+    """
+    InventoryService hook: only in-stock <-> out-of-stock flips change the feed.
+    """
+    if (before_available > 0) != (after_available > 0):
+        HomeFeed.mark_dirty(WAREHOUSE_SECTIONS, [warehouse_id])
@@ -0,0 +1,168 @@
+"""
+Image variants for catalog media.
+
+Listing grids used to ship full-size originals. Each image is resized
+once, off the request path (process_image_variants_task), to
+IMAGE_VARIANT_WIDTHS in WebP and, where Pillow can encode it, AVIF. The
+results are stored under
+
+    variants/<sha256 of the source bytes>/<width>.<format>
+
+The names are content-hashed, so a file never changes once written and
+nginx can serve /media/variants/ as immutable. A new upload gets a new
+hash and a new URL, so nothing has to be purged. Identical sources share
+their files.
+
+Sources: Category.image and Product.image (uploads) and SKU.image_url
+(remote, fetched with a size cap). The result is stored on the row as
+image_variants:
+    {"src": <source it was built from>, "key": <hash>, "w": .., "h": ..,
+     "widths": [..], "formats": ["avif", "webp"]}
+Serializers turn that into srcset strings (ImageVariantsField).
+"""
+import hashlib
+import io
+import logging
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+PATH = "variants/{key}/{width}.{fmt}"
+# Best first: clients take the first srcset they can decode
+ENCODERS = {
+    "avif": {"format": "AVIF", "quality": 50},
+    "webp": {"format": "WEBP", "quality": 80, "method": 6},
+}
+
+
+def source_field(instance):
+    # Category/Product have an upload; SKU only a URL
+    return 'image' if hasattr(instance, 'image') else 'image_url'
+
+
+def source_of(instance):
+    """
+    The image a row's variants are built from: upload name or remote URL ("" if none).
+    """
+    value = getattr(instance, source_field(instance))
+    return (value.name if source_field(instance) == 'image' else value) or ""
+
+
+def available_formats():
+    try:
+        import pillow_avif  # noqa: F401  (registers AVIF on Pillow < 11)
+    except ImportError:
+        pass
+    Image.init()
+    return [fmt for fmt, options in ENCODERS.items() if options["format"] in Image.SAVE]
+
+
+def variant_url(key, width, fmt):
+    base = getattr(settings, 'IMAGE_CDN_BASE_URL', settings.MEDIA_URL)
+    return f"{base}{PATH.format(key=key, width=width, fmt=fmt)}"
+
+
+def srcset(meta):
+    """
+    image_variants -> {"src", "width", "height", "srcset": {fmt: "url 160w, url 320w"}}, or None.
+    """
+    if not meta or not meta.get("key"):
+        return None
+    key, widths = meta["key"], meta["widths"]
+    sets = {
+        fmt: ", ".join(f"{variant_url(key, w, fmt)} {w}w" for w in widths)
+        for fmt in meta["formats"]
+    }
+    # Fallback src: the largest WebP (or whatever was built)
+    fallback = "webp" if "webp" in meta["formats"] else meta["formats"][0]
+    return {
+        "src": variant_url(key, widths[-1], fallback),
+        "width": meta["w"],
+        "height": meta["h"],
+        "srcset": sets,
+    }
+
+
+class ImagePipeline:
+
+    @staticmethod
+    def read_source(instance, source):
+        max_bytes = getattr(settings, 'IMAGE_MAX_SOURCE_BYTES', 10 * 1024 * 1024)
+        if source_field(instance) == 'image':
+            with instance.image.open('rb') as fh:
+                data = fh.read(max_bytes + 1)
+        else:
+            with requests.get(source, timeout=10, stream=True) as response:
+                response.raise_for_status()
+                data = b""
+                for chunk in response.iter_content(64 * 1024):
+                    data += chunk
+                    if len(data) > max_bytes:
+                        break
+        if len(data) > max_bytes:
+            raise ValueError(f"source larger than {max_bytes} bytes")
+        return data
+
+    @staticmethod
+    def render(data, formats=None):
+        """
+        Resizes `data` to every configured width (never upscaling) in each format.
+        Returns (meta without "src", {storage path: bytes}).
+        """
+        formats = formats or available_formats()
+        key = hashlib.sha256(data).hexdigest()[:32]
+        with Image.open(io.BytesIO(data)) as opened:
+            image = ImageOps.exif_transpose(opened)
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        width, height = image.size
+
+        wanted = sorted(set(getattr(settings, 'IMAGE_VARIANT_WIDTHS', [160, 320, 640])))
+        widths = [w for w in wanted if w < width] + [min(wanted[-1], width)]
+        widths = sorted(set(widths))
+
+        files = {}
+        for w in widths:
+            resized = image if w == width else image.resize((w, max(1, round(height * w / width))), Image.LANCZOS)
+            for fmt in formats:
+                options = dict(ENCODERS[fmt])
+                buffer = io.BytesIO()
+                resized.save(buffer, **options)
+                files[PATH.format(key=key, width=w, fmt=fmt)] = buffer.getvalue()
+
+        meta = {"key": key, "w": width, "h": height, "widths": widths, "formats": formats}
+        return meta, files
+
+    @staticmethod
+    def process(instance):
+        """
+        Builds and stores variants for one row if its source changed. Returns the new metadata or None.
+        """
+        source = source_of(instance)
+        current = instance.image_variants or {}
+        if current.get("src", "") == source:
+            return None
+        if not source:
+            meta = {}
+        else:
+            meta, files = ImagePipeline.render(ImagePipeline.read_source(instance, source))
+            for path, content in files.items():
+                # Content-addressed: an existing file is already the right one
+                if not default_storage.exists(path):
+                    default_storage.save(path, ContentFile(content))
+            meta["src"] = source
+            logger.info(f"Image variants {meta['key']}: {len(files)} files for {type(instance).__name__} {instance.pk}")
+
+        # .update(): no post_save, so this doesn't re-trigger the pipeline.
+        # Guarded on the source so a newer upload isn't overwritten with stale variants.
+        queryset = type(instance).objects.filter(pk=instance.pk)
+        if source:
+            queryset = queryset.filter(**{source_field(instance): source})
+        updated = queryset.update(image_variants=meta)
+        if updated:
+            instance.image_variants = meta
+        return meta if updated else None
@@ -0,0 +1,317 @@
+"""
+Streaming SKU import (supplier CSV / XLSX).
+
+The file is read row by row: csv.reader over the stored file, or an
+openpyxl read-only sheet. Rows are validated and upserted in chunks of
+IMPORT_CHUNK_SIZE with one INSERT .. ON CONFLICT (sku_code) DO UPDATE per
+chunk, so memory stays flat whatever the file size. Rejected rows are
+streamed to an error CSV (row number, sku_code, reason) that is attached
+to the job at the end.
+
+Only the columns present in the file are updated on existing SKUs, so a
+price-only sheet (sku_code,name,sale_price) doesn't reset anything else.
+Likewise a blank numeric or true/false cell leaves that field alone: rows
+in a chunk are grouped by the columns they actually fill, one upsert per
+group. A new SKU must come with a sale_price.
+"""
+import csv
+import io
+import logging
+import tempfile
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.validators import URLValidator
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import Brand, Category, SKU, SKUImportJob
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ('sku_code', 'name')
+TEXT_COLUMNS = {
+    'name': 255, 'description': None, 'unit': 50, 'hsn_code': 32,
+    'primary_barcode': 32, 'search_keywords': None, 'image_url': None,
+}
+DECIMAL_COLUMNS = ('sale_price', 'cost_price', 'tax_rate')
+INT_COLUMNS = ('max_order_qty', 'min_order_qty', 'weight_grams', 'volume_ml', 'shelf_life_days')
+BOOL_COLUMNS = ('is_active', 'is_featured', 'is_returnable')
+RELATION_COLUMNS = ('category', 'brand')  # category slug, brand name
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'n'}
+
+# Row data key -> update_fields name
+FIELD_NAMES = {'category_id': 'category', 'brand_id': 'brand'}
+
+_validate_url = URLValidator()
+
+
+class RowError(Exception):
+    pass
+
+
+def _normalize_header(value):
+    return "_".join(str(value or "").strip().lower().split())
+
+
+def iter_rows(file_field):
+    """
+    Yields (row_number, {column: str}) without loading the file into memory.
+    """
+    with file_field.open('rb') as fh:
+        if file_field.name.lower().endswith('.xlsx'):
+            from openpyxl import load_workbook
+            sheet = load_workbook(fh, read_only=True, data_only=True).active
+            rows = sheet.iter_rows(values_only=True)
+        else:
+            rows = csv.reader(io.TextIOWrapper(fh, encoding='utf-8-sig', newline=''))
+
+        header = [_normalize_header(h) for h in next(rows, [])]
+        missing = [c for c in REQUIRED_COLUMNS if c not in header]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        yield 1, header
+
+        for number, row in enumerate(rows, start=2):
+            values = ["" if v is None else str(v).strip() for v in row]
+            if not any(values):
+                continue
+            yield number, dict(zip(header, values))
+
+
+class SKUImporter:
+
+    def __init__(self, job):
+        self.job = job
+        self.chunk_size = getattr(settings, 'IMPORT_CHUNK_SIZE', 1000)
+        self.categories = {}  # slug -> (id, path) | None
+        self.brands = {}      # name.lower() -> id | None
+        self.processed = self.upserted = self.errors = 0
+
+    # ------------------------------------------------------------------
+    # Row parsing
+    # ------------------------------------------------------------------
+    @staticmethod
+    def parse(raw):
+        data = {'sku_code': raw.get('sku_code', '')}
+        if not data['sku_code'] or len(data['sku_code']) > 100:
+            raise RowError("sku_code is required (max 100 chars)")
+
+        for column, max_length in TEXT_COLUMNS.items():
+            if column not in raw:
+                continue
+            value = raw[column]
+            if max_length and len(value) > max_length:
+                raise RowError(f"{column} longer than {max_length} chars")
+            data[column] = value
+        if not data.get('name'):
+            raise RowError("name is required")
+        if data.get('image_url'):
+            try:
+                _validate_url(data['image_url'])
+            except ValidationError:
+                raise RowError("image_url is not a valid URL")
+        elif 'image_url' in data:
+            data['image_url'] = None
+
+        for column in DECIMAL_COLUMNS:
+            if raw.get(column, '') == '':
+                continue
+            try:
+                value = Decimal(raw[column])
+            except InvalidOperation:
+                raise RowError(f"{column} is not a number")
+            # Columns are max_digits=10/5, decimal_places=2
+            limit = Decimal("1000") if column == 'tax_rate' else Decimal("100000000")
+            if not value.is_finite() or value < 0 or value >= limit:
+                raise RowError(f"{column} must be between 0 and {limit - Decimal('0.01')}")
+            data[column] = value.quantize(Decimal("0.01"))
+
+        for column in INT_COLUMNS:
+            if raw.get(column, '') == '':
+                continue
+            try:
+                data[column] = int(float(raw[column]))
+            except (ValueError, OverflowError):
+                raise RowError(f"{column} is not a whole number")
+            if data[column] < 0:
+                raise RowError(f"{column} must be non-negative")
+
+        for column in BOOL_COLUMNS:
+            if raw.get(column, '') == '':
+                continue
+            value = raw[column].lower()
+            if value not in TRUE_VALUES | FALSE_VALUES:
+                raise RowError(f"{column} must be true/false")
+            data[column] = value in TRUE_VALUES
+
+        for column in RELATION_COLUMNS:
+            if column in raw:
+                data[column] = raw[column]
+        return data
+
+    # ------------------------------------------------------------------
+    # Lookups (cached across chunks, fetched per chunk for new keys only)
+    # ------------------------------------------------------------------
+    def _resolve_categories(self, slugs):
+        missing = {s for s in slugs if s and s not in self.categories}
+        if missing:
+            found = {slug: (pk, path) for pk, slug, path in Category.objects.filter(slug__in=missing).values_list('pk', 'slug', 'path')}
+            for slug in missing:
+                self.categories[slug] = found.get(slug)
+
+    def _resolve_brands(self, names):
+        missing = {n for n in names if n and n.lower() not in self.brands}
+        if not missing:
+            return
+        # Matched on slug, so "amul" / "AMUL" land on the existing "Amul".
+        # New supplier brands are created on the fly.
+        slugs = {name: slugify(name) for name in missing}
+        Brand.objects.bulk_create([Brand(name=n, slug=s) for n, s in slugs.items() if s], ignore_conflicts=True)
+        found = dict(Brand.objects.filter(slug__in=slugs.values()).values_list('slug', 'pk'))
+        for name, slug in slugs.items():
+            self.brands[name.lower()] = found.get(slug)
+
+    # ------------------------------------------------------------------
+    # Chunk
+    # ------------------------------------------------------------------
+    def process_chunk(self, rows, update_fields, write_error):
+        parsed = {}
+        for number, raw in rows:
+            try:
+                data = self.parse(raw)
+            except RowError as e:
+                write_error(number, raw.get('sku_code', ''), str(e))
+                continue
+            # ON CONFLICT can't touch one row twice per statement: last occurrence wins
+            parsed[data['sku_code']] = (number, data)
+
+        self._resolve_categories(d.get('category') for _, d in parsed.values())
+        self._resolve_brands(d.get('brand') for _, d in parsed.values())
+
+        existing = set(SKU.objects.filter(sku_code__in=list(parsed)).values_list('sku_code', flat=True))
+
+        # Rows grouped by the fields they fill: a blank cell must not write the model default
+        groups = {}
+        for number, data in parsed.values():
+            category = data.pop('category', None)
+            brand = data.pop('brand', None)
+            if 'sale_price' not in data and data['sku_code'] not in existing:
+                write_error(number, data['sku_code'], "sale_price is required for new SKUs")
+                continue
+            if category:
+                resolved = self.categories.get(category)
+                if resolved is None:
+                    write_error(number, data['sku_code'], f"unknown category '{category}'")
+                    continue
+                data['category_id'], data['category_path'] = resolved
+            elif category is not None:
+                data['category_id'], data['category_path'] = None, ""
+            if brand:
+                brand_id = self.brands.get(brand.lower())
+                if brand_id is None:
+                    write_error(number, data['sku_code'], f"could not create brand '{brand}'")
+                    continue
+                data['brand_id'] = brand_id
+            elif brand is not None:
+                data['brand_id'] = None
+            filled = frozenset(FIELD_NAMES.get(key, key) for key in data)
+            groups.setdefault(filled, []).append(SKU(**data))
+
+        objs = []
+        for filled, group in groups.items():
+            # bulk_create skips save(): category_path is set above from the category map
+            SKU.objects.bulk_create(
+                group, update_conflicts=True, unique_fields=['sku_code'],
+                update_fields=[f for f in update_fields if f in filled or f == 'updated_at'],
+            )
+            objs += group
+
+        if objs:
+            from .search import ProductSearch
+            chunk_skus = SKU.objects.filter(sku_code__in=[o.sku_code for o in objs])
+            ProductSearch.reindex(chunk_skus)
+            if 'image_url' in update_fields:
+                self._queue_image_variants(chunk_skus)
+        return len(objs)
+
+    @staticmethod
+    def _queue_image_variants(skus):
+        # bulk_create skips the post_save receiver that normally does this
+        from .tasks import process_image_variants_task
+        for pk, image_url, variants in skus.values_list('pk', 'image_url', 'image_variants'):
+            if (image_url or "") != (variants or {}).get("src", ""):
+                process_image_variants_task.delay(SKU._meta.label, str(pk))
+
+    @staticmethod
+    def update_fields_for(header):
+        fields = [c for c in header if c in TEXT_COLUMNS or c in DECIMAL_COLUMNS or c in INT_COLUMNS or c in BOOL_COLUMNS]
+        if 'category' in header:
+            fields += ['category', 'category_path']
+        if 'brand' in header:
+            fields.append('brand')
+        return fields + ['updated_at']
+
+    # ------------------------------------------------------------------
+    # Job
+    # ------------------------------------------------------------------
+    def run(self):
+        job = self.job
+        raw_errors = tempfile.TemporaryFile()
+        text_errors = io.TextIOWrapper(raw_errors, encoding='utf-8', newline='')
+        error_writer = csv.writer(text_errors)
+        error_writer.writerow(['row', 'sku_code', 'error'])
+
+        def write_error(number, sku_code, message):
+            self.errors += 1
+            error_writer.writerow([number, sku_code, message])
+
+        try:
+            rows = iter_rows(job.file)
+            _, header = next(rows)
+            update_fields = self.update_fields_for(header)
+
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                self.processed += len(chunk)
+                self.upserted += self.process_chunk(chunk, update_fields, write_error)
+                SKUImportJob.objects.filter(pk=job.pk).update(
+                    processed_rows=self.processed, upserted_rows=self.upserted, error_rows=self.errors,
+                )
+
+            if self.errors:
+                text_errors.flush()
+                raw_errors.seek(0)
+                job.error_file.save(f"{job.id}_errors.csv", File(raw_errors), save=False)
+        finally:
+            text_errors.close()
+
+        job.processed_rows, job.upserted_rows, job.error_rows = self.processed, self.upserted, self.errors
+        job.status = SKUImportJob.Status.COMPLETED
+        job.finished_at = timezone.now()
+        job.save(update_fields=[
+            'processed_rows', 'upserted_rows', 'error_rows', 'error_file', 'status', 'finished_at', 'updated_at'
+        ])
+        self._after_import()
+        return job
+
+    @staticmethod
+    def _after_import():
+        """
+        bulk_create fires no signals: refresh the derived catalog views once for the whole file.
+        """
+        from .cache import CatalogCache
+        from .home_feed import HomeFeed, WAREHOUSE_SECTIONS
+        from .pricing import PricingEngine
+        from .receivers import schedule_suggest_rebuild
+        CatalogCache.bump()
+        PricingEngine.bump()
+        HomeFeed.mark_dirty(WAREHOUSE_SECTIONS)
+        schedule_suggest_rebuild(sender=SKU)
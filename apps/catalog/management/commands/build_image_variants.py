@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.catalog.images import source_of
+from apps.catalog.models import Category, Product, SKU
+from apps.catalog.tasks import process_image_variants_task
+
+
+class Command(BaseCommand):
+    help = "Queue WebP/AVIF variant builds for catalog images that have none or are out of date (backfill)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Rebuild even when the variants look current")
+
+    def handle(self, *args, **options):
+        queued = 0
+        for model in (Category, Product, SKU):
+            field = 'image' if model is not SKU else 'image_url'
+            rows = model.objects.exclude(**{f"{field}__isnull": True}).exclude(**{field: ""})
+            for instance in rows.only('pk', field, 'image_variants').iterator():
+                if options['force']:
+                    model.objects.filter(pk=instance.pk).update(image_variants={})
+                elif source_of(instance) == (instance.image_variants or {}).get("src", ""):
+                    continue
+                process_image_variants_task.delay(model._meta.label, str(instance.pk))
+                queued += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Queued {queued} image variant builds."))
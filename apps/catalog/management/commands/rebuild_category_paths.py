@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from apps.catalog.models import Category, SKU
+
+
+class Command(BaseCommand):
+    help = "Recompute Category.path/depth from parent links and copy paths onto SKUs (backfill / repair)"
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        children = {}
+        for pk, parent_id in Category.objects.values_list('pk', 'parent_id'):
+            children.setdefault(parent_id, []).append(pk)
+
+        # Breadth-first from the roots; one UPDATE per changed node
+        updated = 0
+        current = dict(Category.objects.values_list('pk', 'path'))
+        queue = [(pk, "/") for pk in children.get(None, [])]
+        while queue:
+            pk, parent_path = queue.pop()
+            path = f"{parent_path}{pk}/"
+            if current.get(pk) != path:
+                Category.objects.filter(pk=pk).update(path=path, depth=path.count("/") - 2)
+                updated += 1
+            queue.extend((child, path) for child in children.get(pk, []))
+
+        path = Category.objects.filter(pk=OuterRef('category_id')).values('path')[:1]
+        skus = SKU.objects.filter(category__isnull=False).update(category_path=Subquery(path))
+        SKU.objects.filter(category__isnull=True).exclude(category_path="").update(category_path="")
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} category paths, {skus} SKU paths."))
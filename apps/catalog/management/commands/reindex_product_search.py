@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from apps.catalog.models import SKU
+from apps.catalog.search import ProductSearch
+
+
+class Command(BaseCommand):
+    help = "Rebuild SKU.search_vector (backfill, or after changing SEARCH_CONFIG)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help="SKUs per UPDATE")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk, total = None, 0
+
+        while True:
+            qs = SKU.objects.order_by('pk')
+            if last_pk is not None:
+                qs = qs.filter(pk__gt=last_pk)
+            pks = list(qs.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            total += ProductSearch.reindex(SKU.objects.filter(pk__in=pks))
+            last_pk = pks[-1]
+            self.stdout.write(f"... {total} SKUs")
+
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {total} SKUs."))
@@ -0,0 +1,15 @@
+# Hand-written: pg_trgm must exist before the trigram GIN indexes on SKU/Brand/Category are created.
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+    ]
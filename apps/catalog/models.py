@@ -1,20 +1,47 @@
-from django.db import models
+import uuid
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 from django.utils.text import slugify
 
+from apps.utils.models import TimestampedModel
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, blank=True)
     image = models.ImageField(upload_to='categories/', null=True, blank=True)
+    # Resized WebP/AVIF renditions of `image` (catalog.images), filled in by a worker
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='subcategories')
+    sort_order = models.PositiveIntegerField(default=0)
+    icon_url = models.URLField(blank=True, null=True)
+    # Materialised path "/<root>/.../<self>/" (catalog.tree), maintained on save
+    path = models.CharField(max_length=255, blank=True, default="", editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name_plural = 'Categories'
+        ordering = ['sort_order', 'name']
+        indexes = [
+            models.Index(fields=['slug']),
+            models.Index(fields=['parent', 'sort_order']),
+            models.Index(fields=['is_active']),
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='category_name_trgm_idx'),
+            # Subtree = path LIKE '/3/%'
+            models.Index(fields=['path'], opclasses=['varchar_pattern_ops'], name='category_path_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        from .tree import CategoryTree
+        # One transaction: a rejected move (cycle) rolls the parent change back too
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            CategoryTree.place(self)
 
     def __str__(self):
         return self.name
@@ -26,6 +53,7 @@ class Product(models.Model):
     description = models.TextField(blank=True)
     base_price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.ImageField(upload_to='products/', null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -36,4 +64,205 @@ class Product(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+
+class Brand(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=255, unique=True)
+    slug = models.SlugField(unique=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    logo_url = models.URLField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['name']
+        indexes = [
+            models.Index(fields=['slug']),
+            models.Index(fields=['is_active']),
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='brand_name_trgm_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = slugify(self.name)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+
+class SKU(models.Model):
+    """
+    Sellable unit (what carts, orders and warehouse stock point at).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    sku_code = models.CharField(max_length=100, unique=True, db_index=True, help_text="Human-readable code (e.g. MILK-1L-AMUL)")
+    primary_barcode = models.CharField(max_length=32, blank=True, help_text="EAN/UPC or primary barcode (optional)")
+    name = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    category = models.ForeignKey(Category, null=True, blank=True, on_delete=models.SET_NULL, related_name='skus')
+    brand = models.ForeignKey(Brand, null=True, blank=True, on_delete=models.SET_NULL, related_name='skus')
+    unit = models.CharField(max_length=50, default='pcs', help_text="Unit like pcs, kg, g, ltr, ml, pack")
+
+    sale_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.0, help_text="Customer-facing selling price")
+    cost_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.0, help_text="Internal purchase cost price")
+    max_order_qty = models.PositiveIntegerField(default=20, help_text="Max quantity allowed per order")
+    min_order_qty = models.PositiveIntegerField(default=1, help_text="Minimum quantity per order")
+    hsn_code = models.CharField(max_length=32, blank=True)
+    tax_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0.0, help_text="GST percentage (e.g. 5.00 for 5%)")
+
+    image_url = models.URLField(blank=True, null=True)
+    # Resized WebP/AVIF renditions of image_url (catalog.images), filled in by a worker
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    is_active = models.BooleanField(default=True)
+    is_featured = models.BooleanField(default=False)
+    is_returnable = models.BooleanField(default=True)
+
+    weight_grams = models.PositiveIntegerField(null=True, blank=True, help_text="Weight in grams (for logistics)")
+    volume_ml = models.PositiveIntegerField(null=True, blank=True, help_text="Volume in ml (if applicable)")
+    shelf_life_days = models.PositiveIntegerField(null=True, blank=True, help_text="Shelf life in days (optional)")
+    search_keywords = models.TextField(blank=True, help_text="Space/comma separated extra search keywords")
+    metadata = models.JSONField(default=dict, blank=True, help_text="Extra attributes like pack_type, flavor, etc.")
+    # Maintained by catalog.search.ProductSearch.reindex (not a generated column: it spans brand/category)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Copy of category.path: subtree listings filter SKUs without joining Category
+    category_path = models.CharField(max_length=255, blank=True, default="", editable=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+        indexes = [
+            models.Index(fields=['is_active', 'category']),
+            models.Index(fields=['is_active', 'brand']),
+            models.Index(fields=['sale_price']),
+            models.Index(fields=['created_at']),
+            # [PERFORMANCE] Keyset product feed (catalog.feed): one index per sort
+            models.Index(fields=['is_active', '-created_at', '-id'], name='sku_feed_newest_idx'),
+            models.Index(fields=['is_active', 'sale_price', 'id'], name='sku_feed_price_idx'),
+            # [PERFORMANCE] Search (catalog.search): FTS + typo-tolerant name/keyword matching
+            GinIndex(fields=['search_vector'], name='sku_search_vector_idx'),
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='sku_name_trgm_idx'),
+            GinIndex(fields=['search_keywords'], opclasses=['gin_trgm_ops'], name='sku_keywords_trgm_idx'),
+            models.Index(
+                fields=['category_path'], opclasses=['varchar_pattern_ops'],
+                condition=models.Q(is_active=True), name='sku_active_category_path_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.category_path = ""
+        if self.category_id:
+            self.category_path = Category.objects.filter(pk=self.category_id).values_list('path', flat=True).first() or ""
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.sku_code} - {self.name}"
+
+
+class Banner(models.Model):
+    class Position(models.TextChoices):
+        HERO = 'HERO', 'Hero Slider'
+        MID = 'MID', 'Middle Banner'
+
+    title = models.CharField(max_length=100)
+    image_url = models.URLField(help_text="External URL or Cloudinary link")
+    target_url = models.CharField(max_length=255, help_text="/category.html?slug=veg or /product.html?code=...")
+    position = models.CharField(max_length=10, choices=Position.choices, default=Position.HERO)
+    bg_gradient = models.CharField(max_length=255, default='linear-gradient(135deg, #32CD32 0%, #2ecc71 100%)', help_text="CSS Gradient string")
+    is_active = models.BooleanField(default=True)
+    sort_order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['sort_order']
+
+    def __str__(self):
+        return self.title
+
+
+class FlashSale(models.Model):
+    sku = models.OneToOneField(SKU, on_delete=models.CASCADE)
+    discounted_price = models.DecimalField(max_digits=10, decimal_places=2)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    total_quantity = models.PositiveIntegerField(default=100)
+    # Written back in batches from the Redis counters (flash_sales.py); never on the order path
+    sold_quantity = models.PositiveIntegerField(default=0)
+    max_per_user = models.PositiveIntegerField(default=2)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'end_time'], name='flash_sale_live_idx'),
+        ]
+
+    @property
+    def percentage_sold(self):
+        if not self.total_quantity:
+            return 0
+        return int(self.sold_quantity * 100 / self.total_quantity)
+
+    def __str__(self):
+        return f"{self.sku.name} @ {self.discounted_price}"
+
+
+class PriceBook(TimestampedModel):
+    """
+    A set of SKU price overrides, for one warehouse or (warehouse=None) all of
+    them, optionally time-boxed. Where books overlap, higher priority wins,
+    then the warehouse-specific book. Resolved by catalog.pricing.
+    """
+    name = models.CharField(max_length=100)
+    warehouse = models.ForeignKey('warehouse.Warehouse', null=True, blank=True, on_delete=models.CASCADE, related_name='price_books')
+    priority = models.IntegerField(default=0)
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'warehouse']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class PriceBookEntry(models.Model):
+    price_book = models.ForeignKey(PriceBook, on_delete=models.CASCADE, related_name='entries')
+    sku = models.ForeignKey(SKU, on_delete=models.CASCADE, related_name='price_book_entries')
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['price_book', 'sku'], name='price_book_entry_unique_sku'),
+        ]
+
+    def __str__(self):
+        return f"{self.sku_id} @ {self.price}"
+
+
+class SKUImportJob(TimestampedModel):
+    """
+    One supplier catalog upload (CSV/XLSX), processed by catalog.tasks.import_skus_task.
+    """
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        COMPLETED = "COMPLETED", "Completed"
+        FAILED = "FAILED", "Failed"
+
+    file = models.FileField(upload_to='imports/skus/')
+    error_file = models.FileField(upload_to='imports/errors/', null=True, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING, db_index=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+
+    processed_rows = models.PositiveIntegerField(default=0)
+    upserted_rows = models.PositiveIntegerField(default=0)
+    error_rows = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"SKU import {self.id} ({self.status})"
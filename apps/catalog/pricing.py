@@ -0,0 +1,263 @@
+"""
+Cart pricing from a compiled, in-memory price table.
+
+Per warehouse, the table holds each active SKU's base price (sale_price),
+its effective price after price books and flash sales, and its GST rate,
+as int64 numpy arrays in paise. A whole cart is priced with a few array
+operations, with no SKU queries and no per-line Decimal loop.
+
+A price-affecting write bumps pricing:version in Redis after commit. That
+covers SKU, FlashSale, PriceBook and PriceBookEntry (receivers.py), bulk
+imports, and flash-sale sell-out or expiry. Each quote reads the version
+(one GET). It recompiles the table if the version moved or the table is
+past the next price-book or flash-sale start/end. The SKU columns are
+compiled once per version and shared across warehouses.
+
+Prices are tax-inclusive (MRP style); the GST part is reported per line.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from .models import FlashSale, PriceBook, PriceBookEntry, SKU
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "pricing:version"
+MAX_TABLE_AGE_SECONDS = 3600  # safety net for anything that changes without a bump
+
+SOURCE_BASE, SOURCE_PRICE_BOOK, SOURCE_FLASH_SALE = 0, 1, 2
+SOURCES = ("base", "price_book", "flash_sale")
+
+# What FlashSaleEngine.reserve needs, without holding model instances in the table
+LiveSale = namedtuple('LiveSale', ['id', 'max_per_user', 'end_time'])
+
+
+def to_paise(value):
+    return int(Decimal(value).scaleb(2))
+
+
+def to_rupees(paise):
+    return Decimal(int(paise)).scaleb(-2)
+
+
+class SKUColumns:
+    """
+    Warehouse-independent part of the table: row index and base columns.
+    """
+
+    def __init__(self):
+        rows = list(SKU.objects.filter(is_active=True).values_list('id', 'sku_code', 'name', 'sale_price', 'tax_rate'))
+        self.index = {str(r[0]): i for i, r in enumerate(rows)}
+        self.ids = [r[0] for r in rows]
+        self.codes = [r[1] for r in rows]
+        self.names = [r[2] for r in rows]
+        self.base = np.array([to_paise(r[3]) for r in rows], dtype=np.int64)
+        # 5.00 (%) -> 500 basis points
+        self.tax_bp = np.array([to_paise(r[4]) for r in rows], dtype=np.int64)
+
+
+class PriceTable:
+
+    def __init__(self, columns, warehouse_id, now=None):
+        now = now or timezone.now()
+        self.columns = columns
+        self.price = columns.base.copy()
+        self.source = np.full(len(columns.ids), SOURCE_BASE, dtype=np.int8)
+        self.sale = np.full(len(columns.ids), -1, dtype=np.int64)  # index into self.sales
+        self.sales = []
+        boundaries = [now.timestamp() + MAX_TABLE_AGE_SECONDS]
+        self._apply_price_books(warehouse_id, now, boundaries)
+        self._apply_flash_sales(now, boundaries)
+        self.expires_at = min(boundaries)
+
+    def _apply_price_books(self, warehouse_id, now, boundaries):
+        books = PriceBook.objects.filter(
+            Q(warehouse_id=warehouse_id) | Q(warehouse__isnull=True), is_active=True,
+        ).exclude(ends_at__lte=now).values('id', 'warehouse_id', 'priority', 'starts_at', 'ends_at')
+
+        rank = {}
+        for book in books:
+            if book['starts_at'] and book['starts_at'] > now:
+                boundaries.append(book['starts_at'].timestamp())
+                continue
+            if book['ends_at']:
+                boundaries.append(book['ends_at'].timestamp())
+            rank[book['id']] = (book['priority'], book['warehouse_id'] is not None, book['id'])
+        if not rank:
+            return
+
+        entries = PriceBookEntry.objects.filter(price_book_id__in=rank).values_list('price_book_id', 'sku_id', 'price')
+        overrides = {}
+        for book_id, sku_id, price in sorted(entries, key=lambda e: rank[e[0]]):
+            row = self.columns.index.get(str(sku_id))
+            if row is not None:
+                overrides[row] = to_paise(price)  # higher rank sorts later and wins
+        if overrides:
+            rows = np.fromiter(overrides.keys(), dtype=np.intp, count=len(overrides))
+            self.price[rows] = np.fromiter(overrides.values(), dtype=np.int64, count=len(overrides))
+            self.source[rows] = SOURCE_PRICE_BOOK
+
+    def _apply_flash_sales(self, now, boundaries):
+        sales = list(FlashSale.objects.filter(
+            is_active=True, end_time__gt=now, sold_quantity__lt=F('total_quantity'),
+        ).values('id', 'sku_id', 'discounted_price', 'start_time', 'end_time', 'max_per_user'))
+        live = []
+        for sale in sales:
+            if sale['start_time'] > now:
+                boundaries.append(sale['start_time'].timestamp())
+            else:
+                boundaries.append(sale['end_time'].timestamp())
+                live.append(sale)
+        if not live:
+            return
+
+        # sold_quantity lags the Redis counters; a sale that just sold out prices normally
+        from .flash_sales import REMAINING
+        remaining = get_redis_connection("default").mget([REMAINING.format(s['id']) for s in live])
+        for sale, left in zip(live, remaining):
+            row = self.columns.index.get(str(sale['sku_id']))
+            if row is None or left == b"0":
+                continue
+            price = to_paise(sale['discounted_price'])
+            if price < self.price[row]:
+                self.price[row] = price
+                self.source[row] = SOURCE_FLASH_SALE
+                self.sale[row] = len(self.sales)
+                self.sales.append(LiveSale(sale['id'], sale['max_per_user'], sale['end_time']))
+
+    def quote(self, items):
+        """
+        items: [{"sku_id", "quantity"}]. Unknown or inactive SKUs are returned
+        under "unavailable" instead of being priced.
+        """
+        rows, quantities, unavailable = [], [], []
+        for item in items:
+            row = self.columns.index.get(str(item['sku_id']))
+            if row is None:
+                unavailable.append(item['sku_id'])
+                continue
+            rows.append(row)
+            quantities.append(int(item['quantity']))
+
+        rows = np.array(rows, dtype=np.intp)
+        qty = np.array(quantities, dtype=np.int64)
+        base = self.columns.base[rows]
+        unit = self.price[rows]
+        tax_bp = self.columns.tax_bp[rows]
+        line = unit * qty
+        # Inclusive GST: line * r / (100 + r), rounded half up to the paisa
+        denominator = 10000 + tax_bp
+        tax = (2 * line * tax_bp + denominator) // (2 * denominator)
+        savings = np.clip(base - unit, 0, None) * qty
+
+        lines, flash_sales = [], {}
+        for i, row in enumerate(rows):
+            sale = self.sales[self.sale[row]] if self.sale[row] >= 0 else None
+            if sale is not None:
+                flash_sales[sale.id] = sale
+            lines.append({
+                "sku_id": self.columns.ids[row],
+                "sku_code": self.columns.codes[row],
+                "name": self.columns.names[row],
+                "quantity": int(qty[i]),
+                "mrp": to_rupees(base[i]),
+                "unit_price": to_rupees(unit[i]),
+                "line_total": to_rupees(line[i]),
+                "tax_rate": to_rupees(tax_bp[i]),
+                "tax_amount": to_rupees(tax[i]),
+                "savings": to_rupees(savings[i]),
+                "price_source": SOURCES[self.source[row]],
+                "flash_sale_id": sale.id if sale else None,
+            })
+
+        return {
+            "lines": lines,
+            "subtotal": to_rupees(line.sum()),
+            "tax_total": to_rupees(tax.sum()),
+            "savings": to_rupees(savings.sum()),
+            "unavailable": unavailable,
+            "flash_sales": flash_sales,
+        }
+
+
+class PricingEngine:
+    """
+    Per-process holder of the compiled tables, keyed by warehouse. At most
+    PRICING_MAX_TABLES are kept; the least recently used is dropped first.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._columns = (None, None)  # (version, SKUColumns)
+        self._tables = OrderedDict()  # warehouse_id -> (version, PriceTable), LRU order
+
+    @staticmethod
+    def _version():
+        try:
+            return get_redis_connection("default").get(VERSION_KEY) or b"0"
+        except Exception as e:
+            logger.warning(f"Pricing version check failed: {e}")
+            return None
+
+    def _fresh(self, key, version):
+        version_, table = self._tables.get(key, (None, None))
+        if table is None or table.expires_at <= time.time():
+            return None
+        # Redis unreachable: keep serving the table we have until it expires
+        if version is not None and version_ != version:
+            return None
+        return table
+
+    def table(self, warehouse_id):
+        key = str(warehouse_id)
+        version = self._version()
+        table = self._fresh(key, version)
+        if table is not None:
+            with self._lock:
+                if key in self._tables:
+                    self._tables.move_to_end(key)
+            return table
+
+        with self._lock:
+            table = self._fresh(key, version)
+            if table is not None:
+                return table
+            columns_version, columns = self._columns
+            if columns is None or columns_version != version or version is None:
+                columns = SKUColumns()
+                self._columns = (version, columns)
+            table = PriceTable(columns, warehouse_id)
+            self._tables[key] = (version, table)
+            self._tables.move_to_end(key)
+            while len(self._tables) > getattr(settings, 'PRICING_MAX_TABLES', 64):
+                self._tables.popitem(last=False)
+            logger.info(f"Pricing: compiled table for warehouse {key} ({len(columns.ids)} SKUs, {len(table.sales)} flash sales)")
+            return table
+
+    def quote(self, warehouse_id, items):
+        return self.table(warehouse_id).quote(items)
+
+    @staticmethod
+    def bump():
+        """
+        Safe inside a transaction: bumps after commit, so a recompile can't read pre-commit prices.
+        """
+        def _bump():
+            try:
+                get_redis_connection("default").incr(VERSION_KEY)
+            except Exception as e:
+                logger.warning(f"Pricing version bump failed: {e}")
+        transaction.on_commit(_bump)
+
+
+pricing_engine = PricingEngine()
@@ -0,0 +1,100 @@
+from django.db.models.signals import post_save, post_delete
+from django.core.cache import cache
+from django.db import transaction
+from .models import Banner, Brand, Category, FlashSale, PriceBook, PriceBookEntry, Product, SKU
+from .home_feed import HomeFeed
+from .search import ProductSearch
+from .cache import CatalogCache
+from .pricing import PricingEngine
+from .tree import CategoryTree
+from .images import source_of
+
+# Which home feed sections each model feeds (rebuilt for every warehouse)
+FEED_SECTIONS = {
+    Banner: ("banners",),
+    Category: ("categories",),
+    FlashSale: ("flash_sales",),
+    SKU: ("flash_sales", "featured"),
+}
+
+
+def refresh_home_feed(sender, **kwargs):
+    HomeFeed.mark_dirty(FEED_SECTIONS[sender])
+
+
+for model in FEED_SECTIONS:
+    post_save.connect(refresh_home_feed, sender=model, dispatch_uid=f"home_feed_save_{model.__name__}")
+    post_delete.connect(refresh_home_feed, sender=model, dispatch_uid=f"home_feed_delete_{model.__name__}")
+
+
+def schedule_suggest_rebuild(sender, **kwargs):
+    """
+    Debounced: a bulk edit triggers one typeahead rebuild, not one per row.
+    """
+    def _schedule():
+        from .tasks import rebuild_suggest_index_task
+        if cache.add("suggest:rebuild_scheduled", 1, timeout=30):
+            rebuild_suggest_index_task.apply_async(countdown=30)
+    transaction.on_commit(_schedule)
+
+
+for model in (SKU, Brand):
+    post_save.connect(schedule_suggest_rebuild, sender=model, dispatch_uid=f"suggest_save_{model.__name__}")
+    post_delete.connect(schedule_suggest_rebuild, sender=model, dispatch_uid=f"suggest_delete_{model.__name__}")
+
+
+def reindex_sku(sender, instance, **kwargs):
+    transaction.on_commit(lambda: ProductSearch.reindex(SKU.objects.filter(pk=instance.pk)))
+
+
+def reindex_related_skus(sender, instance, created=False, **kwargs):
+    # A new brand/category has no SKUs yet; renames re-weight every SKU under it
+    if created:
+        return
+    field = 'brand' if sender is Brand else 'category'
+    transaction.on_commit(lambda: ProductSearch.reindex(SKU.objects.filter(**{field: instance})))
+
+
+post_save.connect(reindex_sku, sender=SKU, dispatch_uid="search_reindex_sku")
+for model in (Brand, Category):
+    post_save.connect(reindex_related_skus, sender=model, dispatch_uid=f"search_reindex_{model.__name__}")
+
+
+def bump_catalog_version(sender, **kwargs):
+    CatalogCache.bump()
+
+
+# SKU included: flash-sale responses embed SKU name/image
+for model in (Category, Brand, Banner, FlashSale, SKU):
+    post_save.connect(bump_catalog_version, sender=model, dispatch_uid=f"catalog_version_save_{model.__name__}")
+    post_delete.connect(bump_catalog_version, sender=model, dispatch_uid=f"catalog_version_delete_{model.__name__}")
+
+
+def bump_pricing_version(sender, **kwargs):
+    PricingEngine.bump()
+
+
+for model in (SKU, FlashSale, PriceBook, PriceBookEntry):
+    post_save.connect(bump_pricing_version, sender=model, dispatch_uid=f"pricing_version_save_{model.__name__}")
+    post_delete.connect(bump_pricing_version, sender=model, dispatch_uid=f"pricing_version_delete_{model.__name__}")
+
+
+def schedule_image_variants(sender, instance, **kwargs):
+    if source_of(instance) == (instance.image_variants or {}).get("src", ""):
+        return
+    def _schedule():
+        from .tasks import process_image_variants_task
+        process_image_variants_task.delay(sender._meta.label, str(instance.pk))
+    transaction.on_commit(_schedule)
+
+
+for model in (Category, Product, SKU):
+    post_save.connect(schedule_image_variants, sender=model, dispatch_uid=f"image_variants_{model.__name__}")
+
+
+def detach_category_subtree(sender, instance, **kwargs):
+    if instance.path:
+        CategoryTree.detach(instance.path)
+
+
+post_delete.connect(detach_category_subtree, sender=Category, dispatch_uid="category_tree_detach")
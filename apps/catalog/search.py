@@ -0,0 +1,176 @@
+"""
+Product search: Postgres full text + pg_trgm, index-driven.
+
+- SKU.search_vector is a maintained tsvector, weighted:
+  name (A), brand + search_keywords (B), category (C), sku_code (D).
+  It is written by ProductSearch.reindex(): on SKU save, on brand or
+  category rename, and by `manage.py reindex_product_search`.
+- Queries are expanded with Hindi/Hinglish synonyms ("doodh" -> milk, दूध),
+  and the last word is prefix-matched for search-as-you-type.
+- Typos are caught by trigram word similarity on name and keywords, and on
+  brand/category names. Those are resolved to a literal id list first,
+  against their own small tables.
+- Each OR branch has its own index: GIN on search_vector, trigram GIN on
+  name/search_keywords, and btree on brand_id/category_id. The planner can
+  then combine them with a BitmapOr. A subquery inside the OR would force a
+  filter over every SKU row, so the brand/category ids are passed as literals.
+  pg_trgm comes from migration 0002.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db.models import F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Brand, Category, SKU
+
+MAX_TERMS = 8
+MAX_FUZZY_IDS = 50  # brand/category ids per query (keeps the literal IN list short)
+# \w alone splits Devanagari at vowel signs (दूध -> द, ध); add the block minus the dandas
+TOKEN_RE = re.compile(r"[\w\u0900-\u0963\u0966-\u097F]+")
+
+# Equivalence groups: any member finds the others
+SYNONYM_GROUPS = [
+    ["milk", "doodh", "dudh", "दूध"],
+    ["curd", "dahi", "yogurt", "दही"],
+    ["butter", "makhan", "makkhan", "मक्खन"],
+    ["ghee", "घी"],
+    ["paneer", "cottage cheese", "पनीर"],
+    ["egg", "eggs", "anda", "ande", "अंडा"],
+    ["potato", "aloo", "alu", "आलू"],
+    ["onion", "pyaz", "pyaaz", "kanda", "प्याज"],
+    ["tomato", "tamatar", "टमाटर"],
+    ["okra", "bhindi", "lady finger"],
+    ["cauliflower", "gobi", "gobhi"],
+    ["spinach", "palak", "पालक"],
+    ["coriander", "dhania", "dhaniya", "cilantro"],
+    ["chilli", "mirch", "mirchi"],
+    ["ginger", "adrak"],
+    ["garlic", "lehsun", "lahsun"],
+    ["flour", "atta", "आटा"],
+    ["rice", "chawal", "चावल"],
+    ["lentils", "dal", "daal", "दाल"],
+    ["chickpea", "chana", "chole"],
+    ["semolina", "suji", "sooji", "rava"],
+    ["sugar", "cheeni", "chini", "shakkar", "चीनी"],
+    ["salt", "namak", "नमक"],
+    ["oil", "tel", "तेल"],
+    ["tea", "chai", "चाय"],
+    ["turmeric", "haldi"],
+    ["cumin", "jeera", "jira"],
+    ["bread", "pav", "double roti"],
+    ["biscuit", "biscuits", "cookies"],
+]
+
+SYNONYMS = {term: group for group in SYNONYM_GROUPS for term in group}
+
+
+def search_config():
+    # 'simple': no English stemming of transliterated Hindi words
+    return getattr(settings, 'SEARCH_CONFIG', 'simple')
+
+
+def _tokens(text):
+    return TOKEN_RE.findall((text or "").casefold())[:MAX_TERMS]
+
+
+def _phrase(term, prefix=False):
+    words = _tokens(term)
+    if prefix and len(words) == 1:
+        return f"{words[0]}:*"
+    return " <-> ".join(words)
+
+
+def build_tsquery(text):
+    """
+    "aloo bhuj" -> "(aloo | potato | alu | आलू) & bhuj:*"
+    Tokens are word characters only (TOKEN_RE), so nothing here can break tsquery syntax.
+    """
+    tokens = _tokens(text)
+    clauses = []
+    for i, token in enumerate(tokens):
+        is_last = i == len(tokens) - 1
+        alternatives = [_phrase(token, prefix=is_last)]
+        alternatives += [_phrase(s) for s in SYNONYMS.get(token, ()) if s != token]
+        clauses.append(alternatives[0] if len(alternatives) == 1 else f"({' | '.join(alternatives)})")
+    return " & ".join(clauses)
+
+
+class ProductSearch:
+
+    @staticmethod
+    def vector():
+        config = search_config()
+        brand = Brand.objects.filter(pk=OuterRef('brand_id')).values('name')[:1]
+        category = Category.objects.filter(pk=OuterRef('category_id')).values('name')[:1]
+        return (
+            SearchVector('name', weight='A', config=config)
+            + SearchVector(Coalesce(Subquery(brand), Value('')), weight='B', config=config)
+            + SearchVector('search_keywords', weight='B', config=config)
+            + SearchVector(Coalesce(Subquery(category), Value('')), weight='C', config=config)
+            + SearchVector('sku_code', weight='D', config=config)
+        )
+
+    @staticmethod
+    def reindex(queryset=None):
+        """
+        One UPDATE; no signals fire, so this can be called from receivers.
+        """
+        queryset = SKU.objects.all() if queryset is None else queryset
+        return queryset.update(search_vector=ProductSearch.vector())
+
+    @staticmethod
+    def search(queryset, text, warehouse_id=None):
+        tsquery = build_tsquery(text)
+        if not tsquery:
+            return queryset.none()
+        query = SearchQuery(tsquery, search_type='raw', config=search_config())
+        raw = " ".join(_tokens(text))
+        threshold = getattr(settings, 'SEARCH_TRIGRAM_THRESHOLD', 0.4)
+
+        # Typo tolerance on the small tables first, materialised so the SKU query
+        # gets a literal brand_id/category_id IN (index-backed) rather than a subquery
+        brand_ids = list(Brand.objects.annotate(sim=TrigramWordSimilarity(raw, 'name')).filter(
+            is_active=True, sim__gte=threshold
+        ).order_by('-sim').values_list('id', flat=True)[:MAX_FUZZY_IDS])
+        category_ids = list(Category.objects.annotate(sim=TrigramWordSimilarity(raw, 'name')).filter(
+            is_active=True, sim__gte=threshold
+        ).order_by('-sim').values_list('id', flat=True)[:MAX_FUZZY_IDS])
+
+        matches = (
+            Q(search_vector=query)
+            | Q(name__trigram_word_similar=raw)
+            | Q(search_keywords__trigram_word_similar=raw)
+        )
+        if brand_ids:
+            matches |= Q(brand_id__in=brand_ids)
+        if category_ids:
+            matches |= Q(category_id__in=category_ids)
+        queryset = queryset.filter(matches)
+
+        if warehouse_id:
+            from apps.catalog.home_feed import in_stock_sku_ids
+            queryset = queryset.filter(id__in=in_stock_sku_ids(warehouse_id))
+
+        # Exact/prefix term hits dominate; trigram similarity orders the fuzzy tail
+        return queryset.annotate(
+            rank=SearchRank(F('search_vector'), query, weights=[0.1, 0.2, 0.4, 1.0])
+            + TrigramWordSimilarity(raw, 'name')
+        ).order_by('-rank', 'id')
+
+
+class RankedSearchFilter(BaseFilterBackend):
+    """
+    DRF backend for ?search=: ranked FTS/trigram search, limited to SKUs in
+    stock when the request names a warehouse (?warehouse_id= or ?lat=&lng=).
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+        from apps.warehouse.utils.warehouse_selector import WarehouseSelector
+        return ProductSearch.search(queryset, text, warehouse_id=WarehouseSelector.warehouse_id_from_request(request))
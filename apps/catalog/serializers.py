@@ -1,14 +1,65 @@
 from rest_framework import serializers
-from .models import Category, Product
+from .models import Category, Product, Brand, SKU
+from .images import srcset
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    image_variants -> {"src", "width", "height", "srcset": {"avif": "...", "webp": "..."}},
+    or None until the variants are built (clients fall back to the original).
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'image_variants')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return srcset(value)
 
 class CategorySerializer(serializers.ModelSerializer):
+    images = ImageVariantsField()
+
     class Meta:
         model = Category
-        fields = ['id', 'name', 'slug', 'image', 'parent']
+        fields = ['id', 'name', 'slug', 'image', 'images', 'parent', 'path', 'depth']
 
 class ProductSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
-    
+    images = ImageVariantsField()
+
     class Meta:
         model = Product
-        fields = ['id', 'name', 'slug', 'category', 'category_name', 'description', 'base_price', 'image', 'is_active']
\ No newline at end of file
+        fields = ['id', 'name', 'slug', 'category', 'category_name', 'description', 'base_price', 'image', 'images', 'is_active']
+
+class BrandSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Brand
+        fields = ['id', 'name', 'slug', 'logo_url']
+
+class SKUSerializer(serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.name', read_only=True, default=None)
+    brand_name = serializers.CharField(source='brand.name', read_only=True, default=None)
+    images = ImageVariantsField()
+
+    class Meta:
+        model = SKU
+        fields = [
+            'id', 'sku_code', 'name', 'description', 'unit', 'sale_price', 'image_url', 'images',
+            'category', 'category_name', 'brand', 'brand_name',
+            'max_order_qty', 'min_order_qty', 'is_featured', 'is_returnable'
+        ]
+
+# .values() projection behind ProductCardSerializer
+CARD_FIELDS = ('id', 'sku_code', 'name', 'unit', 'sale_price', 'image_url', 'image_variants', 'brand__name')
+
+class ProductCardSerializer(serializers.Serializer):
+    """
+    Feed/listing tile. Fed from a CARD_FIELDS .values() projection, no model instances.
+    """
+    id = serializers.UUIDField()
+    sku_code = serializers.CharField()
+    name = serializers.CharField()
+    unit = serializers.CharField()
+    sale_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    image_url = serializers.CharField(allow_null=True)
+    images = ImageVariantsField()
+    brand_name = serializers.CharField(source='brand__name', allow_null=True)
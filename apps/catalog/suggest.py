@@ -0,0 +1,214 @@
+"""
+Typeahead suggestions from an in-memory prefix index.
+
+The index is a sorted array of normalised terms. A product gets one term per
+word start, so "mil" finds "Amul Taaza Milk". Brands and search_keywords
+get terms too. A prefix lookup is two bisects plus a top-k by popularity,
+where popularity is units sold recently. Top-k lists for short prefixes
+(1-3 chars, the noisiest and widest keystrokes) are precomputed, so no
+lookup scans more than the slice under a 4+ character prefix.
+
+rebuild_suggest_index_task builds the index off the request path and
+stores it compressed in Redis with a version number. Each web process
+checks that version at most every SUGGEST_REFRESH_SECONDS and swaps in the
+new index from a background thread. Requests always read whatever index
+is in memory and never touch Postgres.
+"""
+import bisect
+import heapq
+import json
+import logging
+import threading
+import time
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from .models import Brand, SKU
+
+logger = logging.getLogger(__name__)
+
+INDEX_KEY = "suggest:index"
+VERSION_KEY = "suggest:version"
+HOT_PREFIX_LENGTHS = (1, 2, 3)
+MAX_LIMIT = 10
+
+
+def normalize(text):
+    return " ".join((text or "").casefold().split())
+
+
+def _word_starts(text):
+    """
+    "amul taaza milk" -> ["amul taaza milk", "taaza milk", "milk"]
+    """
+    words = normalize(text.replace(",", " ")).split(" ")
+    return [" ".join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+class PrefixIndex:
+    """
+    terms/refs are parallel sorted arrays; refs point into `items`
+    ({"text", "type", "sku_code"?}) and `scores`.
+    """
+
+    def __init__(self, terms, refs, items, scores, hot=None):
+        self.terms = terms
+        self.refs = refs
+        self.items = items
+        self.scores = scores
+        self.hot = hot if hot is not None else self._precompute_hot()
+
+    @classmethod
+    def from_entries(cls, entries, items, scores):
+        """
+        entries: iterable of (term, ref)
+        """
+        entries = sorted(set(entries))
+        return cls([t for t, _ in entries], [r for _, r in entries], items, scores)
+
+    def _top(self, refs, limit):
+        return heapq.nlargest(limit, set(refs), key=lambda r: (self.scores[r], -r))
+
+    def _precompute_hot(self):
+        buckets = {}
+        for term, ref in zip(self.terms, self.refs):
+            for n in HOT_PREFIX_LENGTHS:
+                if len(term) >= n:
+                    buckets.setdefault(term[:n], []).append(ref)
+        return {prefix: self._top(refs, MAX_LIMIT) for prefix, refs in buckets.items()}
+
+    def lookup(self, prefix, limit=MAX_LIMIT):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        limit = min(limit, MAX_LIMIT)
+        if prefix in self.hot:
+            refs = self.hot[prefix][:limit]
+        else:
+            lo = bisect.bisect_left(self.terms, prefix)
+            hi = bisect.bisect_left(self.terms, prefix + "\uffff", lo)
+            refs = self._top(self.refs[lo:hi], limit)
+        return [self.items[r] for r in refs]
+
+    # ------------------------------------------------------------------
+    # Wire format (Redis)
+    # ------------------------------------------------------------------
+    def dumps(self):
+        raw = json.dumps({
+            "terms": self.terms, "refs": self.refs, "items": self.items,
+            "scores": self.scores, "hot": self.hot,
+        }, separators=(",", ":"))
+        return zlib.compress(raw.encode())
+
+    @classmethod
+    def loads(cls, blob):
+        data = json.loads(zlib.decompress(blob))
+        return cls(data["terms"], data["refs"], data["items"], data["scores"], data["hot"])
+
+    # ------------------------------------------------------------------
+    # Build (worker side)
+    # ------------------------------------------------------------------
+    @classmethod
+    def build(cls):
+        days = getattr(settings, 'SUGGEST_POPULARITY_DAYS', 30)
+        from apps.orders.models import OrderItem
+        sold = dict(
+            OrderItem.objects.filter(order__created_at__gte=timezone.now() - timedelta(days=days))
+            .values('product_id').annotate(units=Sum('quantity')).values_list('product_id', 'units')
+        )
+
+        items, scores, entries = [], [], []
+        brand_scores = {}
+        for sku in SKU.objects.filter(is_active=True).values('id', 'sku_code', 'name', 'brand_id', 'search_keywords').iterator():
+            units = sold.get(sku['id'], 0)
+            ref = len(items)
+            items.append({"text": sku['name'], "type": "product", "sku_code": sku['sku_code']})
+            scores.append(units)
+            entries.extend((term, ref) for term in _word_starts(sku['name']))
+            for keyword in filter(None, normalize(sku['search_keywords'].replace(",", " ")).split(" ")):
+                entries.append((keyword, ref))
+            if sku['brand_id']:
+                brand_scores[sku['brand_id']] = brand_scores.get(sku['brand_id'], 0) + units
+
+        for brand in Brand.objects.filter(is_active=True).values('id', 'name', 'slug'):
+            ref = len(items)
+            items.append({"text": brand['name'], "type": "brand", "slug": brand['slug']})
+            # Brands rank on the sales of their whole range
+            scores.append(brand_scores.get(brand['id'], 0))
+            entries.extend((term, ref) for term in _word_starts(brand['name']))
+
+        return cls.from_entries(entries, items, scores)
+
+
+class SuggestEngine:
+    """
+    Per-process holder. Swaps in new index versions in the background.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._loading = False
+
+    @staticmethod
+    def _conn():
+        return get_redis_connection("default")
+
+    def _load(self):
+        try:
+            conn = self._conn()
+            version = conn.get(VERSION_KEY)
+            if version is not None and version == self.version:
+                return
+            blob = conn.get(INDEX_KEY)
+            if blob is None:
+                # Nothing published yet (fresh Redis): build once here and publish it
+                index = PrefixIndex.build()
+                version = publish_index(index)
+            else:
+                index = PrefixIndex.loads(blob)
+            self.index, self.version = index, version
+        except Exception as e:
+            logger.warning(f"Suggest index load failed: {e}")
+        finally:
+            self._loading = False
+
+    def _maybe_refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < getattr(settings, 'SUGGEST_REFRESH_SECONDS', 30):
+            return
+        with self._lock:
+            if self._loading:
+                return
+            self._checked_at = now
+            self._loading = True
+        if self.index is None:
+            # Cold process: the first request has to wait for an index
+            self._load()
+        else:
+            threading.Thread(target=self._load, daemon=True).start()
+
+    def suggest(self, query, limit=MAX_LIMIT):
+        self._maybe_refresh()
+        if self.index is None:
+            return []
+        return self.index.lookup(query, limit)
+
+
+def publish_index(index):
+    conn = get_redis_connection("default")
+    pipe = conn.pipeline()
+    pipe.set(INDEX_KEY, index.dumps())
+    pipe.incr(VERSION_KEY)
+    _, version = pipe.execute()
+    return str(version).encode()
+
+
+suggest_engine = SuggestEngine()
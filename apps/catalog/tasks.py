@@ -0,0 +1,92 @@
+from celery import shared_task
+from .home_feed import HomeFeed
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def rebuild_home_feed_task():
+    """
+    Rebuilds the home feed blobs marked dirty since the last run (debounced by HomeFeed.mark_dirty).
+    """
+    rebuilt = HomeFeed.rebuild_dirty()
+    if rebuilt:
+        logger.info(f"Home feed: rebuilt {rebuilt} sections")
+    return rebuilt
+
+@shared_task
+def rebuild_suggest_index_task():
+    """
+    Rebuilds the typeahead index and publishes it; web processes pick it up on their next version check.
+    """
+    from .suggest import PrefixIndex, publish_index
+    index = PrefixIndex.build()
+    version = publish_index(index)
+    logger.info(f"Suggest index v{int(version)}: {len(index.terms)} terms, {len(index.items)} items")
+
+@shared_task
+def flush_flash_sales_task():
+    """
+    Writes the Redis flash-sale counters back to sold_quantity and retires ended sales.
+    """
+    from .flash_sales import FlashSaleEngine
+    written = FlashSaleEngine.flush()
+    expired = FlashSaleEngine.expire()
+    if written or expired:
+        logger.info(f"Flash sales: {written} units written back, {expired} expired")
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def process_image_variants_task(self, model_label, pk):
+    """
+    Builds the WebP/AVIF variants for one Category / Product / SKU image (images.py).
+    """
+    from django.apps import apps
+    from PIL import Image
+    from .cache import CatalogCache
+    from .home_feed import HomeFeed, WAREHOUSE_SECTIONS
+    from .images import ImagePipeline
+
+    instance = apps.get_model(model_label).objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    try:
+        meta = ImagePipeline.process(instance)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        # Unreadable / oversized (bytes or pixels) / not an image: retrying won't help
+        logger.warning(f"Image variants for {model_label} {pk} skipped: {e}")
+        return
+    except Exception as e:
+        logger.exception(f"Image variants for {model_label} {pk} failed")
+        raise self.retry(exc=e)
+
+    if meta is not None:
+        # Cached catalog responses and SKU feed blobs embed the srcset
+        CatalogCache.bump()
+        if model_label == 'catalog.SKU':
+            HomeFeed.mark_dirty(WAREHOUSE_SECTIONS)
+
+@shared_task
+def import_skus_task(job_id):
+    """
+    Runs one SKUImportJob (see importer.py). Progress is written to the job row per chunk.
+    """
+    from django.utils import timezone
+    from .importer import SKUImporter
+    from .models import SKUImportJob
+
+    updated = SKUImportJob.objects.filter(pk=job_id, status=SKUImportJob.Status.PENDING).update(
+        status=SKUImportJob.Status.RUNNING
+    )
+    if not updated:
+        # Duplicate delivery / already running
+        return
+
+    job = SKUImportJob.objects.get(pk=job_id)
+    try:
+        SKUImporter(job).run()
+        logger.info(f"SKU import {job_id}: {job.upserted_rows} upserted, {job.error_rows} rejected")
+    except Exception as e:
+        logger.exception(f"SKU import {job_id} failed")
+        SKUImportJob.objects.filter(pk=job_id).update(
+            status=SKUImportJob.Status.FAILED, last_error=str(e)[:2000], finished_at=timezone.now()
+        )
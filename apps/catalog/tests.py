@@ -79,3 +79,384 @@ class SKUViewSetTests(APITestCase):
         resp = self.client.get(url)
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
         self.assertEqual(resp.data["sku_code"], self.active_sku.sku_code)
+
+
+class ProductFeedTests(APITestCase):
+    def setUp(self):
+        self.cat = Category.objects.create(name="Snacks", is_active=True)
+        self.other = Category.objects.create(name="Bakery", is_active=True)
+        for i in range(5):
+            SKU.objects.create(
+                sku_code=f"CHIPS-{i}", name=f"Chips {i}", category=self.cat,
+                sale_price=f"{10 + i}.00", cost_price="5.00", is_active=True,
+            )
+        SKU.objects.create(sku_code="BREAD-1", name="Bread", category=self.other, sale_price="30.00", is_active=True)
+
+    def _walk(self, params):
+        url = reverse("api_products_feed")
+        codes, cursor = [], None
+        while True:
+            query = dict(params, page_size=2, **({"cursor": cursor} if cursor else {}))
+            resp = self.client.get(url, query)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            codes += [p["sku_code"] for p in resp.data["results"]]
+            if not resp.data["next"]:
+                return codes
+            cursor = resp.data["next"].split("cursor=")[1].split("&")[0]
+
+    def test_price_sort_pages_through_category_without_gaps(self):
+        codes = self._walk({"sort": "price_desc", "category": self.cat.slug})
+        self.assertEqual(codes, [f"CHIPS-{i}" for i in reversed(range(5))])
+
+    def test_cursor_from_another_sort_is_rejected(self):
+        url = reverse("api_products_feed")
+        first = self.client.get(url, {"sort": "price_asc", "page_size": 1})
+        cursor = first.data["next"].split("cursor=")[1]
+        resp = self.client.get(url, {"sort": "newest", "cursor": cursor})
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class HomeFeedTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.catalog.models import Banner, FlashSale
+        self.now = timezone.now()
+        Banner.objects.create(title="Diwali", image_url="https://cdn.example.com/b.png", target_url="/offers")
+        self.sku = SKU.objects.create(sku_code="GHEE-1L", name="Ghee 1L", sale_price="600.00", is_featured=True)
+        self.sale = FlashSale.objects.create(
+            sku=self.sku, discounted_price="499.00",
+            start_time=self.now - timedelta(minutes=5), end_time=self.now + timedelta(minutes=30),
+        )
+
+    def test_rendered_body_splices_section_blobs(self):
+        import json
+        from unittest import mock
+        from apps.catalog.home_feed import HomeFeed
+
+        with mock.patch.object(HomeFeed, "sections", return_value=['{"type":"banners","items":[]}']):
+            body = json.loads(HomeFeed.render(warehouse_id=None))
+        self.assertEqual(body, {"warehouse_id": None, "sections": [{"type": "banners", "items": []}]})
+
+    def test_flash_sale_blob_expires_when_the_sale_ends(self):
+        from unittest import mock
+        from apps.catalog.home_feed import HomeFeed
+
+        with mock.patch("apps.catalog.home_feed.in_stock_sku_ids", return_value=[self.sku.id]):
+            payload, expires_in = HomeFeed._build_flash_sales("wh-1")
+        self.assertEqual([i["sku_id"] for i in payload["items"]], [self.sku.id])
+        self.assertTrue(0 < expires_in <= 30 * 60)
+
+    def test_flash_sale_sold_out_in_redis_leaves_the_blob(self):
+        from unittest import mock
+        from django_redis import get_redis_connection
+        from apps.catalog.flash_sales import REMAINING
+        from apps.catalog.home_feed import HomeFeed
+
+        redis = get_redis_connection("default")
+        redis.set(REMAINING.format(self.sale.id), 0)
+        self.addCleanup(redis.delete, REMAINING.format(self.sale.id))
+        with mock.patch("apps.catalog.home_feed.in_stock_sku_ids", return_value=[self.sku.id]):
+            payload, _ = HomeFeed._build_flash_sales("wh-1")
+        self.assertEqual(payload["items"], [])
+
+    def test_unknown_warehouse_falls_back_to_global_sections(self):
+        from unittest import mock
+        from django.core.cache import cache
+        from apps.catalog.home_feed import HomeFeed
+        from apps.warehouse.models import Warehouse
+
+        cache.delete("warehouse:active_ids")
+        closed = Warehouse.objects.create(name="Closed", code="WH-CLOSED", address="x", is_active=False)
+        with mock.patch.object(HomeFeed, "render", return_value='{"warehouse_id":null,"sections":[]}') as render:
+            for value in ("abc", "999999", str(closed.id)):
+                response = self.client.get(reverse("api_home_feed"), {"warehouse_id": value})
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual({c.kwargs["warehouse_id"] for c in render.call_args_list}, {None})
+
+
+class PrefixIndexTests(TestCase):
+    def setUp(self):
+        from apps.catalog.suggest import PrefixIndex, _word_starts
+        items = [{"text": "Amul Taaza Milk"}, {"text": "Milky Mist Paneer"}, {"text": "Amul"}]
+        entries = [(term, ref) for ref, item in enumerate(items) for term in _word_starts(item["text"])]
+        self.index = PrefixIndex.from_entries(entries, items, scores=[5, 9, 20])
+
+    def test_matches_any_word_start_ranked_by_popularity(self):
+        self.assertEqual(
+            [i["text"] for i in self.index.lookup("MIL")],
+            ["Milky Mist Paneer", "Amul Taaza Milk"],
+        )
+        self.assertEqual([i["text"] for i in self.index.lookup("amul t")], ["Amul Taaza Milk"])
+
+    def test_single_character_is_served_from_the_hot_lists(self):
+        self.assertIn("m", self.index.hot)
+        self.assertEqual(self.index.lookup("M"), [self.index.items[r] for r in self.index.hot["m"]])
+
+    def test_survives_the_redis_wire_format(self):
+        from apps.catalog.suggest import PrefixIndex
+        copy = PrefixIndex.loads(self.index.dumps())
+        self.assertEqual(copy.lookup("am", limit=1), [{"text": "Amul"}])
+
+
+class SearchQueryTests(TestCase):
+    def test_hinglish_terms_expand_and_last_word_is_prefix(self):
+        from apps.catalog.search import build_tsquery
+        self.assertEqual(build_tsquery("Doodh amu"), "(doodh | milk | dudh | दूध) & amu:*")
+
+    def test_multi_word_synonyms_become_phrases(self):
+        from apps.catalog.search import build_tsquery
+        self.assertEqual(build_tsquery("paneer"), "(paneer:* | cottage <-> cheese | पनीर)")
+
+    def test_punctuation_cannot_break_the_query(self):
+        from apps.catalog.search import build_tsquery
+        self.assertEqual(build_tsquery("milk & (!"), "(milk:* | doodh | dudh | दूध)")
+        self.assertEqual(build_tsquery("!!"), "")
+
+    def test_fuzzy_brand_matches_are_literal_ids_not_subqueries(self):
+        from apps.catalog.search import ProductSearch
+        amul = Brand.objects.create(name="Amul", is_active=True)
+        SKU.objects.create(sku_code="BTR-100", name="Butter 100g", sale_price="56.00", brand=amul)
+
+        queryset = ProductSearch.search(SKU.objects.all(), "amull")
+        sql = str(queryset.query)
+
+        self.assertNotIn('"catalog_brand"', sql)
+        self.assertEqual([s.sku_code for s in queryset], ["BTR-100"])
+
+
+class CatalogCacheTests(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.cat = Category.objects.create(name="Fruits", is_active=True)
+
+    def test_etag_revalidation_and_version_bump(self):
+        url = reverse("category-list")
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        etag = first["ETag"]
+
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Vegetables", is_active=True)
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(changed["ETag"], etag)
+
+
+class CategoryTreeTests(TestCase):
+    def setUp(self):
+        self.dairy = Category.objects.create(name="Dairy")
+        self.milk = Category.objects.create(name="Milk", parent=self.dairy)
+        self.toned = Category.objects.create(name="Toned Milk", parent=self.milk)
+        self.sku = SKU.objects.create(sku_code="TONED-500", name="Toned Milk 500ml", category=self.toned)
+
+    def test_paths_follow_parents_and_subtree_is_a_prefix(self):
+        self.assertEqual(self.toned.path, f"/{self.dairy.pk}/{self.milk.pk}/{self.toned.pk}/")
+        self.assertEqual(self.toned.depth, 2)
+        self.assertTrue(SKU.objects.filter(category_path__startswith=self.dairy.path).exists())
+
+    def test_move_rewrites_descendants_and_sku_copies(self):
+        fresh = Category.objects.create(name="Fresh")
+        self.milk.parent = fresh
+        self.milk.save()
+
+        self.toned.refresh_from_db()
+        self.sku.refresh_from_db()
+        self.assertEqual(self.toned.path, f"/{fresh.pk}/{self.milk.pk}/{self.toned.pk}/")
+        self.assertEqual(self.sku.category_path, self.toned.path)
+
+    def test_cannot_move_under_own_subtree(self):
+        from django.core.exceptions import ValidationError
+        self.dairy.parent = self.toned
+        with self.assertRaises(ValidationError):
+            self.dairy.save()
+
+
+class SKUImportTests(TestCase):
+    def _run(self, content):
+        from django.core.files.base import ContentFile
+        from apps.catalog.importer import SKUImporter
+        from apps.catalog.models import SKUImportJob
+        job = SKUImportJob(status=SKUImportJob.Status.RUNNING)
+        job.file.save("skus.csv", ContentFile(content.encode()), save=False)
+        job.save()
+        return SKUImporter(job).run()
+
+    def test_upserts_valid_rows_and_reports_bad_ones(self):
+        cat = Category.objects.create(name="Snacks")
+        SKU.objects.create(sku_code="CHIPS-1", name="Old Chips", sale_price="5.00", unit="pack")
+
+        job = self._run(
+            "SKU Code,Name,Sale Price,Category,Brand\n"
+            f"CHIPS-1,Salted Chips,20,{cat.slug},Lays\n"
+            "CHIPS-2,Masala Chips,abc,,\n"
+            f"CHIPS-3,Cream Chips,25.5,{cat.slug},lays\n"
+        )
+
+        self.assertEqual((job.processed_rows, job.upserted_rows, job.error_rows), (3, 2, 1))
+        chips = SKU.objects.get(sku_code="CHIPS-1")
+        self.assertEqual((chips.name, str(chips.sale_price), chips.unit), ("Salted Chips", "20.00", "pack"))
+        self.assertEqual(chips.category_path, cat.path)
+        self.assertEqual(SKU.objects.get(sku_code="CHIPS-3").brand_id, chips.brand_id)
+        self.assertIn(b"sale_price is not a number", job.error_file.read())
+
+    def test_blank_cells_keep_existing_values(self):
+        SKU.objects.create(sku_code="SODA-1", name="Soda", sale_price="40.00", tax_rate="12.00", is_active=True)
+        job = self._run(
+            "sku_code,name,sale_price,tax_rate,is_active\n"
+            "SODA-1,Soda 750ml,,,\n"
+            "SODA-2,Lime Soda,,5,yes\n"
+            "SODA-3,Ginger Soda,45,,\n"
+        )
+
+        self.assertEqual((job.upserted_rows, job.error_rows), (2, 1))
+        soda = SKU.objects.get(sku_code="SODA-1")
+        self.assertEqual((soda.name, str(soda.sale_price), str(soda.tax_rate), soda.is_active),
+                         ("Soda 750ml", "40.00", "12.00", True))
+        self.assertEqual(str(SKU.objects.get(sku_code="SODA-3").sale_price), "45.00")
+        self.assertFalse(SKU.objects.filter(sku_code="SODA-2").exists())
+        self.assertIn(b"sale_price is required for new SKUs", job.error_file.read())
+
+
+class FlashSaleEngineTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from django_redis import get_redis_connection
+        from apps.catalog.models import FlashSale
+        now = timezone.now()
+        sku = SKU.objects.create(sku_code="MANGO-1KG", name="Alphonso 1kg", sale_price="300.00")
+        self.sale = FlashSale.objects.create(
+            sku=sku, discounted_price="199.00", total_quantity=3, max_per_user=2,
+            start_time=now - timedelta(minutes=1), end_time=now + timedelta(minutes=10),
+        )
+        self.redis = get_redis_connection("default")
+        self.addCleanup(lambda: self.redis.delete(*self.redis.keys(f"flash:{self.sale.id}:*"), "flash:dirty",
+                                                  *(f"flash:order:ORD-{n}" for n in range(1, 5))))
+
+    def test_counters_enforce_stock_and_per_user_limit(self):
+        from apps.catalog.flash_sales import FlashSaleEngine
+        from apps.utils.exceptions import BusinessLogicException
+
+        self.assertEqual(FlashSaleEngine.reserve(self.sale, 1, 2, "ORD-1"), 1)
+        with self.assertRaisesMessage(BusinessLogicException, "limit is 2"):
+            FlashSaleEngine.reserve(self.sale, 1, 1, "ORD-2")
+        self.assertEqual(FlashSaleEngine.reserve(self.sale, 2, 1, "ORD-3"), 0)
+        with self.assertRaisesMessage(BusinessLogicException, "sold out"):
+            FlashSaleEngine.reserve(self.sale, 3, 1, "ORD-4")
+
+        FlashSaleEngine.release_order("ORD-1", 1)
+        self.assertEqual(FlashSaleEngine.reserve(self.sale, 1, 2, "ORD-2"), 0)
+
+    def test_flush_writes_net_units_back(self):
+        from apps.catalog.flash_sales import FlashSaleEngine
+
+        FlashSaleEngine.reserve(self.sale, 1, 2, "ORD-1")
+        FlashSaleEngine.reserve(self.sale, 2, 1, "ORD-2")
+        FlashSaleEngine.release_order("ORD-2", 2)
+
+        self.assertEqual(FlashSaleEngine.flush(), 2)
+        self.sale.refresh_from_db()
+        self.assertEqual(self.sale.sold_quantity, 2)
+        self.assertEqual(FlashSaleEngine.flush(), 0)
+
+
+class PriceTableTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.catalog.models import FlashSale, PriceBook, PriceBookEntry
+        now = timezone.now()
+        self.ghee = SKU.objects.create(sku_code="GHEE-500", name="Ghee 500ml", sale_price="100.00", tax_rate="5.00")
+        self.atta = SKU.objects.create(sku_code="ATTA-5KG", name="Atta 5kg", sale_price="50.00")
+        base_book = PriceBook.objects.create(name="Everyday", priority=0)
+        promo_book = PriceBook.objects.create(name="Weekend", priority=1)
+        PriceBookEntry.objects.create(price_book=base_book, sku=self.ghee, price="90.00")
+        PriceBookEntry.objects.create(price_book=promo_book, sku=self.ghee, price="85.00")
+        self.sale = FlashSale.objects.create(
+            sku=self.atta, discounted_price="40.00",
+            start_time=now - timedelta(minutes=1), end_time=now + timedelta(minutes=10),
+        )
+
+    def test_quote_resolves_books_flash_sales_and_tax(self):
+        import uuid
+        from decimal import Decimal
+        from apps.catalog.pricing import PriceTable, SKUColumns
+
+        missing = uuid.uuid4()
+        quote = PriceTable(SKUColumns(), warehouse_id=None).quote([
+            {"sku_id": self.ghee.id, "quantity": 2},
+            {"sku_id": str(self.atta.id), "quantity": 1},
+            {"sku_id": missing, "quantity": 1},
+        ])
+
+        ghee, atta = quote["lines"]
+        self.assertEqual((ghee["unit_price"], ghee["price_source"]), (Decimal("85.00"), "price_book"))
+        self.assertEqual(ghee["tax_amount"], Decimal("8.10"))  # 170 * 5 / 105
+        self.assertEqual((atta["unit_price"], atta["flash_sale_id"]), (Decimal("40.00"), self.sale.id))
+        self.assertEqual(quote["subtotal"], Decimal("210.00"))
+        self.assertEqual(quote["savings"], Decimal("40.00"))
+        self.assertEqual(quote["unavailable"], [missing])
+        self.assertEqual(quote["flash_sales"][self.sale.id].max_per_user, 2)
+
+    def test_engine_keeps_a_bounded_lru_of_tables(self):
+        from unittest import mock
+        from apps.catalog.pricing import PricingEngine
+
+        engine = PricingEngine()
+        with mock.patch.object(PricingEngine, "_version", return_value=b"1"), self.settings(PRICING_MAX_TABLES=2):
+            engine.table(1)
+            engine.table(2)
+            engine.table(1)  # hit: 2 is now least recently used
+            engine.table(3)
+        self.assertEqual(list(engine._tables), ["1", "3"])
+
+    def test_quote_rejects_unknown_warehouse(self):
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+
+        cache.delete("warehouse:active_ids")
+        body = {"items": [{"sku_id": str(self.ghee.id), "quantity": 1}]}
+        for value in ("abc", "999999"):
+            response = APIClient().post(f"{reverse('cart-quote')}?warehouse_id={value}", body, format="json")
+            self.assertEqual(response.status_code, 400)
+
+
+class ImageVariantTests(TestCase):
+    def _png(self, width, height):
+        import io
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new("RGB", (width, height), "orange").save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def test_render_never_upscales_and_names_by_content(self):
+        from django.test import override_settings
+        from apps.catalog.images import ImagePipeline
+
+        with override_settings(IMAGE_VARIANT_WIDTHS=[160, 320, 640]):
+            meta, files = ImagePipeline.render(self._png(400, 200), formats=["webp"])
+            again, _ = ImagePipeline.render(self._png(400, 200), formats=["webp"])
+
+        self.assertEqual(meta["widths"], [160, 320, 400])
+        self.assertEqual((meta["w"], meta["h"]), (400, 200))
+        self.assertEqual(again["key"], meta["key"])
+        self.assertEqual(sorted(files), [f"variants/{meta['key']}/{w}.webp" for w in (160, 320, 400)])
+
+    def test_srcset_urls(self):
+        from django.test import override_settings
+        from apps.catalog.images import srcset
+
+        meta = {"key": "abc", "w": 800, "h": 800, "widths": [160, 320], "formats": ["avif", "webp"]}
+        with override_settings(IMAGE_CDN_BASE_URL="https://cdn.example.com/media/"):
+            images = srcset(meta)
+        self.assertEqual(images["src"], "https://cdn.example.com/media/variants/abc/320.webp")
+        self.assertEqual(
+            images["srcset"]["avif"],
+            "https://cdn.example.com/media/variants/abc/160.avif 160w, https://cdn.example.com/media/variants/abc/320.avif 320w",
+        )
+        self.assertIsNone(srcset({}))
@@ -0,0 +1,106 @@
+"""
+Materialised category paths.
+
+Category.path is "/<root pk>/.../<own pk>/", so "everything under Dairy" is
+one prefix predicate (path LIKE '/3/%') on a varchar_pattern_ops index
+instead of a recursive walk. SKUs carry a copy of their category's path
+(SKU.category_path), so a subtree product listing never joins Category.
+
+Paths are kept current from Category.save() / post_delete. A move
+rewrites the subtree and its SKUs with one UPDATE each.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+
+ROOT = "/"
+
+
+class CategoryTree:
+
+    @staticmethod
+    def path_for(category):
+        from .models import Category
+        parent_path = ROOT
+        if category.parent_id:
+            parent_path = Category.objects.filter(pk=category.parent_id).values_list('path', flat=True).first() or ROOT
+        return f"{parent_path}{category.pk}/"
+
+    @staticmethod
+    @transaction.atomic
+    def place(category):
+        """
+        Called after Category.save(). No-op unless the node is new or moved.
+        """
+        from .models import Category
+        new_path = CategoryTree.path_for(category)
+        old_path = category.path
+        if new_path == old_path:
+            return
+        if old_path and new_path.startswith(old_path):
+            raise ValidationError("A category cannot be moved under its own subtree.")
+
+        depth = new_path.count("/") - 2
+        Category.objects.filter(pk=category.pk).update(path=new_path, depth=depth)
+        category.path, category.depth = new_path, depth
+
+        if old_path:
+            CategoryTree.rewrite_prefix(old_path, new_path, include_self=False)
+
+    @staticmethod
+    def rewrite_prefix(old_prefix, new_prefix, include_self=True):
+        """
+        Re-roots every path under old_prefix (categories and SKU copies).
+        """
+        from .models import Category, SKU
+        depth_delta = new_prefix.count("/") - old_prefix.count("/")
+        rest = Substr('path', len(old_prefix) + 1)
+
+        categories = Category.objects.filter(path__startswith=old_prefix)
+        if not include_self:
+            categories = categories.exclude(path=old_prefix)
+        categories.update(path=Concat(Value(new_prefix), rest), depth=F('depth') + depth_delta)
+
+        SKU.objects.filter(category_path__startswith=old_prefix).update(
+            category_path=Concat(Value(new_prefix), Substr('category_path', len(old_prefix) + 1))
+        )
+
+    @staticmethod
+    def detach(deleted_path):
+        """
+        post_delete: children were SET_NULL by the FK, so the deleted node's
+        children become roots. SKUs directly under it lose their path.
+        """
+        from .models import SKU
+        SKU.objects.filter(category_path=deleted_path).update(category_path="")
+        CategoryTree.rewrite_prefix(deleted_path, ROOT)
+
+    @staticmethod
+    def subtree_path(slug):
+        from .models import Category
+        return Category.objects.filter(slug=slug, is_active=True).values_list('path', flat=True).first()
+
+    @staticmethod
+    def full_tree():
+        """
+        Whole active tree, nested, from one query ordered by path.
+        """
+        from .models import Category
+        nodes, roots = {}, []
+        rows = Category.objects.filter(is_active=True).order_by('depth', 'sort_order', 'name').values(
+            'id', 'name', 'slug', 'icon_url', 'path', 'parent_id'
+        )
+        for row in rows:
+            node = {
+                "id": row['id'], "name": row['name'], "slug": row['slug'],
+                "icon_url": row['icon_url'], "path": row['path'], "children": [],
+            }
+            nodes[row['id']] = node
+            parent = nodes.get(row['parent_id'])
+            if parent is not None:
+                parent["children"].append(node)
+            elif row['parent_id'] is None:
+                roots.append(node)
+            # else: under an inactive parent -> hidden with it
+        return roots
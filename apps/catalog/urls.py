@@ -31,6 +31,7 @@ urlpatterns = [
     
     # Custom Endpoints
     path("import/bulk-csv/", BulkImportSKUView.as_view(), name="bulk-import-csv"),
+    path("import/bulk-csv/<uuid:job_id>/", BulkImportSKUView.as_view(), name="bulk-import-status"),
     path("assistant/chat/", ShoppingAssistantView.as_view(), name="shopping-assistant"),
     path("suggest/", SearchSuggestView.as_view(), name="search-suggest"),
     
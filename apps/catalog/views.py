@@ -1,16 +1,29 @@
 # apps/catalog/views.py
 
-from rest_framework import viewsets, filters, status
-from rest_framework.decorators import api_view, permission_classes
+import time
+
+from rest_framework import viewsets, filters, status, serializers, views
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.parsers import MultiPartParser
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Category, Brand, SKU, Banner, FlashSale
-from .serializers import CategorySerializer, ProductSerializer 
-# Note: Assuming ProductSerializer is the main one. If ProductListSerializer is missing, we use ProductSerializer.
+from apps.utils.pagination import SortedKeysetPagination
+from .models import Category, Brand, SKU, Banner, FlashSale, SKUImportJob
+from .serializers import CategorySerializer, BrandSerializer, SKUSerializer, ProductCardSerializer, ImageVariantsField, CARD_FIELDS
+from .home_feed import HomeFeed
+from .suggest import suggest_engine, MAX_LIMIT
+from .search import RankedSearchFilter
+from .cache import VersionedCacheMixin
+from .tree import CategoryTree
+from .flash_sales import FlashSaleEngine
+from .tasks import import_skus_task
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
@@ -18,9 +31,16 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['name']
     lookup_field = 'slug'
 
-class BrandViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """
+        Whole navigation tree in one response, cached per catalog version.
+        """
+        return self.cached(request, "category:tree", lambda: Response(CategoryTree.full_tree()))
+
+class BrandViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Brand.objects.filter(is_active=True)
-    serializer_class = CategorySerializer # Placeholder, strictly should have BrandSerializer
+    serializer_class = BrandSerializer
     permission_classes = [AllowAny]
 
 class SKUViewSet(viewsets.ReadOnlyModelViewSet):
@@ -29,15 +49,26 @@ class SKUViewSet(viewsets.ReadOnlyModelViewSet):
     Includes filtering by Category, Brand, and Search.
     """
     queryset = SKU.objects.filter(is_active=True).select_related('category', 'brand')
-    serializer_class = ProductSerializer
+    serializer_class = SKUSerializer
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # [PERFORMANCE] Ranked, index-driven search (search.py) instead of icontains scans
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter, filters.OrderingFilter]
     filterset_fields = ['category__slug', 'brand__slug', 'is_featured']
-    search_fields = ['name', 'description', 'sku_code']
     ordering_fields = ['sale_price', 'created_at']
     lookup_field = 'sku_code'
 
-class BannerViewSet(viewsets.ReadOnlyModelViewSet):
+    def get_queryset(self):
+        qs = super().get_queryset()
+        # ?category_tree=<slug>: everything under that category, one indexed prefix predicate
+        slug = self.request.query_params.get('category_tree')
+        if slug:
+            path = CategoryTree.subtree_path(slug)
+            if path is None:
+                return qs.none()
+            qs = qs.filter(category_path__startswith=path)
+        return qs
+
+class BannerViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Banner.objects.filter(is_active=True).order_by('sort_order')
     permission_classes = [AllowAny]
     # Inline serializer to avoid file bloat for simple models
@@ -47,38 +78,140 @@ class BannerViewSet(viewsets.ReadOnlyModelViewSet):
             fields = ['title', 'image_url', 'target_url', 'position', 'bg_gradient']
     serializer_class = BannerSerializer
 
-class FlashSaleViewSet(viewsets.ReadOnlyModelViewSet):
+class FlashSaleViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = FlashSale.objects.filter(is_active=True)
     permission_classes = [AllowAny]
     # Simple serializer
     class FlashSaleSerializer(serializers.ModelSerializer):
         sku_name = serializers.CharField(source='sku.name')
         sku_image = serializers.CharField(source='sku.image_url')
+        sku_images = ImageVariantsField(source='sku.image_variants')
         class Meta:
             model = FlashSale
-            fields = ['sku_id', 'sku_name', 'sku_image', 'discounted_price', 'end_time']
+            fields = ['sku_id', 'sku_name', 'sku_image', 'sku_images', 'discounted_price', 'end_time', 'max_per_user']
     serializer_class = FlashSaleSerializer
 
+    def get_queryset(self):
+        # Live window and not sold out; units sold since the last write-back are enforced in Redis
+        return FlashSaleEngine.live_queryset().select_related('sku')
+
+    def cache_scope(self, name):
+        # Time-bucketed so a sale starting/ending drops in/out without a catalog write
+        bucket = int(time.time()) // settings.FLASH_SALE_LISTING_BUCKET_SECONDS
+        return f"{super().cache_scope(name)}:{bucket}"
+
 class BulkImportSKUView(views.APIView):
-    permission_classes = [IsAuthenticated] # Staff only via permission classes setting
+    """
+    POST multipart `file` (.csv / .xlsx) -> 202 + job id; the import runs in
+    a worker (importer.py). GET <job_id>/ for progress and the error file.
+    """
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
     def post(self, request):
-        return Response({"status": "Imported (Mock)"})
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "file is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not upload.name.lower().endswith(('.csv', '.xlsx')):
+            return Response({"error": "Only .csv and .xlsx files are supported"}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            job = SKUImportJob.objects.create(file=upload, created_by=request.user)
+            transaction.on_commit(lambda: import_skus_task.delay(str(job.id)))
+        return Response(self._payload(job), status=status.HTTP_202_ACCEPTED)
+
+    def get(self, request, job_id=None):
+        job = SKUImportJob.objects.filter(pk=job_id).first() if job_id else None
+        if job is None:
+            return Response({"error": "Import job not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self._payload(job))
+
+    @staticmethod
+    def _payload(job):
+        return {
+            "job_id": str(job.id),
+            "status": job.status,
+            "processed_rows": job.processed_rows,
+            "upserted_rows": job.upserted_rows,
+            "error_rows": job.error_rows,
+            "error_file": job.error_file.url if job.error_file else None,
+            "last_error": job.last_error or None,
+        }
 
 class SearchSuggestView(views.APIView):
+    """
+    Typeahead. Served from the in-process prefix index (suggest.py), no DB.
+    """
     permission_classes = [AllowAny]
     def get(self, request):
         q = request.query_params.get('q', '')
         if len(q) < 2: return Response([])
-        # logic for suggestion
-        return Response([])
+        try:
+            limit = int(request.query_params.get('limit', MAX_LIMIT))
+        except ValueError:
+            limit = MAX_LIMIT
+        return Response(suggest_engine.suggest(q, max(1, limit)))
 
 # --- Stubbed functions for the urls.py imports to work ---
+class ProductFeedPagination(SortedKeysetPagination):
+    # Each sort is backed by sku_feed_newest_idx / sku_feed_price_idx
+    orderings = {
+        "newest": ("-created_at", "-id"),
+        "price_asc": ("sale_price", "id"),
+        "price_desc": ("-sale_price", "-id"),
+    }
+    default_sort = "newest"
+
+
+# Narrow projection: the tile fields plus the sort columns the cursor needs
+FEED_FIELDS = CARD_FIELDS + ('created_at',)
+
+
+def _resolve_slug(model, value):
+    """
+    Slug -> pk with one unique-index lookup, so the feed query filters on
+    category_id / brand_id and stays on the (is_active, category|brand) indexes.
+    """
+    return model.objects.filter(slug=value, is_active=True).values_list('id', flat=True).first()
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_products_cursor_api(request):
-    return Response({"results": []})
+    """
+    Infinite-scroll product feed.
+    ?sort=newest|price_asc|price_desc &category=<slug> &brand=<slug> &cursor=<next> &page_size=
+    Keyset (no OFFSET): page 50 costs the same as page 1.
+    """
+    qs = SKU.objects.filter(is_active=True)
+
+    for param, model, field in (('category', Category, 'category_id'), ('brand', Brand, 'brand_id')):
+        slug = request.query_params.get(param)
+        if not slug:
+            continue
+        pk = _resolve_slug(model, slug)
+        if pk is None:
+            return Response({"next": None, "results": []})
+        qs = qs.filter(**{field: pk})
+
+    paginator = ProductFeedPagination()
+    page = paginator.paginate_queryset(qs.values(*FEED_FIELDS), request)
+    return paginator.get_paginated_response(ProductCardSerializer(page, many=True).data)
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_home_feed_api(request):
-    return Response({"sections": []})
\ No newline at end of file
+    """
+    Home screen in one call: ?warehouse_id=<id> or ?lat=&lng=.
+    Precomputed section blobs (home_feed.py) + the user's "buy again" row.
+    An unknown/inactive warehouse gets the global sections.
+    """
+    from rest_framework.exceptions import ValidationError
+    from apps.warehouse.utils.warehouse_selector import WarehouseSelector
+    try:
+        warehouse_id = WarehouseSelector.warehouse_id_from_request(request)
+    except ValidationError:
+        warehouse_id = None
+
+    body = HomeFeed.render(warehouse_id=warehouse_id, user=request.user)
+    return HttpResponse(body, content_type="application/json")
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import DeliveryJob, RiderEarning, RiderPayout, RiderCashDeposit, RiderApplication
+from .models import DeliveryJob, DeliveryTrip, RiderEarning, RiderPayout, RiderCashDeposit, RiderApplication
 
 @admin.register(DeliveryJob)
 class DeliveryJobAdmin(admin.ModelAdmin):
@@ -29,6 +29,14 @@ class DeliveryJobAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(DeliveryTrip)
+class DeliveryTripAdmin(admin.ModelAdmin):
+    list_display = ("id", "warehouse_id", "rider", "status", "planned_duration_seconds", "created_at")
+    list_filter = ("status", "created_at")
+    search_fields = ("id", "warehouse_id", "rider__phone")
+    readonly_fields = ("planned_duration_seconds", "planned_distance_meters", "window_closes_at")
+
+
 @admin.register(RiderEarning)
 class RiderEarningAdmin(admin.ModelAdmin):
     list_display = (
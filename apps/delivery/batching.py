@@ -0,0 +1,142 @@
+"""
+Multi-drop stop sequencing.
+
+Small-n TSP (a trip carries a handful of drops): nearest-neighbour seed,
+2-opt improvement on travel time, then a promised-ETA feasibility pass.
+Stops that cannot be served on time are ejected and delivered solo.
+Durations come from the shared ETA engine (in-process, no DB/API calls).
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+
+from .eta import eta_engine
+
+
+@dataclass
+class Stop:
+    key: str                      # DeliveryJob id
+    location: tuple               # (lat, lng)
+    promised_by: object = None    # aware datetime or None
+
+
+@dataclass
+class StopPlan:
+    sequence: list                # [Stop] in drive order
+    arrivals: list                # [datetime] planned arrival per stop
+    ejected: list                 # [Stop] that could not meet their promise
+    total_seconds: float
+    total_meters: float
+
+
+def _duration_matrix(origin, stops):
+    """
+    Index 0 is the warehouse, 1..n are the stops.
+    """
+    points = [origin] + [s.location for s in stops]
+    n = len(points)
+    seconds = [[0.0] * n for _ in range(n)]
+    meters = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(n):
+            if i != j:
+                seconds[i][j], meters[i][j] = eta_engine.route(points[i], points[j])
+    return seconds, meters
+
+
+def _tour_cost(tour, seconds):
+    cost, prev = 0.0, 0
+    for node in tour:
+        cost += seconds[prev][node]
+        prev = node
+    return cost
+
+
+def _nearest_neighbour(seconds, nodes):
+    tour, current, remaining = [], 0, set(nodes)
+    while remaining:
+        nxt = min(remaining, key=lambda j: (seconds[current][j], j))
+        tour.append(nxt)
+        remaining.remove(nxt)
+        current = nxt
+    return tour
+
+
+def _two_opt(tour, seconds):
+    """
+    Open-path 2-opt (no return leg: the rider ends at the last drop).
+    """
+    best, best_cost = list(tour), _tour_cost(tour, seconds)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(best) - 1):
+            for k in range(i + 1, len(best)):
+                candidate = best[:i] + best[i:k + 1][::-1] + best[k + 1:]
+                cost = _tour_cost(candidate, seconds)
+                if cost + 1e-9 < best_cost:
+                    best, best_cost = candidate, cost
+                    improved = True
+    return best
+
+
+def _arrivals(tour, seconds, depart_at, service_seconds):
+    times, clock, prev = [], depart_at, 0
+    for node in tour:
+        clock = clock + timedelta(seconds=seconds[prev][node])
+        times.append(clock)
+        clock = clock + timedelta(seconds=service_seconds)
+        prev = node
+    return times
+
+
+def _lateness(tour, stops, arrivals):
+    """
+    Returns [(seconds_late, node)] for stops that miss their promise.
+    """
+    late = []
+    for node, arrival in zip(tour, arrivals):
+        promised = stops[node - 1].promised_by
+        if promised and arrival > promised:
+            late.append(((arrival - promised).total_seconds(), node))
+    return late
+
+
+def plan_stops(origin, stops, depart_at, service_seconds=180):
+    """
+    Orders `stops` starting from `origin` (lat, lng) at `depart_at`.
+    """
+    seconds, meters = _duration_matrix(origin, stops)
+    active = list(range(1, len(stops) + 1))
+    ejected = []
+
+    while active:
+        tour = _two_opt(_nearest_neighbour(seconds, active), seconds)
+        arrivals = _arrivals(tour, seconds, depart_at, service_seconds)
+        late = _lateness(tour, stops, arrivals)
+
+        if late:
+            # Shortest route breaks a promise: try earliest-deadline-first
+            edf = sorted(active, key=lambda n: (stops[n - 1].promised_by is None, stops[n - 1].promised_by, n))
+            edf_arrivals = _arrivals(edf, seconds, depart_at, service_seconds)
+            if not _lateness(edf, stops, edf_arrivals):
+                tour, arrivals, late = edf, edf_arrivals, []
+
+        if not late or len(active) == 1:
+            prev, distance = 0, 0.0
+            for node in tour:
+                distance += meters[prev][node]
+                prev = node
+            return StopPlan(
+                sequence=[stops[n - 1] for n in tour],
+                arrivals=arrivals,
+                ejected=ejected,
+                total_seconds=_tour_cost(tour, seconds),
+                total_meters=distance,
+            )
+
+        # Eject the worst offender and re-plan the rest
+        _, worst = max(late)
+        active.remove(worst)
+        ejected.append(stops[worst - 1])
+
+    return StopPlan(sequence=[], arrivals=[], ejected=ejected, total_seconds=0.0, total_meters=0.0)
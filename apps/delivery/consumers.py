@@ -2,10 +2,17 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from .models import DeliveryJob
+from .eta import eta_engine, point_to_latlng
+from apps.utils.backpressure import SendQueue
 # Assuming Order model import logic is handled inside methods to avoid circular async import issues
 
 class DeliveryConsumer(AsyncWebsocketConsumer):
+    # Tracking traffic lives on its own (sharded) Redis layer, isolated from order processing
+    channel_layer_alias = "tracking"
+
     async def connect(self):
+        self.outbox = None
+        self.is_rider = False
         self.job_id = self.scope['url_route']['kwargs']['job_id']
         self.group_name = f"delivery_{self.job_id}"
         self.user = self.scope["user"]
@@ -23,15 +30,24 @@ class DeliveryConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
 
+        # [BACKPRESSURE] Group messages are drained instantly into a bounded local queue
+        self.outbox = SendQueue(self.send)
+        self.outbox.start()
+
     async def disconnect(self, close_code):
+        if self.outbox:
+            await self.outbox.stop()
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
     @database_sync_to_async
     def can_access_job(self, user, job_id):
         try:
             job = DeliveryJob.objects.select_related('rider').get(id=job_id)
+            # Cached for live ETA on location updates (no per-message DB read)
+            self.customer_latlng = point_to_latlng(job.customer_location)
             # 1. Is Rider?
             if job.rider == user:
+                self.is_rider = True
                 return True
             # 2. Is Customer? (Need to check Order)
             from apps.orders.models import Order
@@ -43,16 +59,23 @@ class DeliveryConsumer(AsyncWebsocketConsumer):
     async def receive(self, text_data):
         data = json.loads(text_data)
         if data.get('type') == 'location_update':
-            # Only rider can send location
-            if not await self.is_rider_for_job(self.user, self.job_id):
-                return 
+            # Only rider can send location (cached from connect; re-check covers late assignment)
+            if not self.is_rider:
+                self.is_rider = await self.is_rider_for_job(self.user, self.job_id)
+            if not self.is_rider:
+                return
+
+            eta_mins = eta_engine.travel_minutes(
+                (float(data['lat']), float(data['lng'])), self.customer_latlng
+            )
 
             await self.channel_layer.group_send(
                 self.group_name,
                 {
                     'type': 'delivery_location',
                     'lat': data['lat'],
-                    'lng': data['lng']
+                    'lng': data['lng'],
+                    'eta_mins': eta_mins
                 }
             )
 
@@ -61,15 +84,17 @@ class DeliveryConsumer(AsyncWebsocketConsumer):
         return DeliveryJob.objects.filter(id=job_id, rider=user).exists()
 
     async def delivery_update(self, event):
-        await self.send(text_data=json.dumps({
+        self.outbox.put_control(json.dumps({
             'type': 'status_update',
             'status': event['status'],
             'data': event['data']
         }))
 
     async def delivery_location(self, event):
-        await self.send(text_data=json.dumps({
+        # Drop-oldest: a lagging client only needs the latest position
+        self.outbox.put_location(json.dumps({
             'type': 'rider_location',
             'lat': event['lat'],
-            'lng': event['lng']
+            'lng': event['lng'],
+            'eta_mins': event.get('eta_mins')
         }))
\ No newline at end of file
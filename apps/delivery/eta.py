@@ -0,0 +1,258 @@
+"""
+Shared ETA Engine.
+
+Used by checkout (serviceability ETA), rider assignment scoring and live
+tracking. All lookups are in-process: no external routing API and no PostGIS
+query per request.
+
+Resolution order for an (origin, destination) pair:
+1. LRU cache (hot pairs, keyed on ~100m rounded coordinates)
+2. Precomputed grid-to-grid travel-time matrix for the city (loaded once
+   per worker from a local .npz file, built offline from an OSM extract)
+3. Vectorised straight-line (haversine) fallback with a road detour factor
+"""
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6_371_000.0
+
+# Sentinel used in matrix files for "no route between these cells"
+UNREACHABLE = np.iinfo(np.uint16).max
+
+
+def haversine_meters(origin_lats, origin_lngs, dest_lats, dest_lngs):
+    """
+    Vectorised great-circle distance. Accepts scalars or numpy arrays
+    (broadcasting applies) and returns meters.
+    """
+    lat1 = np.radians(origin_lats)
+    lat2 = np.radians(dest_lats)
+    dlat = lat2 - lat1
+    dlng = np.radians(dest_lngs) - np.radians(origin_lngs)
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+class CityTravelMatrix:
+    """
+    Grid-to-grid travel times for one city.
+
+    File layout (.npz):
+        origin   -> [min_lat, min_lng] of the grid
+        cell_deg -> cell edge length in degrees
+        shape    -> [rows, cols]
+        seconds  -> (rows*cols, rows*cols) uint16 travel seconds
+        meters   -> (rows*cols, rows*cols) uint32 road distance (optional)
+    """
+
+    def __init__(self, name, origin, cell_deg, shape, seconds, meters=None):
+        self.name = name
+        self.min_lat, self.min_lng = float(origin[0]), float(origin[1])
+        self.cell_deg = float(cell_deg)
+        self.rows, self.cols = int(shape[0]), int(shape[1])
+        self.seconds = seconds
+        self.meters = meters
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        with np.load(path) as data:
+            return cls(
+                name=path.stem,
+                origin=data['origin'],
+                cell_deg=data['cell_deg'],
+                shape=data['shape'],
+                seconds=data['seconds'],
+                meters=data['meters'] if 'meters' in data.files else None,
+            )
+
+    def cell_index(self, lats, lngs):
+        """
+        Maps coordinates to flat cell indices. Returns -1 for points outside the grid.
+        """
+        lats = np.asarray(lats, dtype=float)
+        lngs = np.asarray(lngs, dtype=float)
+        r = np.floor((lats - self.min_lat) / self.cell_deg).astype(int)
+        c = np.floor((lngs - self.min_lng) / self.cell_deg).astype(int)
+        inside = (r >= 0) & (r < self.rows) & (c >= 0) & (c < self.cols)
+        return np.where(inside, r * self.cols + c, -1)
+
+    def contains(self, lat, lng):
+        return int(self.cell_index(lat, lng)) >= 0
+
+
+class ETAEngine:
+    """
+    Per-process ETA service. Use the module-level `eta_engine` instance.
+    """
+
+    def __init__(self):
+        self._matrices = None
+        self._load_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Configuration
+    # ------------------------------------------------------------------
+    @property
+    def speed_mps(self):
+        return getattr(settings, 'ETA_FALLBACK_SPEED_KMPH', 18.0) * 1000 / 3600
+
+    @property
+    def detour_factor(self):
+        return getattr(settings, 'ETA_DETOUR_FACTOR', 1.35)
+
+    @property
+    def cache_size(self):
+        return getattr(settings, 'ETA_LRU_SIZE', 50_000)
+
+    @property
+    def matrices(self):
+        if self._matrices is None:
+            with self._load_lock:
+                if self._matrices is None:
+                    self._matrices = self._load_matrices()
+        return self._matrices
+
+    def _load_matrices(self):
+        matrix_dir = getattr(settings, 'ETA_MATRIX_DIR', None)
+        if not matrix_dir or not Path(matrix_dir).is_dir():
+            return []
+
+        matrices = []
+        for path in sorted(Path(matrix_dir).glob('*.npz')):
+            try:
+                matrices.append(CityTravelMatrix.load(path))
+                logger.info(f"ETA matrix loaded: {path.stem}")
+            except Exception as e:
+                logger.error(f"Failed to load ETA matrix {path}: {e}")
+        return matrices
+
+    def reload(self):
+        """Drops loaded matrices and cached pairs (e.g. after a matrix rebuild)."""
+        with self._load_lock:
+            self._matrices = None
+        with self._cache_lock:
+            self._cache.clear()
+
+    def _matrix_for(self, lat, lng):
+        for matrix in self.matrices:
+            if matrix.contains(lat, lng):
+                return matrix
+        return None
+
+    # ------------------------------------------------------------------
+    # Core lookups
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _cache_key(o_lat, o_lng, d_lat, d_lng):
+        # 3 decimals ~ 110m: well below grid resolution, high hit rate
+        return (round(o_lat, 3), round(o_lng, 3), round(d_lat, 3), round(d_lng, 3))
+
+    def _fallback(self, o_lats, o_lngs, d_lats, d_lngs):
+        meters = haversine_meters(o_lats, o_lngs, d_lats, d_lngs) * self.detour_factor
+        return meters / self.speed_mps, meters
+
+    def route(self, origin, destination):
+        """
+        Returns (seconds, meters) between two (lat, lng) tuples.
+        """
+        o_lat, o_lng = float(origin[0]), float(origin[1])
+        d_lat, d_lng = float(destination[0]), float(destination[1])
+        key = self._cache_key(o_lat, o_lng, d_lat, d_lng)
+
+        with self._cache_lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return hit
+
+        result = self._lookup(o_lat, o_lng, d_lat, d_lng)
+
+        with self._cache_lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _lookup(self, o_lat, o_lng, d_lat, d_lng):
+        matrix = self._matrix_for(o_lat, o_lng)
+        if matrix is not None:
+            o_idx = int(matrix.cell_index(o_lat, o_lng))
+            d_idx = int(matrix.cell_index(d_lat, d_lng))
+            if d_idx >= 0:
+                seconds = int(matrix.seconds[o_idx, d_idx])
+                if seconds != UNREACHABLE:
+                    if matrix.meters is not None:
+                        meters = float(matrix.meters[o_idx, d_idx])
+                    else:
+                        meters = float(haversine_meters(o_lat, o_lng, d_lat, d_lng)) * self.detour_factor
+                    return float(seconds), meters
+
+        seconds, meters = self._fallback(o_lat, o_lng, d_lat, d_lng)
+        return float(seconds), float(meters)
+
+    def route_many(self, origins, destination):
+        """
+        Vectorised one-to-many lookup (e.g. candidate riders -> warehouse).
+        `origins` is a sequence of (lat, lng). Returns (seconds[], meters[]) arrays.
+        Bypasses the LRU: candidate positions change every heartbeat.
+        """
+        if not len(origins):
+            return np.empty(0), np.empty(0)
+
+        pts = np.asarray(origins, dtype=float)
+        o_lats, o_lngs = pts[:, 0], pts[:, 1]
+        d_lat, d_lng = float(destination[0]), float(destination[1])
+
+        seconds, meters = self._fallback(o_lats, o_lngs, d_lat, d_lng)
+
+        matrix = self._matrix_for(d_lat, d_lng)
+        if matrix is not None:
+            d_idx = int(matrix.cell_index(d_lat, d_lng))
+            o_idx = matrix.cell_index(o_lats, o_lngs)
+            inside = o_idx >= 0
+            if inside.any():
+                grid_seconds = np.asarray(matrix.seconds[o_idx[inside], d_idx], dtype=float)
+                routable = grid_seconds != UNREACHABLE
+                rows = np.flatnonzero(inside)[routable]
+                seconds[rows] = grid_seconds[routable]
+                if matrix.meters is not None:
+                    meters[rows] = np.asarray(matrix.meters[o_idx[inside], d_idx], dtype=float)[routable]
+
+        return seconds, meters
+
+    # ------------------------------------------------------------------
+    # Convenience wrappers
+    # ------------------------------------------------------------------
+    def travel_minutes(self, origin, destination):
+        seconds, _ = self.route(origin, destination)
+        return int(np.ceil(seconds / 60))
+
+    def distance_meters(self, origin, destination):
+        _, meters = self.route(origin, destination)
+        return meters
+
+    def promise_minutes(self, origin, destination):
+        """
+        Customer-facing ETA: store handling time + travel time.
+        """
+        handling = getattr(settings, 'ETA_HANDLING_MINUTES', 6)
+        return handling + self.travel_minutes(origin, destination)
+
+
+eta_engine = ETAEngine()
+
+
+def point_to_latlng(point):
+    """GEOS Point (x=lng, y=lat) -> (lat, lng) tuple."""
+    return (point.y, point.x)
@@ -4,6 +4,44 @@ from django.conf import settings
 from django.contrib.gis.db import models as gis_models
 from apps.utils.models import TimestampedModel
 
+class DeliveryTrip(TimestampedModel):
+    """
+    Multi-drop run: several DeliveryJobs leaving the same warehouse together,
+    carried by one rider in a planned stop sequence.
+    """
+    class Status(models.TextChoices):
+        BATCHING = "BATCHING", "Collecting Orders"
+        SEARCHING = "SEARCHING", "Searching for Rider"
+        ASSIGNED = "ASSIGNED", "Rider Assigned"
+        IN_PROGRESS = "IN_PROGRESS", "Out for Delivery"
+        COMPLETED = "COMPLETED", "Completed"
+
+    warehouse_id = models.CharField(max_length=50, db_index=True)
+    warehouse_location = gis_models.PointField(srid=4326)
+
+    rider = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True, blank=True,
+        on_delete=models.SET_NULL,
+        related_name='delivery_trips'
+    )
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.BATCHING, db_index=True)
+
+    # Batching window: new jobs may join until this moment
+    window_closes_at = models.DateTimeField()
+    planned_duration_seconds = models.IntegerField(default=0)
+    planned_distance_meters = models.FloatField(default=0.0)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['warehouse_id', 'status', 'window_closes_at']),
+        ]
+
+    def __str__(self):
+        return f"Trip {self.id} - {self.status}"
+
+
 class DeliveryJob(TimestampedModel):
     class Status(models.TextChoices):
         SEARCHING = "SEARCHING", "Searching for Rider"
@@ -35,6 +73,17 @@ class DeliveryJob(TimestampedModel):
     completion_time = models.DateTimeField(null=True, blank=True)
     distance_meters = models.FloatField(default=0.0)
 
+    # Multi-drop routing
+    trip = models.ForeignKey(
+        DeliveryTrip,
+        null=True, blank=True,
+        on_delete=models.SET_NULL,
+        related_name='jobs'
+    )
+    stop_sequence = models.PositiveSmallIntegerField(default=0)
+    promised_by = models.DateTimeField(null=True, blank=True, help_text="Latest delivery time promised to the customer")
+    planned_arrival = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         ordering = ['-created_at']
 
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import DeliveryJob
+from .models import DeliveryJob, DeliveryTrip
 
 class DeliveryJobSerializer(serializers.ModelSerializer):
     warehouse_lat = serializers.FloatField(source='warehouse_location.y', read_only=True)
@@ -13,5 +13,20 @@ class DeliveryJobSerializer(serializers.ModelSerializer):
             'id', 'order_id', 'status', 'rider', 
             'warehouse_lat', 'warehouse_lng',
             'customer_lat', 'customer_lng',
+            'trip', 'stop_sequence', 'planned_arrival', 'promised_by',
             'created_at'
-        ]
\ No newline at end of file
+        ]
+
+class DeliveryTripSerializer(serializers.ModelSerializer):
+    stops = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DeliveryTrip
+        fields = [
+            'id', 'status', 'planned_duration_seconds',
+            'planned_distance_meters', 'stops', 'created_at'
+        ]
+
+    def get_stops(self, obj):
+        jobs = sorted(obj.jobs.all(), key=lambda j: j.stop_sequence)
+        return DeliveryJobSerializer(jobs, many=True).data
\ No newline at end of file
@@ -1,17 +1,39 @@
 import secrets
+from datetime import timedelta
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from django.contrib.gis.db.models.functions import Distance
 from django.contrib.gis.measure import D
 from django.contrib.gis.geos import Point
 from apps.utils.exceptions import BusinessLogicException
 from apps.orders.models import Order
 from apps.riders.models import RiderProfile
-from .models import DeliveryJob
+from apps.riders.liveness import RiderLiveness
+from apps.orders.projections import OrderProjection
+from .models import DeliveryJob, DeliveryTrip
 from .tasks import broadcast_delivery_update
+from .eta import eta_engine, point_to_latlng
+from .batching import Stop, plan_stops
 
 class DeliveryService:
     SEARCH_RADIUS_KM = 5.0
+    CANDIDATE_POOL = 25
+
+    @staticmethod
+    def rank_by_eta(riders, destination):
+        """
+        riders: [(rider_id, Point)] -> rider ids ordered by travel time to destination.
+        """
+        if not riders:
+            return []
+        seconds, _ = eta_engine.route_many(
+            [point_to_latlng(loc) for _, loc in riders],
+            point_to_latlng(destination)
+        )
+        order = seconds.argsort(kind='stable')
+        return [riders[i][0] for i in order]
 
     @staticmethod
     @transaction.atomic
@@ -26,14 +48,31 @@ class DeliveryService:
         # [SECURE] Generate 6-digit OTP
         otp_code = str(secrets.SystemRandom().randint(100000, 999999))
         
+        customer_location = Point(float(cust_lng), float(cust_lat))
+
+        # Promise = checkout ETA + buffer, anchored at order placement
+        promise_minutes = eta_engine.promise_minutes(
+            point_to_latlng(wh_location), point_to_latlng(customer_location)
+        ) + getattr(settings, 'DELIVERY_PROMISE_BUFFER_MINUTES', 5)
+
         job = DeliveryJob.objects.create(
             order_id=order.id,
             warehouse_location=wh_location,
-            customer_location=Point(float(cust_lng), float(cust_lat)),
+            customer_location=customer_location,
             status=DeliveryJob.Status.SEARCHING,
-            delivery_otp=otp_code  # Persist OTP securely
+            delivery_otp=otp_code,  # Persist OTP securely
+            distance_meters=eta_engine.distance_meters(
+                point_to_latlng(wh_location), point_to_latlng(customer_location)
+            ),
+            promised_by=order.created_at + timedelta(minutes=promise_minutes)
         )
-        
+        OrderProjection.refresh(order.id, 'delivery')
+
+        if getattr(settings, 'DELIVERY_BATCHING_ENABLED', True):
+            # [UNIT ECONOMICS] Join an open multi-drop trip from the same warehouse
+            TripService.add_job(job, warehouse_id=str(order.warehouse_id))
+            return job
+
         from .tasks import assign_rider_task
         assign_rider_task.delay(str(job.id))
         return job
@@ -64,82 +103,269 @@ class DeliveryService:
         
         if status == DeliveryJob.Status.PICKED_UP:
             job.pickup_time = timezone.now()
+            if job.trip_id:
+                DeliveryTrip.objects.filter(
+                    id=job.trip_id, status=DeliveryTrip.Status.ASSIGNED
+                ).update(status=DeliveryTrip.Status.IN_PROGRESS)
             
         elif status == DeliveryJob.Status.COMPLETED:
             job.completion_time = timezone.now()
             
-            # Release Rider
             from apps.riders.services import RiderService
-            RiderService.mark_available(user)
+
+            # Payout + earnings rollups commit (or roll back) with the completion
+            RiderService.credit_earnings(user, job.order_id, RiderService.payout_for_job(job))
+
+            # Release Rider (multi-drop: only after the last stop)
+            if not job.trip_id or TripService.complete_stop(job):
+                RiderService.mark_available(user)
             
             # Update Order Status (String reference to avoid circular imports)
             Order.objects.filter(id=job.order_id).update(status='DELIVERED')
 
         job.save()
-        broadcast_delivery_update(str(job.id), status, {})
+        OrderProjection.refresh(job.order_id, 'delivery', 'order')
+        broadcast_delivery_update(str(job.id), status, {
+            "trip_id": str(job.trip_id) if job.trip_id else None,
+            "stop_sequence": job.stop_sequence,
+        })
         return job
 
     @staticmethod
-    @transaction.atomic
-    def assign_nearest_rider(job_id: str):
-        job = DeliveryJob.objects.select_for_update().get(id=job_id)
-        
-        if job.status != DeliveryJob.Status.SEARCHING:
-            return False
-
-        # 1. Find candidates (Fast Read)
-        candidates = RiderProfile.objects.filter(
+    def find_candidates(location, limit=5):
+        """
+        Online & free riders near `location`, best ETA first.
+        """
+        # 1. Find candidates (Fast Read, radius only)
+        nearby = list(RiderProfile.objects.filter(
             is_available=True,
             is_online=True,
-            current_location__distance_lte=(job.warehouse_location, D(km=DeliveryService.SEARCH_RADIUS_KM))
-        ).annotate(
-            distance=Distance('current_location', job.warehouse_location)
-        ).order_by('distance').values_list('id', flat=True)[:5]
+            current_location__distance_lte=(location, D(km=DeliveryService.SEARCH_RADIUS_KM))
+        ).values_list('id', 'current_location')[:DeliveryService.CANDIDATE_POOL])
 
-        # 2. Lock & Assign (Fail Fast Strategy)
+        # Drop riders whose heartbeat already expired (sweeper may not have run yet)
+        alive = set(RiderLiveness.filter_alive([rid for rid, _ in nearby]))
+        nearby = [(rid, loc) for rid, loc in nearby if rid in alive]
+
+        # [PERFORMANCE] Rank by road ETA in-process instead of ORDER BY ST_Distance
+        return DeliveryService.rank_by_eta(nearby, location)[:limit]
+
+    @staticmethod
+    def lock_first_available(candidates):
+        """
+        Locks & marks busy the first candidate nobody else has grabbed. Must run in a transaction.
+        """
         for rider_id in candidates:
             try:
                 # [CRITICAL FIX] Lock the rider row. SKIP_LOCKED prevents waiting.
                 rider = RiderProfile.objects.select_for_update(skip_locked=True).get(id=rider_id, is_available=True)
-                
-                # Assign
-                job.rider = rider.user
-                job.status = DeliveryJob.Status.ASSIGNED
-                job.save()
-
-                # Mark Busy
-                rider.is_available = False
-                rider.save()
-
-                broadcast_delivery_update(str(job.id), "ASSIGNED", {"rider_id": str(rider.id)})
-                return True
             except RiderProfile.DoesNotExist:
                 continue # Already taken
-        
-        return False
+
+            # Mark Busy
+            rider.is_available = False
+            rider.save()
+            return rider
+        return None
 
     @staticmethod
     @transaction.atomic
-    def update_job_status(job_id: str, status: str, user):
+    def assign_nearest_rider(job_id: str):
         job = DeliveryJob.objects.select_for_update().get(id=job_id)
         
-        if job.rider != user:
-            raise BusinessLogicException("Not authorized.")
+        if job.status != DeliveryJob.Status.SEARCHING:
+            return False
 
-        job.status = status
-        
-        if status == DeliveryJob.Status.PICKED_UP:
-            job.pickup_time = timezone.now()
-            
-        elif status == DeliveryJob.Status.COMPLETED:
-            job.completion_time = timezone.now()
-            
-            # Release Rider
-            from apps.riders.services import RiderService
-            RiderService.mark_available(user)
-            
-            Order.objects.filter(id=job.order_id).update(status='DELIVERED') # Use string or Order.Status
+        # 2. Lock & Assign (Fail Fast Strategy)
+        rider = DeliveryService.lock_first_available(
+            DeliveryService.find_candidates(job.warehouse_location)
+        )
+        if not rider:
+            return False
 
+        job.rider = rider.user
+        job.status = DeliveryJob.Status.ASSIGNED
         job.save()
-        broadcast_delivery_update(str(job.id), status, {})
-        return job
\ No newline at end of file
+        OrderProjection.refresh(job.order_id, 'delivery')
+
+        broadcast_delivery_update(str(job.id), "ASSIGNED", {"rider_id": str(rider.id)})
+        return True
+
+
+class TripService:
+    """
+    Multi-drop batching: jobs leaving one warehouse inside a short window share a rider.
+    """
+
+    @staticmethod
+    def _window_seconds():
+        return getattr(settings, 'DELIVERY_BATCH_WINDOW_SECONDS', 120)
+
+    @staticmethod
+    def _max_stops():
+        return getattr(settings, 'DELIVERY_MAX_STOPS_PER_TRIP', 3)
+
+    @staticmethod
+    @transaction.atomic
+    def add_job(job: DeliveryJob, warehouse_id: str):
+        """
+        Attaches `job` to the open trip for its warehouse, or opens a new one
+        when there is none or it already has DELIVERY_MAX_STOPS_PER_TRIP jobs.
+        """
+        from .tasks import dispatch_trip_task
+
+        now = timezone.now()
+        max_stops = TripService._max_stops()
+        # Subquery, not a GROUP BY: FOR UPDATE can't lock grouped rows
+        stops = DeliveryJob.objects.filter(trip=OuterRef('pk')).order_by().values('trip').annotate(n=Count('id')).values('n')
+        # SKIP_LOCKED: a trip being dispatched (or filled) right now is simply not a candidate,
+        # so the stop count read under our lock can't be raced
+        trip = DeliveryTrip.objects.select_for_update(skip_locked=True).annotate(
+            stops=Coalesce(Subquery(stops), 0)
+        ).filter(
+            warehouse_id=warehouse_id,
+            status=DeliveryTrip.Status.BATCHING,
+            window_closes_at__gt=now,
+            stops__lt=max_stops,
+        ).order_by('window_closes_at').first()
+
+        # Never let a batch hold an order past its promise
+        closes_at = now + timedelta(seconds=TripService._window_seconds())
+        if job.promised_by:
+            closes_at = min(closes_at, job.promised_by - timedelta(
+                seconds=(job.distance_meters / eta_engine.speed_mps)
+            ))
+
+        if trip is None:
+            trip = DeliveryTrip.objects.create(
+                warehouse_id=warehouse_id,
+                warehouse_location=job.warehouse_location,
+                window_closes_at=max(closes_at, now)
+            )
+            trip.stops = 0
+            countdown = max(0, (trip.window_closes_at - now).total_seconds())
+            transaction.on_commit(
+                lambda: dispatch_trip_task.apply_async(args=[str(trip.id)], countdown=countdown)
+            )
+        elif closes_at < trip.window_closes_at:
+            trip.window_closes_at = max(closes_at, now)
+            trip.save(update_fields=['window_closes_at', 'updated_at'])
+
+        job.trip = trip
+        job.save(update_fields=['trip', 'updated_at'])
+
+        # Full (or due) trips leave immediately
+        if trip.stops + 1 >= max_stops or trip.window_closes_at <= now:
+            transaction.on_commit(lambda: dispatch_trip_task.delay(str(trip.id)))
+        return trip
+
+    @staticmethod
+    @transaction.atomic
+    def dispatch_trip(trip_id: str):
+        """
+        Closes the batch, sequences the drops and hands the trip to rider assignment.
+        """
+        from .tasks import assign_rider_task, assign_trip_rider_task
+
+        trip = DeliveryTrip.objects.select_for_update().get(id=trip_id)
+        if trip.status != DeliveryTrip.Status.BATCHING:
+            return trip
+
+        jobs = list(trip.jobs.select_for_update().filter(status=DeliveryJob.Status.SEARCHING))
+        if not jobs:
+            trip.status = DeliveryTrip.Status.COMPLETED
+            trip.save(update_fields=['status', 'updated_at'])
+            return trip
+
+        plan = plan_stops(
+            point_to_latlng(trip.warehouse_location),
+            [Stop(key=str(j.id), location=point_to_latlng(j.customer_location), promised_by=j.promised_by) for j in jobs],
+            depart_at=timezone.now(),
+            service_seconds=getattr(settings, 'DELIVERY_STOP_SERVICE_SECONDS', 180)
+        )
+
+        by_id = {str(j.id): j for j in jobs}
+        for seq, (stop, arrival) in enumerate(zip(plan.sequence, plan.arrivals), start=1):
+            by_id[stop.key].stop_sequence = seq
+            by_id[stop.key].planned_arrival = arrival
+
+        # Drops that would break their promise inside the batch go solo
+        ejected_ids = [stop.key for stop in plan.ejected]
+        for job_id in ejected_ids:
+            by_id[job_id].trip = None
+            by_id[job_id].stop_sequence = 0
+            by_id[job_id].planned_arrival = None
+
+        DeliveryJob.objects.bulk_update(jobs, ['trip', 'stop_sequence', 'planned_arrival'])
+        OrderProjection.refresh([j.order_id for j in jobs], 'delivery')
+
+        trip.status = DeliveryTrip.Status.SEARCHING
+        trip.planned_duration_seconds = int(plan.total_seconds)
+        trip.planned_distance_meters = plan.total_meters
+        trip.save(update_fields=['status', 'planned_duration_seconds', 'planned_distance_meters', 'updated_at'])
+
+        transaction.on_commit(lambda: assign_trip_rider_task.delay(str(trip.id)))
+        for job_id in ejected_ids:
+            transaction.on_commit(lambda job_id=job_id: assign_rider_task.delay(job_id))
+        return trip
+
+    @staticmethod
+    @transaction.atomic
+    def assign_rider(trip_id: str):
+        trip = DeliveryTrip.objects.select_for_update().get(id=trip_id)
+        if trip.status != DeliveryTrip.Status.SEARCHING:
+            return False
+
+        rider = DeliveryService.lock_first_available(
+            DeliveryService.find_candidates(trip.warehouse_location)
+        )
+        if not rider:
+            return False
+
+        trip.rider = rider.user
+        trip.status = DeliveryTrip.Status.ASSIGNED
+        trip.save(update_fields=['rider', 'status', 'updated_at'])
+
+        jobs = list(trip.jobs.filter(status=DeliveryJob.Status.SEARCHING).order_by('stop_sequence'))
+        trip.jobs.filter(id__in=[j.id for j in jobs]).update(
+            rider=rider.user, status=DeliveryJob.Status.ASSIGNED
+        )
+        OrderProjection.refresh([j.order_id for j in jobs], 'delivery')
+
+        for job in jobs:
+            broadcast_delivery_update(str(job.id), "ASSIGNED", {
+                "rider_id": str(rider.id),
+                "trip_id": str(trip.id),
+                "stop_sequence": job.stop_sequence,
+                "stops_before": job.stop_sequence - 1,
+            })
+        return True
+
+    @staticmethod
+    def complete_stop(job: DeliveryJob):
+        """
+        Per-stop completion inside a trip. Returns True when this was the last stop.
+        Caller holds the job lock and saves the job.
+        """
+        trip = DeliveryTrip.objects.select_for_update().get(id=job.trip_id)
+
+        remaining = list(trip.jobs.exclude(id=job.id).exclude(
+            status__in=[DeliveryJob.Status.COMPLETED, DeliveryJob.Status.FAILED]
+        ).order_by('stop_sequence'))
+
+        if not remaining:
+            trip.status = DeliveryTrip.Status.COMPLETED
+            trip.save(update_fields=['status', 'updated_at'])
+            return True
+
+        trip.status = DeliveryTrip.Status.IN_PROGRESS
+        trip.save(update_fields=['status', 'updated_at'])
+
+        # Customers further down the route see their queue position shrink
+        for position, other in enumerate(remaining):
+            broadcast_delivery_update(str(other.id), other.status, {
+                "trip_id": str(trip.id),
+                "stop_sequence": other.stop_sequence,
+                "stops_before": position,
+            })
+        return False
@@ -19,11 +19,32 @@ def assign_rider_task(self, job_id):
         logger.error(f"Error assigning rider: {e}")
         raise self.retry(exc=e)
 
+@shared_task
+def dispatch_trip_task(trip_id):
+    """
+    Fires when a trip's batching window closes (or it fills up).
+    """
+    from .services import TripService
+    TripService.dispatch_trip(trip_id)
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=30)
+def assign_trip_rider_task(self, trip_id):
+    from .services import TripService
+
+    try:
+        success = TripService.assign_rider(trip_id)
+        if not success:
+            logger.info(f"No rider found for Trip {trip_id}. Retrying...")
+            raise self.retry()
+    except Exception as e:
+        logger.error(f"Error assigning trip rider: {e}")
+        raise self.retry(exc=e)
+
 def broadcast_delivery_update(job_id, status, data):
     """
-    Sends WS message to group 'delivery_{job_id}'
+    Sends WS message to group 'delivery_{job_id}' on the tracking layer.
     """
-    channel_layer = get_channel_layer()
+    channel_layer = get_channel_layer("tracking")
     async_to_sync(channel_layer.group_send)(
         f"delivery_{job_id}",
         {
@@ -0,0 +1,117 @@
+# apps/delivery/tests.py
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from .eta import ETAEngine, haversine_meters, UNREACHABLE
+
+
+class ETAEngineTests(SimpleTestCase):
+    WAREHOUSE = (12.9716, 77.5946)
+    CUSTOMER = (12.9816, 77.6046)
+
+    def _write_matrix(self, directory):
+        # 2x2 grid of 0.01 deg cells starting at (12.97, 77.59)
+        seconds = np.array([
+            [0, 300, 400, 500],
+            [300, 0, 250, UNREACHABLE],
+            [400, 250, 0, 200],
+            [500, UNREACHABLE, 200, 0],
+        ], dtype=np.uint16)
+        np.savez(
+            Path(directory) / 'blr.npz',
+            origin=np.array([12.97, 77.59]),
+            cell_deg=np.array(0.01),
+            shape=np.array([2, 2]),
+            seconds=seconds,
+        )
+
+    def test_haversine_is_vectorised(self):
+        d = haversine_meters(
+            np.array([12.9716, 12.9716]), np.array([77.5946, 77.5946]),
+            12.9816, 77.6046
+        )
+        self.assertEqual(d.shape, (2,))
+        self.assertAlmostEqual(d[0], 1550, delta=50)
+
+    @override_settings(ETA_MATRIX_DIR=None, ETA_FALLBACK_SPEED_KMPH=18.0, ETA_DETOUR_FACTOR=1.0)
+    def test_fallback_without_matrix(self):
+        engine = ETAEngine()
+        seconds, meters = engine.route(self.WAREHOUSE, self.CUSTOMER)
+        self.assertAlmostEqual(meters, 1550, delta=50)
+        self.assertAlmostEqual(seconds, meters / 5.0, places=3)
+
+    def test_matrix_lookup_and_lru(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self._write_matrix(tmp)
+            with override_settings(ETA_MATRIX_DIR=tmp):
+                engine = ETAEngine()
+                seconds, _ = engine.route(self.WAREHOUSE, self.CUSTOMER)
+                self.assertEqual(seconds, 500.0)  # cell 0 -> cell 3
+
+                # Second call is served from the LRU
+                engine._matrices = []
+                self.assertEqual(engine.route(self.WAREHOUSE, self.CUSTOMER)[0], 500.0)
+
+    def test_unreachable_cells_fall_back(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self._write_matrix(tmp)
+            with override_settings(ETA_MATRIX_DIR=tmp):
+                engine = ETAEngine()
+                # cell 1 -> cell 3 is marked unreachable
+                seconds, _ = engine.route((12.975, 77.605), (12.985, 77.605))
+                self.assertNotEqual(seconds, float(UNREACHABLE))
+                self.assertGreater(seconds, 0)
+
+    def test_route_many_ranks_origins(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self._write_matrix(tmp)
+            with override_settings(ETA_MATRIX_DIR=tmp):
+                engine = ETAEngine()
+                seconds, _ = engine.route_many(
+                    [(12.975, 77.595), (12.985, 77.595), (12.985, 77.605)],
+                    self.WAREHOUSE
+                )
+                self.assertEqual(list(seconds), [0.0, 400.0, 500.0])
+
+
+class StopPlanningTests(SimpleTestCase):
+    WAREHOUSE = (12.9716, 77.5946)
+
+    def setUp(self):
+        from datetime import datetime, timezone as dt_tz
+        self.now = datetime(2025, 1, 1, 18, 0, tzinfo=dt_tz.utc)
+
+    @override_settings(ETA_MATRIX_DIR=None)
+    def test_sequences_drops_along_the_road(self):
+        from .batching import Stop, plan_stops
+
+        stops = [
+            Stop(key="far", location=(12.9916, 77.5946)),
+            Stop(key="near", location=(12.9766, 77.5946)),
+            Stop(key="mid", location=(12.9816, 77.5946)),
+        ]
+        plan = plan_stops(self.WAREHOUSE, stops, depart_at=self.now)
+
+        self.assertEqual([s.key for s in plan.sequence], ["near", "mid", "far"])
+        self.assertEqual(plan.ejected, [])
+        self.assertTrue(plan.arrivals[0] < plan.arrivals[1] < plan.arrivals[2])
+
+    @override_settings(ETA_MATRIX_DIR=None)
+    def test_tight_promise_is_served_first_or_ejected(self):
+        from datetime import timedelta
+        from .batching import Stop, plan_stops
+
+        stops = [
+            Stop(key="near", location=(12.9766, 77.5946)),
+            Stop(key="urgent", location=(12.9916, 77.5946), promised_by=self.now + timedelta(seconds=690)),
+        ]
+        plan = plan_stops(self.WAREHOUSE, stops, depart_at=self.now)
+        self.assertEqual(plan.sequence[0].key, "urgent")
+
+        stops[1].promised_by = self.now + timedelta(seconds=30)
+        plan = plan_stops(self.WAREHOUSE, stops, depart_at=self.now)
+        self.assertEqual([s.key for s in plan.ejected], ["urgent"])
+        self.assertEqual([s.key for s in plan.sequence], ["near"])
@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import DeliveryJobViewSet
+from .views import DeliveryJobViewSet, DeliveryTripViewSet
 
 router = DefaultRouter()
 router.register(r'jobs', DeliveryJobViewSet, basename='delivery-jobs')
+router.register(r'trips', DeliveryTripViewSet, basename='delivery-trips')
 
 urlpatterns = [
     path('', include(router.urls)),
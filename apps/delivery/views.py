@@ -3,8 +3,8 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 
-from .models import DeliveryJob
-from .serializers import DeliveryJobSerializer
+from .models import DeliveryJob, DeliveryTrip
+from .serializers import DeliveryJobSerializer, DeliveryTripSerializer
 from .services import DeliveryService
 
 class DeliveryJobViewSet(viewsets.ReadOnlyModelViewSet):
@@ -21,7 +21,20 @@ class DeliveryJobViewSet(viewsets.ReadOnlyModelViewSet):
     def update_status(self, request, pk=None):
         status_val = request.data.get('status')
         try:
-            DeliveryService.update_job_status(pk, status_val, request.user)
+            DeliveryService.update_job_status(
+                pk, status_val, request.user, otp=request.data.get('otp')
+            )
             return Response({"status": "Updated"}, status=status.HTTP_200_OK)
         except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class DeliveryTripViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Rider's multi-drop runs with stops in drive order.
+    Each stop is completed individually via jobs/{id}/update_status (with its OTP).
+    """
+    serializer_class = DeliveryTripSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return DeliveryTrip.objects.filter(rider=self.request.user).prefetch_related('jobs')
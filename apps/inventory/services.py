@@ -3,6 +3,7 @@ from typing import List, Dict
 from django.db import transaction
 from django.db.models import F
 from apps.utils.exceptions import BusinessLogicException
+from apps.catalog.home_feed import stock_crossed
 
 from .models import InventoryStock, StockMovementLog
 
@@ -66,12 +67,14 @@ class InventoryService:
             pid = str(item["product_id"])
             qty = item["quantity"]
             stock = stocks[pid]
+            before = stock.available_quantity
 
             stock.reserved_quantity = F("reserved_quantity") + qty
             stock.save(update_fields=["reserved_quantity", "updated_at"])
             
             # Refresh for log snapshot
             stock.refresh_from_db()
+            stock_crossed(warehouse_id, before, stock.available_quantity)
 
             logs.append(StockMovementLog(
                 inventory=stock,
@@ -105,9 +108,11 @@ class InventoryService:
             
             if pid in stock_map:
                 stock = stock_map[pid]
+                before = stock.available_quantity
                 stock.reserved_quantity = F("reserved_quantity") - qty
                 stock.save(update_fields=["reserved_quantity", "updated_at"])
                 stock.refresh_from_db()
+                stock_crossed(warehouse_id, before, stock.available_quantity)
 
                 logs.append(StockMovementLog(
                     inventory=stock,
@@ -169,9 +174,11 @@ class InventoryService:
         except InventoryStock.DoesNotExist:
             raise BusinessLogicException("Stock record not found.")
 
+        before = stock.available_quantity
         stock.quantity = F("quantity") + delta_qty
         stock.save(update_fields=["quantity", "updated_at"])
         stock.refresh_from_db()
+        stock_crossed(warehouse_id, before, stock.available_quantity)
 
         StockMovementLog.objects.create(
             inventory=stock,
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.orders.models import OrderStatusHistory, OrderTimeline
+from apps.orders.timeline import TimelineService
+
+
+class Command(BaseCommand):
+    help = "Move legacy OrderTimeline rows into compact OrderStatusHistory events"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Orders per transaction")
+
+    def handle(self, *args, **options):
+        mode = getattr(settings, 'ORDER_TIMELINE_STORAGE', 'compact')
+        if mode != 'compact':
+            # 'dual' still writes legacy rows; 'legacy' reads only them, so moving them would hide history
+            raise CommandError(f"ORDER_TIMELINE_STORAGE is '{mode}': switch to 'compact' before compacting.")
+
+        batch_size = options['batch_size']
+        moved_orders = moved_rows = 0
+
+        while True:
+            order_ids = list(
+                OrderTimeline.objects.order_by('order_id').values_list('order_id', flat=True).distinct()[:batch_size]
+            )
+            if not order_ids:
+                break
+
+            with transaction.atomic():
+                rows = OrderTimeline.objects.select_for_update().filter(order_id__in=order_ids).order_by('created_at')
+                history = dict(
+                    OrderStatusHistory.objects.select_for_update().filter(order_id__in=order_ids).values_list('order_id', 'events')
+                )
+                keys = {order_id: TimelineService.mirror_keys(events) for order_id, events in history.items()}
+                per_order = {}
+                for row in rows:
+                    order_keys = keys.get(row.order_id)
+                    if order_keys and TimelineService.is_mirrored(row.status, int(row.created_at.timestamp()), order_keys):
+                        # Dual-written copy of a compact entry: already in the history
+                        continue
+                    event = TimelineService.LEGACY_STATUS_EVENTS.get(row.status)
+                    if event is None:
+                        continue
+                    default = TimelineService.describe(event)
+                    # Keep free text only when it says more than the code does
+                    note = "" if row.description in (default, f"{default}.") else row.description
+                    if note.startswith(f"{default}: "):
+                        note = note[len(default) + 2:]
+                    per_order.setdefault(row.order_id, []).append(
+                        TimelineService.entry(event, at=row.created_at.timestamp(), note=note)
+                    )
+                    moved_rows += 1
+
+                for order_id, entries in per_order.items():
+                    if order_id in history:
+                        # Merge by time: pre-rollout rows go first, rows from a 'legacy' rollback in between
+                        merged = sorted(history[order_id] + entries, key=lambda e: e[1])
+                        OrderStatusHistory.objects.filter(order_id=order_id).update(events=merged)
+                    else:
+                        TimelineService.append(order_id, entries)
+
+                # Same transaction: an order is never half-moved or doubled
+                OrderTimeline.objects.filter(order_id__in=order_ids).delete()
+
+            moved_orders += len(order_ids)
+            self.stdout.write(f"... {moved_orders} orders")
+
+        self.stdout.write(self.style.SUCCESS(f"Compacted {moved_rows} timeline rows across {moved_orders} orders."))
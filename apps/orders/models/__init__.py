@@ -1,4 +1,5 @@
 from .order import Order
 from .item import OrderItem
-from .timeline import OrderTimeline
-# Cart is separate, not always needed in core imports
\ No newline at end of file
+from .timeline import OrderTimeline, OrderStatusHistory, TimelineEvent
+from .read_model import OrderReadModel
+# Cart is separate, not always needed in core imports
@@ -36,6 +36,12 @@ class Order(TimestampedModel):
     payment_id = models.CharField(max_length=100, blank=True, null=True, help_text="Razorpay Order ID")
     transaction_id = models.CharField(max_length=100, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Order history: WHERE user = ? ORDER BY created_at DESC, id DESC (keyset)
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_history_idx'),
+        ]
+
     def __str__(self):
         return f"{self.id} [{self.status}]"
 
@@ -0,0 +1,19 @@
+from django.db import models
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class OrderReadModel(models.Model):
+    """
+    Denormalised, read-only view of one order (order + items + timeline +
+    payment + picking + delivery) kept in step by apps.orders.projections.
+    Order detail / tracking read this single row instead of joining 5 apps.
+    """
+    order_id = models.CharField(primary_key=True, max_length=50)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    document = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.order_id} v{self.version}"
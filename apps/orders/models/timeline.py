@@ -2,6 +2,10 @@ from django.db import models
 from .order import Order
 
 class OrderTimeline(models.Model):
+    """
+    Legacy: one row per transition. Superseded by OrderStatusHistory; kept
+    readable until `manage.py compact_order_timeline` has run everywhere.
+    """
     order = models.ForeignKey(Order, related_name='timeline', on_delete=models.CASCADE)
     status = models.CharField(max_length=20)
     description = models.CharField(max_length=255)
@@ -9,4 +13,49 @@ class OrderTimeline(models.Model):
     metadata = models.JSONField(default=dict, blank=True)
 
     class Meta:
-        ordering = ['created_at']
\ No newline at end of file
+        ordering = ['created_at']
+
+
+class TimelineEvent(models.IntegerChoices):
+    """
+    Enum-coded order events. Descriptions are rendered from the code at read
+    time (TIMELINE_TEXT), never stored.
+    """
+    CREATED = 1, "Order created, waiting for payment."
+    PAID = 2, "Payment received."
+    PAYMENT_FAILED = 3, "Payment failed."
+    PICKING = 4, "Picking started."
+    PACKED = 5, "Packed and ready for pickup."
+    OUT_FOR_DELIVERY = 6, "Out for delivery."
+    DELIVERED = 7, "Delivered."
+    CANCELLED = 8, "Cancelled"
+    REFUND_INITIATED = 9, "Refund initiated."
+    REFUNDED = 10, "Refunded."
+
+
+# Event -> Order.Status shown alongside it (keeps the old `status` key in API output)
+TIMELINE_STATUS = {
+    TimelineEvent.CREATED: Order.Status.PENDING,
+    TimelineEvent.PAID: Order.Status.CONFIRMED,
+    TimelineEvent.PAYMENT_FAILED: Order.Status.PENDING,
+    TimelineEvent.PICKING: Order.Status.PROCESSING,
+    TimelineEvent.PACKED: Order.Status.READY_FOR_PICKUP,
+    TimelineEvent.OUT_FOR_DELIVERY: Order.Status.OUT_FOR_DELIVERY,
+    TimelineEvent.DELIVERED: Order.Status.DELIVERED,
+    TimelineEvent.CANCELLED: Order.Status.CANCELLED,
+    TimelineEvent.REFUND_INITIATED: Order.Status.CANCELLED,
+    TimelineEvent.REFUNDED: Order.Status.CANCELLED,
+}
+
+
+class OrderStatusHistory(models.Model):
+    """
+    Compact timeline: one row per order, events appended to a JSON array of
+    [code, unix_seconds] (or [code, unix_seconds, note] when there is free text,
+    e.g. a cancellation reason). ~10 bytes per event instead of a full row.
+    """
+    order = models.OneToOneField(Order, primary_key=True, related_name='status_history', on_delete=models.CASCADE)
+    events = models.JSONField(default=list)
+
+    def __str__(self):
+        return f"{self.order_id} ({len(self.events)} events)"
@@ -0,0 +1,164 @@
+"""
+Order read model (CQRS projection).
+
+Write paths in orders, payments, warehouse and delivery call
+`OrderProjection.refresh(order_id, <section>)` when they change something a
+customer or ops screen shows. After commit, only that section of the order's
+document is rebuilt from its source table and patched in, so each event
+costs one or two small reads while every order read becomes one PK lookup.
+
+Sections: order (incl. items & timeline), payment, fulfilment, delivery.
+"""
+import logging
+
+from django.apps import apps
+from django.db import IntegrityError, transaction
+
+from .models import Order, OrderReadModel
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ('order', 'payment', 'fulfilment', 'delivery')
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+class OrderProjection:
+
+    # ------------------------------------------------------------------
+    # Section builders (read from the source of truth)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _order_section(order_id):
+        from .serializers import OrderSerializer
+        order = Order.objects.select_related('status_history').prefetch_related('items', 'timeline').filter(id=order_id).first()
+        if order is None:
+            return None, None
+        return order.user_id, dict(OrderSerializer(order).data)
+
+    @staticmethod
+    def _payment_section(order_id):
+        PaymentTransaction = apps.get_model('payments', 'PaymentTransaction')
+        txn = PaymentTransaction.objects.filter(order_id=order_id).order_by('-created_at').first()
+        if txn is None:
+            return None
+        return {
+            "status": txn.status,
+            "gateway_order_id": txn.gateway_order_id,
+            "amount": str(txn.amount),
+            "refunds": [
+                {"status": r.status, "amount": str(r.amount)}
+                for r in txn.refunds.all()
+            ],
+        }
+
+    @staticmethod
+    def _fulfilment_section(order_id):
+        PickingTask = apps.get_model('warehouse', 'PickingTask')
+        task = PickingTask.objects.filter(order_id=order_id).order_by('-created_at').first()
+        if task is None:
+            return None
+        return {
+            "status": task.status,
+            "started_at": _iso(task.started_at),
+            "completed_at": _iso(task.completed_at),
+        }
+
+    @staticmethod
+    def _delivery_section(order_id):
+        DeliveryJob = apps.get_model('delivery', 'DeliveryJob')
+        job = DeliveryJob.objects.select_related('rider').filter(order_id=order_id).first()
+        if job is None:
+            return None
+        rider = job.rider
+        return {
+            "job_id": str(job.id),
+            "status": job.status,
+            "rider": {"name": rider.full_name, "phone": rider.phone} if rider else None,
+            "trip_id": str(job.trip_id) if job.trip_id else None,
+            "stop_sequence": job.stop_sequence,
+            "promised_by": _iso(job.promised_by),
+            "planned_arrival": _iso(job.planned_arrival),
+            "pickup_time": _iso(job.pickup_time),
+            "completion_time": _iso(job.completion_time),
+        }
+
+    # ------------------------------------------------------------------
+    # Projection
+    # ------------------------------------------------------------------
+    @staticmethod
+    @transaction.atomic
+    def apply(order_id, sections):
+        """
+        Rebuilds `sections` of one document in place. Returns the document.
+        """
+        order_id = str(order_id)
+        doc_row = OrderReadModel.objects.select_for_update().filter(order_id=order_id).first()
+
+        user_id = doc_row.user_id if doc_row else None
+        if doc_row is None and 'order' not in sections:
+            # First event for an order we haven't projected yet: build it whole
+            sections = SECTIONS
+
+        document = dict(doc_row.document) if doc_row else {}
+        for section in sections:
+            if section == 'order':
+                user_id, order_data = OrderProjection._order_section(order_id)
+                if order_data is None:
+                    return None
+                # Keep the other sections, refresh the order fields
+                document.update(order_data)
+            else:
+                document[section] = getattr(OrderProjection, f"_{section}_section")(order_id)
+
+        if doc_row is None:
+            doc_row = OrderReadModel(order_id=order_id, user_id=user_id, document=document, version=1)
+            try:
+                with transaction.atomic():
+                    doc_row.save(force_insert=True)
+            except IntegrityError:
+                # A concurrent first event inserted it; it's committed now, so lock and patch that row
+                return OrderProjection.apply(order_id, sections)
+        else:
+            doc_row.document = document
+            doc_row.version += 1
+            doc_row.save(update_fields=['document', 'version', 'updated_at'])
+        return document
+
+    @staticmethod
+    def refresh(order_ids, *sections):
+        """
+        Domain event hook. Safe to call inside a write transaction: runs after
+        commit and never fails the caller (a stale doc is rebuilt on next event
+        or read).
+        """
+        if isinstance(order_ids, (str, bytes)) or not hasattr(order_ids, '__iter__'):
+            order_ids = [order_ids]
+        sections = sections or SECTIONS
+
+        def _run():
+            for order_id in order_ids:
+                try:
+                    OrderProjection.apply(order_id, sections)
+                except Exception as e:
+                    logger.error(f"Order projection failed for {order_id} {sections}: {e}")
+
+        transaction.on_commit(_run)
+
+    @staticmethod
+    def get(order_id, user=None):
+        """
+        One PK lookup; rebuilds on the fly for orders placed before the read model existed.
+        """
+        qs = OrderReadModel.objects.filter(order_id=order_id)
+        if user is not None:
+            qs = qs.filter(user=user)
+        row = qs.values_list('document', flat=True).first()
+        if row is not None:
+            return row
+
+        if user is not None and not Order.objects.filter(id=order_id, user=user).exists():
+            return None
+        return OrderProjection.apply(order_id, SECTIONS)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Order, OrderItem, OrderTimeline
+from .timeline import TimelineService
 
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,7 +14,8 @@ class OrderTimelineSerializer(serializers.ModelSerializer):
 
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
-    timeline = OrderTimelineSerializer(many=True, read_only=True)
+    # Rendered from compact event codes (+ any not-yet-compacted legacy rows)
+    timeline = serializers.SerializerMethodField()
     
     class Meta:
         model = Order
@@ -23,6 +25,21 @@ class OrderSerializer(serializers.ModelSerializer):
             'delivery_address'
         ]
 
+    def get_timeline(self, obj):
+        return TimelineService.render(obj)
+
+class OrderSummarySerializer(serializers.Serializer):
+    """
+    Order history row: built from a narrow .values() projection, no items/timeline.
+    """
+    id = serializers.CharField()
+    status = serializers.CharField()
+    payment_status = serializers.CharField()
+    total_amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    created_at = serializers.DateTimeField()
+    item_count = serializers.IntegerField()
+    first_item_name = serializers.CharField(allow_null=True)
+
 class CartItemSerializer(serializers.Serializer):
     product_id = serializers.UUIDField()
     product_name = serializers.CharField()
@@ -32,4 +49,37 @@ class CartItemSerializer(serializers.Serializer):
 
 class CreateOrderSerializer(serializers.Serializer):
     address_id = serializers.UUIDField()
-    items = CartItemSerializer(many=True)
\ No newline at end of file
+    items = CartItemSerializer(many=True)
+
+class CartQuoteRequestSerializer(serializers.Serializer):
+    class Item(serializers.Serializer):
+        sku_id = serializers.UUIDField()
+        quantity = serializers.IntegerField(min_value=1, max_value=100)
+
+    items = Item(many=True, allow_empty=False)
+
+
+class CartQuoteLineSerializer(serializers.Serializer):
+    sku_id = serializers.UUIDField()
+    sku_code = serializers.CharField()
+    name = serializers.CharField()
+    quantity = serializers.IntegerField()
+    mrp = serializers.DecimalField(max_digits=10, decimal_places=2)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    line_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    tax_rate = serializers.DecimalField(max_digits=5, decimal_places=2)
+    tax_amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    savings = serializers.DecimalField(max_digits=12, decimal_places=2)
+    price_source = serializers.CharField()
+    flash_sale_id = serializers.IntegerField(allow_null=True)
+
+
+class CartQuoteSerializer(serializers.Serializer):
+    """
+    Output of catalog.pricing: the same breakdown create_order charges.
+    """
+    lines = CartQuoteLineSerializer(many=True)
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    tax_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    savings = serializers.DecimalField(max_digits=12, decimal_places=2)
+    unavailable = serializers.ListField(child=serializers.UUIDField())
@@ -2,7 +2,6 @@ import uuid
 import logging
 from django.db import transaction
 from django.utils import timezone
-from decimal import Decimal
 from django.apps import apps
 from django.shortcuts import get_object_or_404
 
@@ -10,10 +9,13 @@ from apps.utils.exceptions import BusinessLogicException
 from apps.utils.utils import generate_order_id
 from apps.inventory.services import InventoryService
 from apps.warehouse.utils.warehouse_selector import WarehouseSelector
-from apps.catalog.models import SKU
+from apps.catalog.flash_sales import FlashSaleEngine
+from apps.catalog.pricing import pricing_engine
 from apps.customers.models import Address
-from .models import Order, OrderItem, OrderTimeline
+from .models import Order, OrderItem, TimelineEvent
+from .timeline import TimelineService
 from .signals import send_order_created
+from .projections import OrderProjection
 
 logger = logging.getLogger(__name__)
 
@@ -53,7 +55,7 @@ class OrderService:
         """
         Secure Order Creation:
         1. Geo-Validate Location (Outside Atomic Block for Performance)
-        2. Fetch SKUs & Calculate Price Server-Side (Security)
+        2. Price Server-Side from the compiled price table (Security)
         3. Reserve Stock & Create Order (Atomic)
         """
         # [PERFORMANCE FIX] Step 1: Pre-Transaction Validation
@@ -71,44 +73,39 @@ class OrderService:
             raise BusinessLogicException("Sorry, we do not deliver to this location.")
 
         # [SECURITY FIX] Step 2: Atomic Logic
+        order_id = generate_order_id()
+        held_sales = []
+        try:
+            return OrderService._create_order_atomic(user, address, warehouse, items, order_id, held_sales)
+        except Exception:
+            # Flash-sale units live in Redis, outside the rollback
+            if held_sales:
+                FlashSaleEngine.release_order(order_id, user.id)
+            raise
+
+    @staticmethod
+    def _create_order_atomic(user, address, warehouse, items, order_id, held_sales):
         with transaction.atomic():
-            # A. Fetch SKUs from DB (Prevents Price Tampering)
-            sku_ids = [item['sku_id'] for item in items]
-            skus_map = SKU.objects.in_bulk(sku_ids)
+            # A. Price server-side from the compiled price table (Prevents Price Tampering)
+            # [PERFORMANCE] No SKU queries: price books, flash sales and GST are resolved in memory
+            quote = pricing_engine.quote(warehouse.id, items)
+            if quote['unavailable']:
+                raise BusinessLogicException(f"Item {quote['unavailable'][0]} is no longer available.")
 
-            final_items = []
-            total_amount = Decimal('0.00')
             inventory_payload = []
+            for line in quote['lines']:
+                sale_id = line['flash_sale_id']
+                if sale_id is not None:
+                    # Atomic Redis quota check; sold_quantity is written back by beat
+                    held_sales.append(sale_id)
+                    FlashSaleEngine.reserve(quote['flash_sales'][sale_id], user.id, line['quantity'], order_id, name=line['name'])
 
-            for item in items:
-                sku_id = item['sku_id']
-                qty = item['quantity']
-
-                sku = skus_map.get(sku_id)
-                if not sku:
-                    raise BusinessLogicException(f"Item {sku_id} is no longer available.")
-                
-                if not sku.is_active:
-                    raise BusinessLogicException(f"Item {sku.name} is currently unavailable.")
-
-                # TRUSTED PRICE CALCULATION
-                line_total = sku.sale_price * qty
-                total_amount += line_total
-
-                final_items.append({
-                    'sku': sku,
-                    'quantity': qty,
-                    'unit_price': sku.sale_price,
-                    'total_price': line_total
-                })
-                
                 inventory_payload.append({
-                    "product_id": sku.id,
-                    "quantity": qty
+                    "product_id": line['sku_id'],
+                    "quantity": line['quantity']
                 })
 
             # B. Reserve Stock
-            order_id = generate_order_id()
             InventoryService.reserve_stock(
                 warehouse_id=warehouse.id,
                 items=inventory_payload,
@@ -121,7 +118,7 @@ class OrderService:
                 user=user,
                 warehouse_id=warehouse.id,
                 delivery_address=address.as_dict(),
-                total_amount=total_amount,
+                total_amount=quote['subtotal'],
                 status=Order.Status.PENDING
             )
 
@@ -129,23 +126,20 @@ class OrderService:
             order_items = [
                 OrderItem(
                     order=order,
-                    product_id=data['sku'].id,
-                    product_name=data['sku'].name,
-                    sku_code=data['sku'].sku_code,
-                    quantity=data['quantity'],
-                    unit_price=data['unit_price'],
-                    total_price=data['total_price']
-                ) for data in final_items
+                    product_id=line['sku_id'],
+                    product_name=line['name'],
+                    sku_code=line['sku_code'],
+                    quantity=line['quantity'],
+                    unit_price=line['unit_price'],
+                    total_price=line['line_total']
+                ) for line in quote['lines']
             ]
             OrderItem.objects.bulk_create(order_items)
 
             # E. Timeline
-            OrderTimeline.objects.create(
-                order=order, 
-                status=Order.Status.PENDING, 
-                description="Order created, waiting for payment."
-            )
+            TimelineService.record(order, TimelineEvent.CREATED, created=True)
 
+            OrderProjection.refresh(order.id)
             return order
 
     @staticmethod
@@ -165,11 +159,7 @@ class OrderService:
         order.payment_id = payment_id
         order.save(update_fields=['status', 'payment_status', 'payment_id', 'updated_at'])
 
-        OrderTimeline.objects.create(
-            order=order, 
-            status=Order.Status.CONFIRMED, 
-            description="Payment received."
-        )
+        TimelineService.record(order, TimelineEvent.PAID)
 
         # Notify Warehouse (Async)
         items_payload = [
@@ -183,6 +173,7 @@ class OrderService:
             warehouse_id=order.warehouse_id
         )
 
+        OrderProjection.refresh(order.id, 'order')
         return order
 
     @staticmethod
@@ -207,21 +198,22 @@ class OrderService:
             items=inventory_items,
             reference=f"CANCEL-{order.id}"
         )
+        user_id = order.user_id
+        transaction.on_commit(lambda: FlashSaleEngine.release_order(order.id, user_id))
 
-        # 2. Trigger Refund (if paid)
+        # 2. Queue Refund (if paid)
+        # [PERFORMANCE] Only the intent is written here; the gateway call runs in
+        # process_refunds_task after commit. payment_status flips to REFUNDED
+        # when the gateway confirms.
         if order.payment_status == Order.PaymentStatus.PAID:
             from apps.payments.services import PaymentService
-            PaymentService.initiate_refund(order) 
-            order.payment_status = Order.PaymentStatus.REFUNDED
+            PaymentService.initiate_refund(order, reason=reason)
 
         # 3. Update Status
         order.status = Order.Status.CANCELLED
         order.save(update_fields=['status', 'payment_status', 'updated_at'])
 
-        OrderTimeline.objects.create(
-            order=order,
-            status=Order.Status.CANCELLED,
-            description=f"Cancelled: {reason}"
-        )
-        
-        return order
\ No newline at end of file
+        TimelineService.record(order, TimelineEvent.CANCELLED, note=reason)
+
+        OrderProjection.refresh(order.id, 'order', 'payment')
+        return order
@@ -0,0 +1,148 @@
+"""
+Compact order timeline (see models.timeline.OrderStatusHistory).
+"""
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import F, Func, JSONField, Value
+
+from .models import Order, OrderTimeline, OrderStatusHistory, TimelineEvent
+from .models.timeline import TIMELINE_STATUS
+
+
+class JSONBAppend(Func):
+    """
+    `column || value` on jsonb: appends in SQL, no read-modify-write.
+    """
+    arg_joiner = " || "
+    template = "%(expressions)s"
+    output_field = JSONField()
+
+
+class TimelineService:
+    """
+    Order timeline writes/reads. ORDER_TIMELINE_STORAGE:
+        'compact' -> OrderStatusHistory only (default)
+        'dual'    -> compact + legacy OrderTimeline row (rollout / rollback window)
+        'legacy'  -> OrderTimeline rows only
+    """
+    NOTE_MAX_LENGTH = 120
+
+    # Legacy OrderTimeline.status -> event code (compact_order_timeline command)
+    LEGACY_STATUS_EVENTS = {
+        Order.Status.PENDING: TimelineEvent.CREATED,
+        Order.Status.CONFIRMED: TimelineEvent.PAID,
+        Order.Status.PROCESSING: TimelineEvent.PICKING,
+        Order.Status.READY_FOR_PICKUP: TimelineEvent.PACKED,
+        Order.Status.OUT_FOR_DELIVERY: TimelineEvent.OUT_FOR_DELIVERY,
+        Order.Status.DELIVERED: TimelineEvent.DELIVERED,
+        Order.Status.CANCELLED: TimelineEvent.CANCELLED,
+    }
+
+    @staticmethod
+    def entry(event, at=None, note=""):
+        entry = [int(event), int(at if at is not None else time.time())]
+        if note:
+            entry.append(note[:TimelineService.NOTE_MAX_LENGTH])
+        return entry
+
+    @staticmethod
+    def record(order, event, note="", created=False):
+        """
+        Appends one event. `created=True` skips the UPDATE attempt for brand-new orders.
+        """
+        mode = getattr(settings, 'ORDER_TIMELINE_STORAGE', 'compact')
+
+        if mode in ('compact', 'dual'):
+            TimelineService.append(order.id, [TimelineService.entry(event, note=note)], created=created)
+
+        if mode in ('legacy', 'dual'):
+            OrderTimeline.objects.create(
+                order=order,
+                status=TIMELINE_STATUS[event],
+                description=TimelineService.describe(event, note)
+            )
+
+    @staticmethod
+    def append(order_id, entries, created=False):
+        if not created:
+            updated = OrderStatusHistory.objects.filter(order_id=order_id).update(
+                events=JSONBAppend(F('events'), Value(entries, output_field=JSONField()))
+            )
+            if updated:
+                return
+        try:
+            with transaction.atomic():
+                OrderStatusHistory.objects.create(order_id=order_id, events=entries)
+        except IntegrityError:
+            # Concurrent first event for this order: append to the row that won
+            OrderStatusHistory.objects.filter(order_id=order_id).update(
+                events=JSONBAppend(F('events'), Value(entries, output_field=JSONField()))
+            )
+
+    @staticmethod
+    def describe(event, note=""):
+        text = TimelineEvent(event).label
+        return f"{text}: {note}" if note else text
+
+    @staticmethod
+    def mirror_keys(events):
+        """
+        (status, second) of each compact event, counted. In 'dual' mode every
+        event is also written as a legacy row; is_mirrored() pairs such a row
+        with its compact entry so it is shown/moved once. Legacy rows with no
+        matching entry (pre-rollout, or written after a rollback to 'legacy')
+        are real history and are kept.
+        """
+        return Counter((TIMELINE_STATUS.get(entry[0], ""), int(entry[1])) for entry in events or ())
+
+    @staticmethod
+    def is_mirrored(status, legacy_ts, keys):
+        # The legacy row is written just after the compact entry: allow it to land in the next second.
+        # Each compact entry pairs with at most one legacy row.
+        for ts in (legacy_ts, legacy_ts - 1):
+            if keys[(status, ts)] > 0:
+                keys[(status, ts)] -= 1
+                return True
+        return False
+
+    @staticmethod
+    def render(order):
+        """
+        API shape (status / description / created_at), compact events plus any
+        legacy rows not yet compacted (minus dual-written copies), oldest first.
+        """
+        try:
+            events = order.status_history.events
+        except OrderStatusHistory.DoesNotExist:
+            events = []
+
+        rows = []
+        keys = TimelineService.mirror_keys(events)
+        for legacy in order.timeline.all():
+            ts = int(legacy.created_at.timestamp())
+            if TimelineService.is_mirrored(legacy.status, ts, keys):
+                continue
+            rows.append((ts, {
+                "status": legacy.status,
+                "description": legacy.description,
+                "created_at": legacy.created_at.isoformat(),
+            }))
+
+        for entry in events:
+            code, ts = entry[0], entry[1]
+            note = entry[2] if len(entry) > 2 else ""
+            rows.append((ts, {
+                "status": TIMELINE_STATUS.get(code, ""),
+                "code": code,
+                "description": TimelineService.describe(code, note),
+                "created_at": datetime.fromtimestamp(ts, tz=dt_timezone.utc).isoformat(),
+            }))
+
+        # Second resolution on both sides; stable sort keeps write order within a second
+        rows.sort(key=lambda r: r[0])
+        return [r[1] for r in rows]
+
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import OrderViewSet, CreateOrderView
+from .views import OrderViewSet, CreateOrderView, CartQuoteView
 
 router = DefaultRouter()
 router.register(r'orders', OrderViewSet, basename='orders')
 
 urlpatterns = [
+    path('cart/quote/', CartQuoteView.as_view(), name='cart-quote'),
     path('checkout/', CreateOrderView.as_view(), name='checkout'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,23 +1,60 @@
+from django.conf import settings
+from django.urls import reverse
 from rest_framework import viewsets, views, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 
-from .models import Order
-from .serializers import OrderSerializer, CreateOrderSerializer
+from apps.utils.pagination import KeysetPagination
+from .models import Order, OrderItem
+from .serializers import (
+    OrderSerializer, OrderSummarySerializer, CreateOrderSerializer, CartQuoteRequestSerializer, CartQuoteSerializer,
+)
 from .services import OrderService, CartService
+from .projections import OrderProjection
 from apps.customers.models import Address
+from apps.catalog.pricing import pricing_engine
+from apps.warehouse.utils.warehouse_selector import WarehouseSelector
 
 class OrderViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
+        orders = Order.objects.filter(user=self.request.user)
+
+        if self.action == 'list':
+            # [PERFORMANCE] History list: summary projection only, keyset paginated
+            # (order_user_history_idx). Items/timeline load on retrieve.
+            # Correlated subqueries (not JOIN + GROUP BY) so they only run for the page's rows
+            items = OrderItem.objects.filter(order=OuterRef('pk'))
+            item_count = items.order_by().values('order').annotate(n=Count('id')).values('n')[:1]
+            first_item = items.order_by('id').values('product_name')[:1]
+            return orders.annotate(
+                item_count=Coalesce(Subquery(item_count, output_field=IntegerField()), Value(0)),
+                first_item_name=Subquery(first_item),
+            ).values(
+                'id', 'status', 'payment_status', 'total_amount', 'created_at',
+                'item_count', 'first_item_name'
+            )
+
         # [OPTIMIZATION FIX] Prevent N+1 queries by prefetching related items and timeline
-        return Order.objects.filter(user=self.request.user)\
-            .select_related('warehouse')\
-            .prefetch_related('items', 'timeline')\
-            .order_by('-created_at')
+        return orders.select_related('status_history').prefetch_related('items', 'timeline')
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return OrderSummarySerializer
+        return OrderSerializer
+
+    def retrieve(self, request, pk=None):
+        # [PERFORMANCE] Detail & tracking: one read-model row instead of 5+ queries
+        document = OrderProjection.get(pk, user=request.user)
+        if document is None:
+            return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(document)
 
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
@@ -27,6 +64,23 @@ class OrderViewSet(viewsets.ReadOnlyModelViewSet):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+class CartQuoteView(views.APIView):
+    """
+    POST {"items": [{"sku_id", "quantity"}]} with ?warehouse_id= or ?lat=&lng=.
+    Prices the cart exactly as checkout will (catalog.pricing), with no SKU queries.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        warehouse_id = WarehouseSelector.warehouse_id_from_request(request)
+        if not warehouse_id:
+            return Response({"error": "warehouse_id or lat/lng is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = CartQuoteRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        quote = pricing_engine.quote(warehouse_id, serializer.validated_data['items'])
+        return Response(CartQuoteSerializer(quote).data)
+
 class CreateOrderView(views.APIView):
     permission_classes = [IsAuthenticated]
 
@@ -49,6 +103,16 @@ class CreateOrderView(views.APIView):
             
             # 3. Initiate Payment
             from apps.payments.services import PaymentService
+            if getattr(settings, 'CHECKOUT_ASYNC_GATEWAY', False):
+                # [PERFORMANCE] Don't hold this request on gateway latency:
+                # the client polls payments/checkout/<order_id>/ for the modal payload
+                PaymentService.request_payment_order(order)
+                return Response({
+                    "order_id": order.id,
+                    "payment": None,
+                    "payment_url": reverse('payment-checkout', args=[order.id])
+                }, status=status.HTTP_202_ACCEPTED)
+
             payment_payload = PaymentService.create_payment_order(order)
             
             return Response({
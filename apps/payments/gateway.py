@@ -0,0 +1,144 @@
+"""
+Razorpay gateway client.
+
+One razorpay.Client per worker process, backed by a keep-alive requests
+session (pooled TLS connections instead of a handshake per call), with
+default connect/read timeouts and the shared circuit breaker around every
+network call.
+
+Sync callers (services, Celery tasks) use the plain methods. ASGI views use
+the `a*` coroutines, which run the same pooled client on a worker thread so
+the event loop never blocks on gateway I/O.
+"""
+import os
+import logging
+import threading
+
+import razorpay
+import requests
+from requests.adapters import HTTPAdapter
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from apps.utils.exceptions import BusinessLogicException
+from apps.utils.resilience import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+
+class _TimeoutSession(requests.Session):
+    """
+    requests has no session-wide timeout; the razorpay SDK never passes one.
+    """
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+class RazorpayGateway:
+    """
+    Use the module-level `razorpay_gateway` instance.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.breaker = CircuitBreaker(
+            service_name="razorpay",
+            failure_threshold=getattr(settings, 'RAZORPAY_CB_FAILURE_THRESHOLD', 5),
+            recovery_timeout=getattr(settings, 'RAZORPAY_CB_RECOVERY_SECONDS', 30),
+            # 4xx / bad signatures are request problems, not a gateway outage
+            ignore=(razorpay.errors.BadRequestError, razorpay.errors.SignatureVerificationError),
+        )
+
+    @property
+    def client(self):
+        # Rebuild after fork (Celery prefork / gunicorn preload): sockets must not be shared
+        pid = os.getpid()
+        if self._client is None or self._pid != pid:
+            with self._lock:
+                if self._client is None or self._pid != pid:
+                    self._client = self._build_client()
+                    self._pid = pid
+        return self._client
+
+    @staticmethod
+    def _build_client():
+        if not settings.RAZORPAY_KEY_ID or not settings.RAZORPAY_KEY_SECRET:
+            raise BusinessLogicException("Payment Gateway not configured.")
+
+        session = _TimeoutSession(timeout=(
+            getattr(settings, 'RAZORPAY_CONNECT_TIMEOUT', 3),
+            getattr(settings, 'RAZORPAY_READ_TIMEOUT', 10),
+        ))
+        # No transport retries: order/refund creation is not idempotent on their side
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=getattr(settings, 'RAZORPAY_POOL_SIZE', 20),
+            max_retries=0,
+        )
+        session.mount('https://', adapter)
+        return razorpay.Client(session=session, auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
+
+    def _call(self, func, *args, **kwargs):
+        return self.breaker.call(func, *args, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Gateway calls (sync)
+    # ------------------------------------------------------------------
+    def create_order(self, data):
+        return self._call(self.client.order.create, data)
+
+    def fetch_order(self, gateway_order_id):
+        return self._call(self.client.order.fetch, gateway_order_id)
+
+    def order_payments(self, gateway_order_id):
+        return self._call(self.client.order.payments, gateway_order_id)
+
+    def refund(self, gateway_payment_id, data):
+        return self._call(self.client.payment.refund, gateway_payment_id, data)
+
+    def payment_refunds(self, gateway_payment_id):
+        return self._call(self.client.payment.fetch_multiple_refund, gateway_payment_id)
+
+    def list_payments(self, from_ts, to_ts, count=100, skip=0):
+        """
+        One page of payments created in [from_ts, to_ts] (unix seconds).
+        """
+        return self._call(self.client.payment.all, {
+            "from": int(from_ts), "to": int(to_ts), "count": count, "skip": skip
+        })
+
+    # Local HMAC checks: no network, no breaker
+    def verify_payment_signature(self, payload):
+        return self.client.utility.verify_payment_signature(payload)
+
+    def verify_webhook_signature(self, body, signature, secret):
+        return self.client.utility.verify_webhook_signature(body, signature, secret)
+
+    # ------------------------------------------------------------------
+    # Gateway calls (async, for ASGI views)
+    # ------------------------------------------------------------------
+    async def acreate_order(self, data):
+        return await sync_to_async(self.create_order, thread_sensitive=False)(data)
+
+    async def afetch_order(self, gateway_order_id):
+        return await sync_to_async(self.fetch_order, thread_sensitive=False)(gateway_order_id)
+
+    async def aorder_payments(self, gateway_order_id):
+        return await sync_to_async(self.order_payments, thread_sensitive=False)(gateway_order_id)
+
+    async def apayment_refunds(self, gateway_payment_id):
+        return await sync_to_async(self.payment_refunds, thread_sensitive=False)(gateway_payment_id)
+
+    async def arefund(self, gateway_payment_id, data):
+        return await sync_to_async(self.refund, thread_sensitive=False)(gateway_payment_id, data)
+
+
+razorpay_gateway = RazorpayGateway()
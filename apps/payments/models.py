@@ -30,18 +30,64 @@ class PaymentTransaction(TimestampedModel):
         return f"{self.order_id} - {self.status}"
 
 class RefundRecord(TimestampedModel):
+    """
+    Refund intent + gateway state. Written in the cancellation transaction,
+    submitted to the gateway later by the refund worker.
+    """
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        SUBMITTING = "submitting", "Submitting"
+        PENDING = "pending", "Pending at Gateway"
+        PROCESSED = "processed", "Processed"
+        FAILED = "failed", "Failed"
+
     transaction = models.ForeignKey(PaymentTransaction, on_delete=models.PROTECT, related_name='refunds')
-    gateway_refund_id = models.CharField(max_length=100, unique=True)
+    # Deterministic per (transaction, amount); sent as the gateway receipt so a
+    # retried submit can find the refund it may already have created
+    idempotency_key = models.CharField(max_length=100, unique=True)
+    gateway_refund_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
-    status = models.CharField(max_length=50) # processed, pending, failed
+    status = models.CharField(max_length=50, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Backoff after a failed submit; the worker skips the row until then
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
     notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    @staticmethod
+    def key_for(txn, amount):
+        return f"rfnd_{txn.id.hex[:20]}_{int(amount * 100)}"
+
 class WebhookEvent(models.Model):
     """
-    Idempotency Log: Keeps track of processed webhook events.
+    Idempotency Log + ingestion queue for gateway webhooks.
+    The view only inserts (ON CONFLICT DO NOTHING on event_id); workers drain
+    unprocessed rows in batches (see PaymentService.drain_webhook_events).
     """
     event_id = models.CharField(max_length=100, unique=True)
     event_type = models.CharField(max_length=100)
+    # Razorpay order id the event belongs to (grouping key for batch processing)
+    gateway_order_id = models.CharField(max_length=100, blank=True, db_index=True)
     payload = models.JSONField()
     received_at = models.DateTimeField(auto_now_add=True)
-    processed = models.BooleanField(default=False)
\ No newline at end of file
+    processed = models.BooleanField(default=False)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Backoff after a failed group; the drain skips the event until then
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Drain queue: oldest unprocessed first
+            models.Index(fields=['processed', 'received_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} ({self.event_id})"
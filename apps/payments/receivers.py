@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import PaymentTransaction
+from .status import PaymentStatusCache
+from apps.orders.projections import OrderProjection
+
+
+@receiver(post_save, sender=PaymentTransaction)
+def publish_payment_status(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Keeps the per-order payment status key in step with every transition.
+    Published after commit so pollers never see a rolled-back state.
+    """
+    if not created and update_fields is not None and 'status' not in update_fields:
+        return
+    transaction.on_commit(lambda: PaymentStatusCache.publish(instance))
+    OrderProjection.refresh(instance.order_id, 'payment')
@@ -0,0 +1,154 @@
+"""
+Bulk payment reconciliation.
+
+Pages through every gateway payment in a time window (a handful of list
+calls instead of two API calls per order), joins them in memory against
+PaymentTransaction on gateway_order_id and:
+- recovers captures we never heard about (lost webhook / closed modal)
+- flags captured amounts that don't match what we charged
+- flags captures on transactions we recorded as FAILED (money taken, order failed)
+- reports captured payments for orders we don't know
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import PaymentTransaction
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100        # Razorpay max per list call
+LOOKUP_CHUNK = 500     # gateway_order_id__in chunk for the DB join
+
+
+@dataclass
+class ReconciliationReport:
+    window_start: object
+    window_end: object
+    gateway_payments: int = 0
+    captured: int = 0
+    matched: int = 0
+    recovered: list = field(default_factory=list)          # gateway_order_ids marked paid
+    amount_mismatches: list = field(default_factory=list)  # dicts, need a human
+    status_mismatches: list = field(default_factory=list)  # dicts: captured at gateway, FAILED locally
+    unknown_orders: list = field(default_factory=list)     # captured, no local transaction
+    errors: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {
+            "window_start": self.window_start.isoformat(),
+            "window_end": self.window_end.isoformat(),
+            "gateway_payments": self.gateway_payments,
+            "captured": self.captured,
+            "matched": self.matched,
+            "recovered": self.recovered,
+            "amount_mismatches": self.amount_mismatches,
+            "status_mismatches": self.status_mismatches,
+            "unknown_orders": self.unknown_orders,
+            "errors": self.errors,
+        }
+
+
+class PaymentReconciler:
+    """
+    `gateway` needs list_payments(from_ts, to_ts, count, skip); see
+    gateway.RazorpayGateway (production) and testing.FakeGateway (tests).
+    """
+
+    def __init__(self, gateway=None):
+        if gateway is None:
+            from .gateway import razorpay_gateway
+            gateway = razorpay_gateway
+        self.gateway = gateway
+
+    def iter_payments(self, start, end):
+        skip = 0
+        while True:
+            page = self.gateway.list_payments(start.timestamp(), end.timestamp(), count=PAGE_SIZE, skip=skip)
+            items = page.get('items', [])
+            yield from items
+            if len(items) < PAGE_SIZE:
+                return
+            skip += len(items)
+
+    def run(self, start=None, end=None):
+        end = end or timezone.now()
+        start = start or end - timedelta(hours=2)
+        report = ReconciliationReport(window_start=start, window_end=end)
+
+        # 1. One paged sweep; keep the captured payment per gateway order
+        captured = {}
+        for payment in self.iter_payments(start, end):
+            report.gateway_payments += 1
+            if payment.get('status') == 'captured' and payment.get('order_id'):
+                captured.setdefault(payment['order_id'], payment)
+        report.captured = len(captured)
+
+        # 2. In-memory join against local transactions (chunked IN queries)
+        order_ids = list(captured)
+        txns = {}
+        for i in range(0, len(order_ids), LOOKUP_CHUNK):
+            chunk = order_ids[i:i + LOOKUP_CHUNK]
+            for txn in PaymentTransaction.objects.filter(gateway_order_id__in=chunk).only(
+                'id', 'gateway_order_id', 'amount', 'status', 'order_id'
+            ):
+                txns[txn.gateway_order_id] = txn
+
+        # 3. Diff
+        for gateway_order_id, payment in captured.items():
+            txn = txns.get(gateway_order_id)
+            if txn is None:
+                report.unknown_orders.append(gateway_order_id)
+                continue
+
+            expected_paise = int(txn.amount * 100)
+            if int(payment.get('amount', 0)) != expected_paise:
+                report.amount_mismatches.append({
+                    "gateway_order_id": gateway_order_id,
+                    "payment_id": payment.get('id'),
+                    "order_id": str(txn.order_id),
+                    "expected_paise": expected_paise,
+                    "captured_paise": int(payment.get('amount', 0)),
+                })
+                continue
+
+            if txn.status == PaymentTransaction.Status.FAILED:
+                # Customer was charged but we gave up on the order: needs a refund or a manual fix
+                report.status_mismatches.append({
+                    "gateway_order_id": gateway_order_id,
+                    "payment_id": payment.get('id'),
+                    "order_id": str(txn.order_id),
+                    "local_status": txn.status,
+                    "captured_paise": int(payment.get('amount', 0)),
+                })
+                continue
+
+            if txn.status != PaymentTransaction.Status.PENDING:
+                report.matched += 1
+                continue
+
+            self._recover(txn, payment, report)
+
+        logger.info(
+            f"Reconciliation {start:%H:%M}-{end:%H:%M}: {report.gateway_payments} payments, "
+            f"{len(report.recovered)} recovered, {len(report.amount_mismatches)} amount mismatches, "
+            f"{len(report.status_mismatches)} captured-but-failed, "
+            f"{len(report.unknown_orders)} unknown"
+        )
+        return report
+
+    @staticmethod
+    def _recover(txn, payment, report):
+        from .services import PaymentService
+        try:
+            PaymentService.process_payment_success({
+                'razorpay_order_id': txn.gateway_order_id,
+                'razorpay_payment_id': payment['id'],
+                'razorpay_signature': None # Trusted: fetched from the gateway API directly
+            })
+            report.recovered.append(txn.gateway_order_id)
+        except Exception as e:
+            logger.error(f"Reconciliation recovery failed for {txn.gateway_order_id}: {e}")
+            report.errors.append({"gateway_order_id": txn.gateway_order_id, "error": str(e)})
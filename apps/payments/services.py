@@ -1,13 +1,20 @@
+import json
 import razorpay
 import logging
+from collections import defaultdict
 from django.conf import settings
 from django.db import transaction
+from django.db.models import F, Q
 from django.utils import timezone
+from datetime import timedelta
 from decimal import Decimal
 
 from apps.utils.exceptions import BusinessLogicException
+from apps.orders.models import Order
 from apps.orders.services import OrderService
+from apps.orders.projections import OrderProjection
 from .models import PaymentTransaction, RefundRecord, WebhookEvent
+from .gateway import razorpay_gateway
 
 logger = logging.getLogger(__name__)
 
@@ -15,9 +22,10 @@ class PaymentService:
     
     @staticmethod
     def _get_client():
-        if not settings.RAZORPAY_KEY_ID or not settings.RAZORPAY_KEY_SECRET:
-            raise BusinessLogicException("Payment Gateway not configured.")
-        return razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
+        """
+        [PERFORMANCE] Pooled per-process gateway (keep-alive, timeouts, circuit breaker).
+        """
+        return razorpay_gateway
 
 
     @staticmethod
@@ -36,14 +44,14 @@ class PaymentService:
 
             # 2. Query Razorpay API
             client = PaymentService._get_client()
-            rzp_order = client.order.fetch(txn.gateway_order_id)
+            rzp_order = client.fetch_order(txn.gateway_order_id)
             
             # 3. Check if status is 'paid' at the source
             if rzp_order.get('status') == 'paid':
                 logger.info(f"Payment Sync: Found PAID status for Order {order.id} on Gateway. Recovering...")
                 
                 # Fetch payments linked to this order to get the payment ID
-                payments = client.order.payments(txn.gateway_order_id)
+                payments = client.order_payments(txn.gateway_order_id)
                 if payments and 'items' in payments:
                     # Find the first successful 'captured' payment
                     successful_payment = next((p for p in payments['items'] if p['status'] == 'captured'), None)
@@ -65,38 +73,75 @@ class PaymentService:
             return False
 
     @staticmethod
-    @transaction.atomic
     def create_payment_order(order):
         """
         Initiates a payment session with Razorpay.
+        [PERFORMANCE] The gateway call runs outside any transaction: holding a DB
+        connection across network latency drains the pool during sales.
+        Safe to call twice (checkout retry / async task redelivery).
         """
+        existing = PaymentService.get_pending_transaction(order)
+        if existing:
+            return PaymentService.checkout_payload(order, existing)
+
         client = PaymentService._get_client()
         amount_paise = int(order.total_amount * 100)
-        
+
         try:
-            gateway_order = client.order.create({
+            gateway_order = client.create_order({
                 "amount": amount_paise,
                 "currency": "INR",
                 "receipt": str(order.id),
-                "notes": {"user_id": str(order.user.id)}
+                "notes": {"user_id": str(order.user_id)}
             })
         except Exception as e:
             logger.error(f"Razorpay Create Error: {e}")
             raise BusinessLogicException("Failed to initiate payment gateway.")
 
-        # Create Transaction Record
-        PaymentTransaction.objects.create(
-            order=order,
-            gateway_order_id=gateway_order['id'],
-            amount=order.total_amount,
-            status=PaymentTransaction.Status.PENDING
-        )
-        
+        # Short transaction only for the local write
+        with transaction.atomic():
+            # Serialise concurrent creators on the order row; a losing racer's
+            # gateway order is simply never paid and expires on Razorpay's side
+            Order.objects.select_for_update().only('id').get(id=order.id)
+            txn = PaymentService.get_pending_transaction(order)
+            if txn is None:
+                txn = PaymentTransaction.objects.create(
+                    order=order,
+                    gateway_order_id=gateway_order['id'],
+                    amount=order.total_amount,
+                    status=PaymentTransaction.Status.PENDING
+                )
+
+        return PaymentService.checkout_payload(order, txn)
+
+    @staticmethod
+    def request_payment_order(order):
+        """
+        Async checkout: gateway order is created by a worker, the client polls
+        PaymentCheckoutView. Debounced so repeated polls don't pile up tasks.
+        """
+        from django.core.cache import cache
+        from .tasks import create_gateway_order_task
+
+        if cache.add(f"gw_order_requested:{order.id}", 1, timeout=30):
+            transaction.on_commit(lambda: create_gateway_order_task.delay(str(order.id)))
+
+    @staticmethod
+    def get_pending_transaction(order):
+        return PaymentTransaction.objects.filter(
+            order=order, status=PaymentTransaction.Status.PENDING
+        ).order_by('created_at').first()
+
+    @staticmethod
+    def checkout_payload(order, txn):
+        """
+        What the Razorpay checkout modal needs.
+        """
         return {
             "key": settings.RAZORPAY_KEY_ID,
-            "order_id": gateway_order['id'],
-            "amount": amount_paise,
-            "currency": "INR",
+            "order_id": txn.gateway_order_id,
+            "amount": int(txn.amount * 100),
+            "currency": txn.currency,
             "name": "QuickDash",
             "description": f"Order #{order.id}"
         }
@@ -124,7 +169,7 @@ class PaymentService:
         if sig:
             client = PaymentService._get_client()
             try:
-                client.utility.verify_payment_signature(payload)
+                client.verify_payment_signature(payload)
             except razorpay.errors.SignatureVerificationError:
                 txn.status = PaymentTransaction.Status.FAILED
                 txn.error_details = {"error": "Signature Verification Failed"}
@@ -142,45 +187,313 @@ class PaymentService:
         return True
 
     @staticmethod
-    def initiate_refund(order):
+    def initiate_refund(order, reason: str = ""):
         """
-        Called when an Order is Cancelled.
+        Called when an Order is Cancelled, inside the cancellation transaction.
+        Only records the refund intent; the gateway call happens in
+        process_refunds_task after commit, so cancellation never waits on
+        (or fails because of) the gateway.
         """
-        try:
-            # Find the successful transaction
-            txn = order.transactions.filter(status=PaymentTransaction.Status.SUCCESS).first()
-            if not txn:
-                logger.warning(f"No successful transaction found for Order {order.id} to refund.")
-                return
+        txn = PaymentTransaction.objects.select_for_update().filter(
+            order=order, status=PaymentTransaction.Status.SUCCESS
+        ).first()
+        if not txn:
+            logger.warning(f"No successful transaction found for Order {order.id} to refund.")
+            return None
 
-            client = PaymentService._get_client()
-            
-            # Full Refund
-            refund_data = client.payment.refund(txn.gateway_payment_id, {
-                "amount": int(txn.amount * 100),
-                "speed": "normal"
-            })
+        # Full Refund
+        refund, created = RefundRecord.objects.get_or_create(
+            idempotency_key=RefundRecord.key_for(txn, txn.amount),
+            defaults={'transaction': txn, 'amount': txn.amount, 'notes': reason}
+        )
+        txn.status = PaymentTransaction.Status.REFUND_INITIATED
+        txn.save(update_fields=['status', 'updated_at'])
+
+        if created:
+            from .tasks import process_refunds_task
+            transaction.on_commit(lambda: process_refunds_task.delay())
+        return refund
+
+    @staticmethod
+    def _refund_bucket():
+        from apps.utils.resilience import TokenBucket
+        # One bucket per gateway account: every worker shares the account's limit
+        return TokenBucket(
+            f"razorpay_refunds:{settings.RAZORPAY_KEY_ID}",
+            rate=getattr(settings, 'REFUND_RATE_PER_SECOND', 5),
+            capacity=getattr(settings, 'REFUND_BURST', 10),
+        )
 
-            RefundRecord.objects.create(
-                transaction=txn,
-                gateway_refund_id=refund_data['id'],
-                amount=txn.amount,
-                status=refund_data['status']
+    @staticmethod
+    def process_refund_batch(batch_size: int = None):
+        """
+        Submits queued refunds to the gateway, rate limited.
+        Returns (submitted, throttled): submitted counts gateway-accepted refunds
+        only; throttled means tokens ran out and the rest of the batch was put back.
+        Failed submits are re-queued with exponential backoff (next_attempt_at).
+        """
+        batch_size = batch_size or getattr(settings, 'REFUND_BATCH_SIZE', 50)
+        max_attempts = getattr(settings, 'REFUND_MAX_ATTEMPTS', 8)
+        now = timezone.now()
+        stuck_before = now - timedelta(minutes=5)
+
+        # 1. Claim (short transaction, no network I/O under the locks)
+        with transaction.atomic():
+            # Worker died mid-submit? The idempotency key makes re-submitting safe
+            RefundRecord.objects.filter(
+                status=RefundRecord.Status.SUBMITTING, updated_at__lt=stuck_before
+            ).update(status=RefundRecord.Status.QUEUED)
+
+            claimed = list(
+                RefundRecord.objects.select_for_update(skip_locked=True)
+                .filter(status=RefundRecord.Status.QUEUED, attempts__lt=max_attempts)
+                .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+                .select_related('transaction')
+                .order_by('created_at')[:batch_size]
             )
-            
-            txn.status = PaymentTransaction.Status.REFUNDED
-            txn.save()
-            logger.info(f"Refund processed for Order {order.id}")
+            RefundRecord.objects.filter(id__in=[r.id for r in claimed]).update(
+                status=RefundRecord.Status.SUBMITTING, attempts=F('attempts') + 1, updated_at=timezone.now()
+            )
+
+        # 2. Submit at the gateway's pace
+        bucket = PaymentService._refund_bucket()
+        submitted = 0
+        for i, refund in enumerate(claimed):
+            if not bucket.consume():
+                RefundRecord.objects.filter(id__in=[r.id for r in claimed[i:]]).update(
+                    status=RefundRecord.Status.QUEUED, attempts=F('attempts') - 1
+                )
+                return submitted, True
+            refund.attempts += 1
+            if PaymentService.submit_refund(refund, max_attempts):
+                submitted += 1
+        return submitted, False
 
+    @staticmethod
+    def refund_retry_delay(attempts: int):
+        base = getattr(settings, 'REFUND_RETRY_BASE_SECONDS', 30)
+        cap = getattr(settings, 'REFUND_RETRY_MAX_SECONDS', 3600)
+        return timedelta(seconds=min(cap, base * 2 ** max(0, attempts - 1)))
+
+    @staticmethod
+    def submit_refund(refund, max_attempts: int):
+        txn = refund.transaction
+        client = PaymentService._get_client()
+        try:
+            gateway_refund = None
+            if refund.attempts > 1:
+                # A previous attempt may have reached the gateway before failing locally
+                existing = client.payment_refunds(txn.gateway_payment_id).get('items', [])
+                gateway_refund = next((r for r in existing if r.get('receipt') == refund.idempotency_key), None)
+
+            if gateway_refund is None:
+                gateway_refund = client.refund(txn.gateway_payment_id, {
+                    "amount": int(refund.amount * 100),
+                    "speed": "normal",
+                    "receipt": refund.idempotency_key,
+                    "notes": {"order_id": str(txn.order_id)}
+                })
         except Exception as e:
-            logger.error(f"Refund Failed for Order {order.id}: {e}")
-            # In a real system, this should queue a retry task.
-            # We will raise it so the caller (Task/View) knows it failed.
-            raise BusinessLogicException("Refund failed via Gateway.")
+            exhausted = refund.attempts >= max_attempts
+            logger.error(f"Refund submit failed for Order {txn.order_id} (attempt {refund.attempts}): {e}")
+            refund.status = RefundRecord.Status.FAILED if exhausted else RefundRecord.Status.QUEUED
+            # Back off: an open circuit / gateway outage shouldn't burn every attempt in seconds
+            refund.next_attempt_at = None if exhausted else timezone.now() + PaymentService.refund_retry_delay(refund.attempts)
+            refund.last_error = str(e)[:1000]
+            refund.save(update_fields=['status', 'next_attempt_at', 'last_error', 'updated_at'])
+            return False
+
+        refund.gateway_refund_id = gateway_refund['id']
+        refund.next_attempt_at = None
+        refund.last_error = ''
+        refund.save(update_fields=['gateway_refund_id', 'next_attempt_at', 'last_error', 'updated_at'])
+        PaymentService.apply_refund_update(gateway_refund)
+        logger.info(f"Refund submitted for Order {txn.order_id}")
+        return True
+
+    @staticmethod
+    @transaction.atomic
+    def apply_refund_update(entity: dict):
+        """
+        Gateway refund state -> RefundRecord / PaymentTransaction / Order.
+        Used after submit and for refund.* webhooks.
+        """
+        refunds = RefundRecord.objects.select_for_update().select_related('transaction')
+        refund = refunds.filter(gateway_refund_id=entity.get('id')).first()
+        if refund is None and entity.get('id'):
+            # The webhook can beat the worker saving gateway_refund_id: match on
+            # our receipt (the idempotency key), else the payment's one open refund
+            unlinked = refunds.filter(gateway_refund_id__isnull=True)
+            refund = unlinked.filter(idempotency_key=entity.get('receipt') or '').first()
+            if refund is None and entity.get('payment_id'):
+                candidates = list(unlinked.filter(
+                    transaction__gateway_payment_id=entity['payment_id'],
+                    status__in=[RefundRecord.Status.QUEUED, RefundRecord.Status.SUBMITTING, RefundRecord.Status.PENDING],
+                )[:2])
+                refund = candidates[0] if len(candidates) == 1 else None
+            if refund is not None:
+                refund.gateway_refund_id = entity['id']
+                refund.save(update_fields=['gateway_refund_id', 'updated_at'])
+        if refund is None:
+            return False
+
+        gateway_status = entity.get('status')
+        if gateway_status not in RefundRecord.Status.values or refund.status == RefundRecord.Status.PROCESSED:
+            return True
+
+        refund.status = gateway_status
+        refund.save(update_fields=['status', 'updated_at'])
+
+        txn = refund.transaction
+        if gateway_status == RefundRecord.Status.PROCESSED:
+            txn.status = PaymentTransaction.Status.REFUNDED
+            txn.save(update_fields=['status', 'updated_at'])
+            Order.objects.filter(id=txn.order_id).update(payment_status=Order.PaymentStatus.REFUNDED)
+            OrderProjection.refresh(txn.order_id, 'order')
+        elif gateway_status == RefundRecord.Status.FAILED:
+            logger.error(f"Gateway rejected refund {refund.gateway_refund_id} for Order {txn.order_id}")
+        return True
 
     @staticmethod
     def verify_webhook_signature(body: bytes, signature: str):
         client = PaymentService._get_client()
-        return client.utility.verify_webhook_signature(
+        return client.verify_webhook_signature(
             body.decode('utf-8'), signature, settings.RAZORPAY_WEBHOOK_SECRET
-        )
\ No newline at end of file
+        )
+    # ------------------------------------------------------------------
+    # Webhook ingestion (queue mode)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def ingest_webhook(body: bytes, event_id: str = None):
+        """
+        Stores a verified webhook exactly once (INSERT ... ON CONFLICT DO NOTHING
+        on event_id, no exists() race). Returns the event_id.
+        """
+        data = json.loads(body)
+        event_type = data.get('event', '')
+        entity = data.get('payload', {}).get('payment', {}).get('entity', {})
+        event_id = event_id or data.get('event_id') or f"{event_type}:{entity.get('id', '')}"
+
+        WebhookEvent.objects.bulk_create([
+            WebhookEvent(
+                event_id=event_id,
+                event_type=event_type,
+                gateway_order_id=entity.get('order_id') or '',
+                payload=data,
+            )
+        ], ignore_conflicts=True)
+        return event_id
+
+    @staticmethod
+    def schedule_webhook_drain():
+        """
+        Kicks a drain worker, at most once per couple of seconds during a burst.
+        """
+        from django.core.cache import cache
+        from .tasks import drain_webhook_events_task
+
+        if cache.add("webhook_drain_scheduled", 1, timeout=2):
+            try:
+                drain_webhook_events_task.delay()
+            except Exception as e:
+                # Event is already stored; the beat drain picks it up
+                logger.warning(f"Could not enqueue webhook drain: {e}")
+
+    @staticmethod
+    def drain_webhook_events(batch_size: int = None):
+        """
+        Processes one batch of due events, grouped by gateway order.
+        Returns (picked, processed). A failed group is retried with exponential
+        backoff (next_attempt_at), so an early refund webhook waits for its
+        RefundRecord instead of burning every attempt at once.
+        """
+        batch_size = batch_size or getattr(settings, 'PAYMENT_WEBHOOK_BATCH_SIZE', 200)
+        max_attempts = getattr(settings, 'PAYMENT_WEBHOOK_MAX_ATTEMPTS', 5)
+        processed = 0
+
+        with transaction.atomic():
+            # SKIP LOCKED: parallel drainers split the backlog instead of queueing on it
+            events = list(
+                WebhookEvent.objects.select_for_update(skip_locked=True)
+                .filter(processed=False, attempts__lt=max_attempts)
+                .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=timezone.now()))
+                .order_by('received_at')[:batch_size]
+            )
+            if not events:
+                return 0, 0
+
+            groups = defaultdict(list)
+            for event in events:
+                groups[event.gateway_order_id].append(event)
+
+            now = timezone.now()
+            for gateway_order_id, group in groups.items():
+                try:
+                    # Savepoint per order: one bad group doesn't roll back the batch
+                    with transaction.atomic():
+                        PaymentService.apply_webhook_group(gateway_order_id, group)
+                except Exception as e:
+                    logger.error(f"Webhook group {gateway_order_id} failed: {e}")
+                    for event in group:
+                        event.attempts += 1
+                        event.next_attempt_at = now + PaymentService.webhook_retry_delay(event.attempts)
+                        event.last_error = str(e)[:1000]
+                    continue
+
+                for event in group:
+                    event.attempts += 1
+                    event.processed = True
+                    event.processed_at = now
+                    event.next_attempt_at = None
+                    event.last_error = ''
+                processed += len(group)
+
+            WebhookEvent.objects.bulk_update(
+                events, ['processed', 'processed_at', 'attempts', 'next_attempt_at', 'last_error']
+            )
+        return len(events), processed
+
+    @staticmethod
+    def webhook_retry_delay(attempts: int):
+        base = getattr(settings, 'PAYMENT_WEBHOOK_RETRY_BASE_SECONDS', 10)
+        cap = getattr(settings, 'PAYMENT_WEBHOOK_RETRY_MAX_SECONDS', 1800)
+        return timedelta(seconds=min(cap, base * 2 ** max(0, attempts - 1)))
+
+    @staticmethod
+    def apply_webhook_group(gateway_order_id: str, events: list):
+        """
+        All pending events for one gateway order, oldest first.
+        A capture wins over earlier failed attempts; repeats are no-ops.
+        """
+        captured, failed = None, None
+        for event in events:
+            if event.event_type.startswith('refund.'):
+                refund_entity = event.payload.get('payload', {}).get('refund', {}).get('entity', {})
+                if not PaymentService.apply_refund_update(refund_entity):
+                    # Not linked to a RefundRecord yet: leave the group unprocessed so it is retried
+                    raise BusinessLogicException(f"No refund record for gateway refund {refund_entity.get('id')}")
+                continue
+            entity = event.payload.get('payload', {}).get('payment', {}).get('entity', {})
+            if event.event_type in ('payment.captured', 'order.paid'):
+                captured = captured or entity
+            elif event.event_type == 'payment.failed':
+                failed = entity
+
+        if captured:
+            found = PaymentService.process_payment_success({
+                'razorpay_order_id': gateway_order_id,
+                'razorpay_payment_id': captured.get('id'),
+                'razorpay_signature': None # Webhooks are trusted via header sig
+            })
+            if not found:
+                # Async checkout may not have written the transaction yet: retry later
+                raise BusinessLogicException(f"No transaction for gateway order {gateway_order_id}")
+        elif failed:
+            # A failed attempt doesn't end the Razorpay order (customer can retry)
+            PaymentTransaction.objects.filter(
+                gateway_order_id=gateway_order_id,
+                status=PaymentTransaction.Status.PENDING
+            ).update(error_details={
+                "payment_id": failed.get('id'),
+                "error": failed.get('error_description') or failed.get('error_code'),
+            })
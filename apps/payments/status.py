@@ -0,0 +1,115 @@
+"""
+Payment status cache for post-checkout polling.
+
+One small Redis key per order, rewritten on every PaymentTransaction
+transition (receivers.py). Status polls read only this key, never the
+Order/PaymentTransaction tables. Each write is also PUBLISHed so long-poll
+and server-sent-event clients wake up immediately instead of re-polling.
+"""
+import json
+import logging
+
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+KEY = "pay_status:{}"
+TTL_SECONDS = 6 * 3600
+
+# States after which a client can stop waiting
+TERMINAL = {"SUCCESS", "FAILED", "REFUNDED"}
+
+
+def channel_for(order_id):
+    return KEY.format(order_id)
+
+
+class PaymentStatusCache:
+
+    @staticmethod
+    def build(txn):
+        return {
+            "order_id": str(txn.order_id),
+            "user_id": str(txn.order.user_id),
+            "status": txn.status,
+            "gateway_order_id": txn.gateway_order_id,
+            "updated_at": timezone.now().isoformat(),
+        }
+
+    @staticmethod
+    def publish(txn):
+        state = PaymentStatusCache.build(txn)
+        raw = json.dumps(state)
+        try:
+            conn = get_redis_connection("default")
+            pipe = conn.pipeline(transaction=False)
+            pipe.set(KEY.format(state["order_id"]), raw, ex=TTL_SECONDS)
+            pipe.publish(channel_for(state["order_id"]), raw)
+            pipe.execute()
+        except Exception as e:
+            # Pollers fall back to the DB on a miss
+            logger.warning(f"Payment status publish failed for {state['order_id']}: {e}")
+        return state
+
+    @staticmethod
+    def get(order_id):
+        try:
+            raw = get_redis_connection("default").get(KEY.format(order_id))
+        except Exception as e:
+            logger.warning(f"Payment status read failed for {order_id}: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    @staticmethod
+    def load(order_id):
+        """
+        Cache first, DB on a miss (expired key / Redis flush), then backfill.
+        """
+        state = PaymentStatusCache.get(order_id)
+        if state is not None:
+            return state
+
+        from .models import PaymentTransaction
+        txn = PaymentTransaction.objects.select_related('order').only(
+            'status', 'gateway_order_id', 'order_id', 'order__user_id'
+        ).filter(order_id=order_id).order_by('-created_at').first()
+        if txn is None:
+            return None
+        return PaymentStatusCache.publish(txn)
+
+    @staticmethod
+    async def wait_for_change(order_id, since, timeout):
+        """
+        Long-poll (async, for ASGI views): waits until the status differs from
+        `since` or `timeout` seconds pass, without holding a worker thread.
+        Returns the latest state (may be unchanged).
+        """
+        import asyncio
+        import redis.asyncio as aioredis
+        from asgiref.sync import sync_to_async
+        from django.conf import settings
+
+        conn = aioredis.from_url(settings.REDIS_URL)
+        pubsub = conn.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(channel_for(order_id))
+            # Re-check after subscribing so a write in between isn't missed
+            state = await sync_to_async(PaymentStatusCache.load)(order_id)
+            if state is None or state["status"] != since:
+                return state
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return state
+                message = await pubsub.get_message(timeout=remaining)
+                if message is not None:
+                    update = json.loads(message["data"])
+                    if update["status"] != since:
+                        return update
+        finally:
+            await pubsub.aclose()
+            await conn.aclose()
@@ -2,17 +2,89 @@ from celery import shared_task
 from .services import PaymentService
 from apps.orders.models import Order
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
-@shared_task(bind=True, max_retries=5, default_retry_delay=60)
-def process_refund_task(self, order_id):
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=2)
+def create_gateway_order_task(self, order_id):
     """
-    Retries refunds in background if Gateway is flaky.
+    Creates the Razorpay order for an async checkout (see PaymentCheckoutView).
     """
     try:
         order = Order.objects.get(id=order_id)
-        PaymentService.initiate_refund(order)
+    except Order.DoesNotExist:
+        logger.error(f"Gateway order requested for unknown Order {order_id}")
+        return
+
+    if order.status != Order.Status.PENDING:
+        return
+
+    try:
+        PaymentService.create_payment_order(order)
     except Exception as e:
-        logger.error(f"Refund retry failed for {order_id}: {e}")
-        raise self.retry(exc=e)
\ No newline at end of file
+        logger.warning(f"Gateway order creation failed for {order_id}: {e}")
+        raise self.retry(exc=e)
+
+
+@shared_task
+def process_refunds_task():
+    """
+    Drains the refund queue (RefundRecord QUEUED) at the gateway's rate limit.
+    Kicked on cancellation commit and by beat for retries.
+    """
+    total = 0
+    while True:
+        submitted, throttled = PaymentService.process_refund_batch()
+        total += submitted
+        if throttled:
+            # Out of tokens: come back once the bucket has refilled a bit
+            process_refunds_task.apply_async(countdown=2)
+            break
+        if not submitted:
+            # Empty queue, or only failures (now backing off): beat picks them up when due
+            break
+    return total
+
+
+@shared_task
+def drain_webhook_events_task():
+    """
+    Drains the webhook queue until nothing is due (or the time budget runs out).
+    Kicked by the webhook view and by beat as a safety net.
+    """
+    budget = time.monotonic() + 50
+    total = 0
+    while time.monotonic() < budget:
+        picked, processed = PaymentService.drain_webhook_events()
+        total += processed
+        if not picked or not processed:
+            # Empty, or only failures (now backing off): beat picks them up when due
+            break
+    if total:
+        logger.info(f"Webhook drain processed {total} events")
+    return total
+
+
+@shared_task
+def reconcile_payments_task(window_minutes=None):
+    """
+    Periodic bulk reconciliation against the gateway (see reconciliation.py).
+    The last report is kept in cache for ops.
+    """
+    from datetime import timedelta
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.utils import timezone
+    from .reconciliation import PaymentReconciler
+
+    window_minutes = window_minutes or getattr(settings, 'PAYMENT_RECONCILE_WINDOW_MINUTES', 120)
+    end = timezone.now()
+    report = PaymentReconciler().run(start=end - timedelta(minutes=window_minutes), end=end)
+
+    result = report.as_dict()
+    cache.set("payments:reconcile:last", result, timeout=24 * 3600)
+    if report.amount_mismatches or report.status_mismatches or report.unknown_orders:
+        logger.warning(f"Reconciliation needs review: {result}")
+    return result
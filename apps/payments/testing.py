@@ -0,0 +1,56 @@
+"""
+In-memory gateway double for tests (no network, no Razorpay keys).
+"""
+import itertools
+
+
+class FakeGateway:
+    """
+    Implements the subset of RazorpayGateway the payment services use.
+    """
+
+    def __init__(self, payments=None):
+        self.payments = list(payments or [])
+        self.refunds = []
+        self.calls = []
+        self._ids = itertools.count(1)
+
+    def add_payment(self, order_id, amount_paise, status="captured", created_at=0):
+        payment = {
+            "id": f"pay_fake{next(self._ids)}",
+            "entity": "payment",
+            "order_id": order_id,
+            "amount": amount_paise,
+            "status": status,
+            "created_at": int(created_at),
+        }
+        self.payments.append(payment)
+        return payment
+
+    def list_payments(self, from_ts, to_ts, count=100, skip=0):
+        self.calls.append(("list_payments", skip))
+        # Razorpay returns newest first
+        window = sorted(
+            (p for p in self.payments if from_ts <= p["created_at"] <= to_ts),
+            key=lambda p: p["created_at"], reverse=True
+        )
+        items = window[skip:skip + count]
+        return {"entity": "collection", "count": len(items), "items": items}
+
+    def refund(self, gateway_payment_id, data):
+        self.calls.append(("refund", gateway_payment_id))
+        refund = {
+            "id": f"rfnd_fake{next(self._ids)}",
+            "entity": "refund",
+            "payment_id": gateway_payment_id,
+            "amount": data["amount"],
+            "receipt": data.get("receipt"),
+            "status": "processed",
+        }
+        self.refunds.append(refund)
+        return refund
+
+    def payment_refunds(self, gateway_payment_id):
+        self.calls.append(("payment_refunds", gateway_payment_id))
+        items = [r for r in self.refunds if r["payment_id"] == gateway_payment_id]
+        return {"entity": "collection", "count": len(items), "items": items}
@@ -119,4 +119,179 @@ class PaymentWebhookTests(TestCase):
             HTTP_X_RAZORPAY_SIGNATURE=signature
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        # Should remain SUCCESS, no errors
\ No newline at end of file
+        # Should remain SUCCESS, no errors
+
+class PaymentReconciliationTests(TestCase):
+    def setUp(self):
+        from unittest import mock
+        from django.utils import timezone
+        from apps.orders.models import Order as CoreOrder
+        from .models import PaymentTransaction
+        from .reconciliation import PaymentReconciler
+        from .testing import FakeGateway
+
+        self.PaymentTransaction = PaymentTransaction
+        self.now = timezone.now()
+        self.user = User.objects.create_user(phone="+919000000011", password="testpass")
+        self.gateway = FakeGateway()
+        self.reconciler = PaymentReconciler(gateway=self.gateway)
+        self.mark_paid = mock.patch("apps.payments.services.OrderService.mark_order_paid").start()
+        self.addCleanup(mock.patch.stopall)
+
+        self.txns = {}
+        for i, amount in enumerate(["100.00", "250.00", "80.00"]):
+            order = CoreOrder.objects.create(
+                id=f"ORD-R{i}", user=self.user, delivery_address={},
+                warehouse_id=uuid.uuid4(), total_amount=amount
+            )
+            self.txns[i] = PaymentTransaction.objects.create(
+                order=order, gateway_order_id=f"order_r{i}", amount=amount
+            )
+
+    def test_recovers_missed_capture_and_flags_mismatch(self):
+        ts = self.now.timestamp() - 60
+        self.gateway.add_payment("order_r0", 10000, created_at=ts)            # lost webhook
+        self.gateway.add_payment("order_r1", 20000, created_at=ts)            # wrong amount
+        self.gateway.add_payment("order_r2", 8000, status="failed", created_at=ts)
+        self.gateway.add_payment("order_unknown", 5000, created_at=ts)
+
+        report = self.reconciler.run(end=self.now)
+
+        self.assertEqual(report.gateway_payments, 4)
+        self.assertEqual(report.recovered, ["order_r0"])
+        self.assertEqual([m["gateway_order_id"] for m in report.amount_mismatches], ["order_r1"])
+        self.assertEqual(report.unknown_orders, ["order_unknown"])
+        self.txns[0].refresh_from_db()
+        self.assertEqual(self.txns[0].status, self.PaymentTransaction.Status.SUCCESS)
+        self.txns[2].refresh_from_db()
+        self.assertEqual(self.txns[2].status, self.PaymentTransaction.Status.PENDING)
+
+    def test_capture_on_failed_transaction_is_not_matched(self):
+        self.txns[0].status = self.PaymentTransaction.Status.FAILED
+        self.txns[0].save(update_fields=["status"])
+        self.gateway.add_payment("order_r0", 10000, created_at=self.now.timestamp() - 60)
+
+        report = self.reconciler.run(end=self.now)
+
+        self.assertEqual(report.matched, 0)
+        self.assertEqual([m["gateway_order_id"] for m in report.status_mismatches], ["order_r0"])
+
+    def test_pages_through_the_window(self):
+        from .reconciliation import PAGE_SIZE
+        ts = self.now.timestamp() - 60
+        for _ in range(PAGE_SIZE + 5):
+            self.gateway.add_payment("order_other", 100, status="failed", created_at=ts)
+
+        report = self.reconciler.run(end=self.now)
+
+        self.assertEqual(report.gateway_payments, PAGE_SIZE + 5)
+        self.assertEqual(len(self.gateway.calls), 2)
+
+
+class RefundQueueTests(TestCase):
+    def setUp(self):
+        from unittest import mock
+        from apps.orders.models import Order as CoreOrder
+        from .models import PaymentTransaction
+        from .testing import FakeGateway
+
+        self.user = User.objects.create_user(phone="+919000000012", password="testpass")
+        self.order = CoreOrder.objects.create(
+            id="ORD-RF1", user=self.user, delivery_address={}, warehouse_id=uuid.uuid4(),
+            total_amount="120.00", payment_status=CoreOrder.PaymentStatus.PAID
+        )
+        self.txn = PaymentTransaction.objects.create(
+            order=self.order, gateway_order_id="order_rf1", gateway_payment_id="pay_rf1",
+            amount="120.00", status=PaymentTransaction.Status.SUCCESS
+        )
+        self.gateway = FakeGateway()
+        mock.patch.object(PaymentService, "_get_client", return_value=self.gateway).start()
+        mock.patch("apps.payments.tasks.process_refunds_task.delay").start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_intent_is_recorded_once(self):
+        from .models import RefundRecord
+        PaymentService.initiate_refund(self.order)
+        PaymentService.initiate_refund(self.order)
+
+        refund = RefundRecord.objects.get(transaction=self.txn)
+        self.assertEqual(refund.status, RefundRecord.Status.QUEUED)
+        self.assertEqual(self.gateway.calls, [])
+
+    def test_refund_webhook_before_gateway_id_is_saved_links_by_receipt(self):
+        from .models import RefundRecord
+        PaymentService.initiate_refund(self.order)
+        refund = RefundRecord.objects.get(transaction=self.txn)
+
+        applied = PaymentService.apply_refund_update({
+            "id": "rfnd_early", "payment_id": "pay_rf1", "receipt": refund.idempotency_key, "status": "processed",
+        })
+
+        self.assertTrue(applied)
+        refund.refresh_from_db()
+        self.assertEqual((refund.gateway_refund_id, refund.status), ("rfnd_early", RefundRecord.Status.PROCESSED))
+        self.assertFalse(PaymentService.apply_refund_update({"id": "rfnd_unknown", "payment_id": "pay_other"}))
+
+    def test_unmatched_refund_webhook_backs_off_instead_of_exhausting_retries(self):
+        from .models import WebhookEvent
+        from .tasks import drain_webhook_events_task
+        event = WebhookEvent.objects.create(
+            event_id="evt_early", event_type="refund.processed", gateway_order_id="order_other",
+            payload={"payload": {"refund": {"entity": {"id": "rfnd_x", "payment_id": "pay_other"}}}},
+        )
+
+        self.assertEqual(drain_webhook_events_task(), 0)
+
+        event.refresh_from_db()
+        self.assertEqual((event.processed, event.attempts), (False, 1))
+        self.assertIsNotNone(event.next_attempt_at)
+        self.assertEqual(PaymentService.drain_webhook_events(), (0, 0))
+
+    def test_worker_submits_with_idempotency_key(self):
+        from .models import PaymentTransaction, RefundRecord
+        PaymentService.initiate_refund(self.order)
+
+        submitted, throttled = PaymentService.process_refund_batch()
+
+        self.assertEqual((submitted, throttled), (1, False))
+        refund = RefundRecord.objects.get(transaction=self.txn)
+        self.assertEqual(refund.status, RefundRecord.Status.PROCESSED)
+        self.assertEqual(self.gateway.refunds[0]["receipt"], refund.idempotency_key)
+        self.txn.refresh_from_db()
+        self.assertEqual(self.txn.status, PaymentTransaction.Status.REFUNDED)
+
+    def test_failed_submit_backs_off_instead_of_retrying_at_once(self):
+        from unittest import mock
+        from .models import RefundRecord
+        PaymentService.initiate_refund(self.order)
+
+        with mock.patch.object(self.gateway, "refund", side_effect=ConnectionError("circuit open")):
+            first = PaymentService.process_refund_batch()
+            second = PaymentService.process_refund_batch()
+
+        self.assertEqual((first, second), ((0, False), (0, False)))
+        refund = RefundRecord.objects.get(transaction=self.txn)
+        self.assertEqual((refund.status, refund.attempts), (RefundRecord.Status.QUEUED, 1))
+        self.assertIsNotNone(refund.next_attempt_at)
+
+
+
+class PaymentStatusLongPollTests(TestCase):
+    def test_other_users_order_is_rejected_before_waiting(self):
+        from unittest import mock
+        from asgiref.sync import async_to_sync
+        from django.test import RequestFactory
+        from . import views
+
+        owner = User.objects.create(phone_number="+919999999997")
+        other = User.objects.create(phone_number="+919999999996")
+        state = {"order_id": "ORD1", "status": "PENDING", "user_id": str(owner.id)}
+        request = RequestFactory().get('/api/v1/payments/status/ORD1/', {"wait": 20, "since": "PENDING"})
+
+        with mock.patch.object(views, "_authenticated_user", mock.AsyncMock(return_value=other)), \
+                mock.patch.object(views.PaymentStatusCache, "load", return_value=dict(state)), \
+                mock.patch.object(views.PaymentStatusCache, "wait_for_change", mock.AsyncMock()) as wait:
+            response = async_to_sync(views.payment_status)(request, "ORD1")
+
+        self.assertEqual(response.status_code, 404)
+        wait.assert_not_called()
@@ -1,7 +1,13 @@
 from django.urls import path
-from .views import PaymentSuccessView, RazorpayWebhookView
+from .views import (
+    PaymentSuccessView, PaymentCheckoutView, payment_status,
+    RazorpayWebhookView, payment_status_events
+)
 
 urlpatterns = [
     path('verify/', PaymentSuccessView.as_view(), name='payment-verify'),
+    path('checkout/<str:order_id>/', PaymentCheckoutView.as_view(), name='payment-checkout'),
+    path('status/<str:order_id>/', payment_status, name='payment-status'),
+    path('status/<str:order_id>/events/', payment_status_events, name='payment-status-events'),
     path('webhook/', RazorpayWebhookView.as_view(), name='payment-webhook'),
 ]
\ No newline at end of file
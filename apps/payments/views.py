@@ -1,12 +1,16 @@
-import json
 import logging
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework import views, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 
+from apps.orders.models import Order
 from .services import PaymentService
+from .status import PaymentStatusCache, TERMINAL, channel_for
 from .serializers import PaymentSuccessSerializer
 from .models import WebhookEvent
 
@@ -29,6 +33,138 @@ class PaymentSuccessView(views.APIView):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+class PaymentCheckoutView(views.APIView):
+    """
+    Async checkout: poll until the gateway order is ready.
+    202 while a worker is creating it, 200 with the Razorpay modal payload after.
+    """
+    permission_classes = [IsAuthenticated]
+    POLL_AFTER_SECONDS = 1
+
+    def get(self, request, order_id):
+        order = Order.objects.filter(id=order_id, user=request.user).only('id', 'status', 'total_amount').first()
+        if not order:
+            return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        if order.status != Order.Status.PENDING:
+            return Response({"order_id": order.id, "status": order.status}, status=status.HTTP_409_CONFLICT)
+
+        txn = PaymentService.get_pending_transaction(order)
+        if txn:
+            return Response({
+                "order_id": order.id,
+                "status": "READY",
+                "payment": PaymentService.checkout_payload(order, txn)
+            }, status=status.HTTP_200_OK)
+
+        # Lost task / expired request: ask again (debounced in the service)
+        PaymentService.request_payment_order(order)
+        response = Response({"order_id": order.id, "status": "PREPARING"}, status=status.HTTP_202_ACCEPTED)
+        response['Retry-After'] = str(self.POLL_AFTER_SECONDS)
+        return response
+
+async def _authenticated_user(request):
+    """
+    JWT auth for the async (ASGI) views below; None if missing/invalid.
+    """
+    from asgiref.sync import sync_to_async
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    try:
+        auth = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except Exception:
+        auth = None
+    return auth[0] if auth else None
+
+
+async def payment_status(request, order_id):
+    """
+    Post-checkout polling, served from Redis (no Order/Transaction reads).
+    ?wait=<seconds>&since=<status> long-polls until the status changes.
+    Async so a waiting client doesn't hold a sync worker thread under ASGI.
+    """
+    from asgiref.sync import sync_to_async
+    from django.http import JsonResponse
+
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    user = await _authenticated_user(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    # Ownership first: nobody waits on someone else's order
+    state = await sync_to_async(PaymentStatusCache.load)(order_id)
+    if state is None or state.get('user_id') != str(user.id):
+        return JsonResponse({"error": "Order not found"}, status=404)
+
+    try:
+        wait = min(int(request.GET.get('wait', 0)), getattr(settings, 'PAYMENT_STATUS_LONGPOLL_SECONDS', 20))
+    except ValueError:
+        wait = 0
+    since = request.GET.get('since')
+
+    if wait > 0 and since and since == state['status'] and since not in TERMINAL:
+        try:
+            state = await PaymentStatusCache.wait_for_change(order_id, since, wait) or state
+        except Exception as e:
+            logger.warning(f"Payment status long-poll unavailable: {e}")
+
+    state.pop('user_id', None)
+    return JsonResponse(state)
+
+
+async def payment_status_events(request, order_id):
+    """
+    Server-sent events variant (ASGI): pushes every status change until a
+    terminal state or PAYMENT_STATUS_SSE_SECONDS. Same JWT auth as the API.
+    """
+    import asyncio
+    import json
+    import redis.asyncio as aioredis
+    from asgiref.sync import sync_to_async
+    from django.http import JsonResponse, StreamingHttpResponse
+
+    user = await _authenticated_user(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    state = await sync_to_async(PaymentStatusCache.load)(order_id)
+    if state is None or state.get('user_id') != str(user.id):
+        return JsonResponse({"error": "Order not found"}, status=404)
+
+    def frame(data):
+        data = {k: v for k, v in data.items() if k != 'user_id'}
+        return f"event: status\ndata: {json.dumps(data)}\n\n"
+
+    async def stream():
+        yield frame(state)
+        if state['status'] in TERMINAL:
+            return
+
+        conn = aioredis.from_url(settings.REDIS_URL)
+        pubsub = conn.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel_for(order_id))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + getattr(settings, 'PAYMENT_STATUS_SSE_SECONDS', 120)
+        try:
+            while loop.time() < deadline:
+                message = await pubsub.get_message(timeout=15)
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                update = json.loads(message['data'])
+                yield frame(update)
+                if update['status'] in TERMINAL:
+                    return
+        finally:
+            await pubsub.aclose()
+            await conn.aclose()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class RazorpayWebhookView(views.APIView):
     """
@@ -47,34 +183,29 @@ class RazorpayWebhookView(views.APIView):
             logger.warning(f"Webhook Signature Failed: {e}")
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        data = json.loads(body)
-        event_id = data.get('event_id')
-        
-        # 2. Idempotency Check
-        if WebhookEvent.objects.filter(event_id=event_id).exists():
-            return Response(status=status.HTTP_200_OK)
+        # 2. Store once (unique-key upsert, duplicates are dropped by the DB)
+        try:
+            event_id = PaymentService.ingest_webhook(body, request.headers.get('X-Razorpay-Event-Id'))
+        except ValueError:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
 
         # 3. Process
+        if getattr(settings, 'PAYMENT_WEBHOOK_MODE', 'queue') == 'queue':
+            # [PERFORMANCE] Ack inside Razorpay's timeout; workers drain in batches
+            PaymentService.schedule_webhook_drain()
+            return Response(status=status.HTTP_200_OK)
+
         try:
-            event_type = data.get('event')
-            payload = data.get('payload', {}).get('payment', {}).get('entity', {})
-            
-            if event_type == 'payment.captured':
-                PaymentService.process_payment_success({
-                    'razorpay_order_id': payload.get('order_id'),
-                    'razorpay_payment_id': payload.get('id'),
-                    'razorpay_signature': None # Webhooks are trusted via header sig
-                })
-            
-            # Log Event
-            WebhookEvent.objects.create(
-                event_id=event_id,
-                event_type=event_type,
-                payload=data,
-                processed=True
-            )
+            with transaction.atomic():
+                event = WebhookEvent.objects.select_for_update().get(event_id=event_id)
+                if not event.processed:
+                    PaymentService.apply_webhook_group(event.gateway_order_id, [event])
+                    event.processed = True
+                    event.processed_at = timezone.now()
+                    event.attempts += 1
+                    event.save(update_fields=['processed', 'processed_at', 'attempts'])
             return Response(status=status.HTTP_200_OK)
             
         except Exception as e:
             logger.error(f"Webhook Processing Error: {e}")
-            return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
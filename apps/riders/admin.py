@@ -1,13 +1,23 @@
 from django.contrib import admin
-from .models import RiderProfile, RiderEarnings
+from .models import RiderProfile, RiderEarnings, RiderShift, RiderEarningsDaily
 
 @admin.register(RiderProfile)
 class RiderProfileAdmin(admin.ModelAdmin):
-    list_display = ['user', 'is_online', 'is_available', 'total_deliveries', 'last_heartbeat']
+    list_display = ['user', 'is_online', 'is_available', 'total_deliveries', 'lifetime_earnings', 'last_heartbeat']
     list_filter = ['is_online', 'is_available']
     search_fields = ['user__phone', 'vehicle_number']
 
 @admin.register(RiderEarnings)
 class RiderEarningsAdmin(admin.ModelAdmin):
     list_display = ['rider', 'order_id', 'amount', 'created_at']
-    search_fields = ['order_id', 'rider__user__phone']
\ No newline at end of file
+    search_fields = ['order_id', 'rider__user__phone']
+
+@admin.register(RiderShift)
+class RiderShiftAdmin(admin.ModelAdmin):
+    list_display = ['rider', 'status', 'start_time', 'end_time', 'deliveries', 'earnings']
+    list_filter = ['status']
+
+@admin.register(RiderEarningsDaily)
+class RiderEarningsDailyAdmin(admin.ModelAdmin):
+    list_display = ['rider', 'day', 'amount', 'deliveries']
+    list_filter = ['day']
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""
+Rider liveness tracking.
+
+Every heartbeat refreshes two things in Redis:
+- rider_alive:{id}      TTL key, answers "is this rider reachable?" in O(1)
+- rider_heartbeats      ZSET (score = last beat epoch), lets the sweeper pull
+                        every stale rider with one range query
+
+The sweeper (tasks.sweep_stale_riders) flips stale riders offline in batch and
+closes their shift, so assignment never burns locks/retries on ghost riders.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+ALIVE_KEY = "rider_alive:{}"
+HEARTBEAT_ZSET = "rider_heartbeats"
+
+
+class RiderLiveness:
+
+    @staticmethod
+    def ttl_seconds():
+        return getattr(settings, 'RIDER_HEARTBEAT_TTL_SECONDS', 90)
+
+    @staticmethod
+    def _conn():
+        return get_redis_connection("default")
+
+    @staticmethod
+    def touch(rider_id):
+        """
+        Called on every heartbeat / location ping.
+        """
+        try:
+            pipe = RiderLiveness._conn().pipeline(transaction=False)
+            pipe.set(ALIVE_KEY.format(rider_id), 1, ex=RiderLiveness.ttl_seconds())
+            pipe.zadd(HEARTBEAT_ZSET, {str(rider_id): time.time()})
+            pipe.execute()
+        except Exception as e:
+            # Liveness is an optimisation; the DB last_heartbeat is still written
+            logger.warning(f"Liveness touch failed for rider {rider_id}: {e}")
+
+    @staticmethod
+    def forget(rider_ids):
+        rider_ids = [str(r) for r in rider_ids]
+        if not rider_ids:
+            return
+        try:
+            pipe = RiderLiveness._conn().pipeline(transaction=False)
+            pipe.delete(*[ALIVE_KEY.format(r) for r in rider_ids])
+            pipe.zrem(HEARTBEAT_ZSET, *rider_ids)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Liveness forget failed: {e}")
+
+    @staticmethod
+    def filter_alive(rider_ids):
+        """
+        Keeps only riders with a live TTL key (one MGET round-trip), preserving order.
+        Fails open: if Redis is down, nobody is filtered out.
+        """
+        rider_ids = list(rider_ids)
+        if not rider_ids:
+            return []
+        try:
+            flags = RiderLiveness._conn().mget([ALIVE_KEY.format(r) for r in rider_ids])
+        except Exception as e:
+            logger.warning(f"Liveness check failed, skipping filter: {e}")
+            return rider_ids
+        return [r for r, alive in zip(rider_ids, flags) if alive is not None]
+
+    @staticmethod
+    def stale_ids(limit=500):
+        """
+        Riders whose last heartbeat is older than the TTL.
+        """
+        cutoff = time.time() - RiderLiveness.ttl_seconds()
+        ids = RiderLiveness._conn().zrangebyscore(HEARTBEAT_ZSET, '-inf', cutoff, start=0, num=limit)
+        return [i.decode() if isinstance(i, bytes) else i for i in ids]
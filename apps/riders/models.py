@@ -20,13 +20,44 @@ class RiderProfile(TimestampedModel):
     vehicle_number = models.CharField(max_length=20, blank=True)
     vehicle_type = models.CharField(max_length=20, default="BIKE")
     
-    # Metrics
+    # Metrics (only ever changed with F() expressions, see RiderService.credit_earnings)
     total_deliveries = models.IntegerField(default=0)
+    lifetime_earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     rating = models.FloatField(default=5.0)
 
+    class Meta:
+        indexes = [
+            # Liveness sweeper safety net: online riders by last heartbeat
+            models.Index(fields=['is_online', 'last_heartbeat']),
+        ]
+
     def __str__(self):
         return f"{self.user.phone} - {'Online' if self.is_online else 'Offline'}"
 
+class RiderShift(TimestampedModel):
+    """
+    One "Start Duty" -> "Stop Duty" session, with running totals for the shift card.
+    """
+    class Status(models.TextChoices):
+        ACTIVE = "ACTIVE", "Active"
+        COMPLETED = "COMPLETED", "Completed"
+
+    rider = models.ForeignKey(RiderProfile, on_delete=models.CASCADE, related_name='shifts')
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField(null=True, blank=True)
+    duration_minutes = models.IntegerField(default=0)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.ACTIVE)
+
+    deliveries = models.IntegerField(default=0)
+    earnings = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-start_time']
+        indexes = [
+            models.Index(fields=['rider', 'end_time']),
+        ]
+
+
 class RiderEarnings(TimestampedModel):
     """
     Ledger for Rider Payouts.
@@ -40,4 +71,45 @@ class RiderEarnings(TimestampedModel):
     description = models.CharField(max_length=255) # e.g., "Delivery Fee for Order #123"
 
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        constraints = [
+            # One payout line per delivered order
+            models.UniqueConstraint(fields=['rider', 'order_id'], name='uniq_rider_earning_per_order'),
+        ]
+        indexes = [
+            models.Index(fields=['rider', '-created_at']),
+        ]
+
+
+class EarningsRollup(models.Model):
+    """
+    Pre-aggregated earnings bucket, incremented in the same transaction as each credit.
+    """
+    id = models.BigAutoField(primary_key=True)
+    rider = models.ForeignKey(RiderProfile, on_delete=models.CASCADE, related_name='+')
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    deliveries = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class RiderEarningsDaily(EarningsRollup):
+    day = models.DateField()
+
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['rider', 'day'], name='uniq_rider_earnings_day'),
+        ]
+
+
+class RiderEarningsWeekly(EarningsRollup):
+    week_start = models.DateField(help_text="Monday of the ISO week")
+
+    class Meta:
+        ordering = ['-week_start']
+        constraints = [
+            models.UniqueConstraint(fields=['rider', 'week_start'], name='uniq_rider_earnings_week'),
+        ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import RiderProfile, RiderEarnings
+from .models import RiderProfile, RiderEarnings, RiderEarningsDaily
 
 class RiderProfileSerializer(serializers.ModelSerializer):
     phone = serializers.CharField(source='user.phone', read_only=True)
@@ -8,7 +8,7 @@ class RiderProfileSerializer(serializers.ModelSerializer):
         model = RiderProfile
         fields = [
             'id', 'phone', 'is_online', 'is_available', 
-            'vehicle_number', 'total_deliveries', 'rating'
+            'vehicle_number', 'total_deliveries', 'lifetime_earnings', 'rating'
         ]
 
 class RiderEarningsSerializer(serializers.ModelSerializer):
@@ -16,6 +16,24 @@ class RiderEarningsSerializer(serializers.ModelSerializer):
         model = RiderEarnings
         fields = ['id', 'order_id', 'amount', 'description', 'created_at']
 
+class RiderEarningsDailySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RiderEarningsDaily
+        fields = ['day', 'amount', 'deliveries']
+
+class EarningsBucketSerializer(serializers.Serializer):
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    deliveries = serializers.IntegerField()
+
+class CurrentShiftSerializer(EarningsBucketSerializer):
+    started_at = serializers.DateTimeField(allow_null=True)
+
+class EarningsSummarySerializer(serializers.Serializer):
+    today = EarningsBucketSerializer()
+    this_week = EarningsBucketSerializer()
+    current_shift = CurrentShiftSerializer()
+    lifetime = EarningsBucketSerializer()
+
 class LocationUpdateSerializer(serializers.Serializer):
     lat = serializers.FloatField(min_value=-90, max_value=90)
     lng = serializers.FloatField(min_value=-180, max_value=180)
\ No newline at end of file
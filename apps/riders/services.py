@@ -1,7 +1,15 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
 from django.contrib.gis.geos import Point
 from django.utils import timezone
-from django.db import transaction
-from .models import RiderProfile, RiderEarnings, RiderShift
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from .models import (
+    RiderProfile, RiderEarnings, RiderShift,
+    RiderEarningsDaily, RiderEarningsWeekly
+)
+from .liveness import RiderLiveness
 from apps.utils.exceptions import BusinessLogicException
 from apps.delivery.models import DeliveryJob
 
@@ -26,12 +34,15 @@ class RiderService:
             # START SHIFT
             profile.is_online = True
             profile.is_available = True
+            # Going online counts as a heartbeat (the sweeper would otherwise see a stale/null one)
+            profile.last_heartbeat = now
+            transaction.on_commit(lambda: RiderLiveness.touch(profile.id))
             
             # Create new shift record
             RiderShift.objects.create(
                 rider=profile,
                 start_time=now,
-                status="ACTIVE"
+                status=RiderShift.Status.ACTIVE
             )
         else:
             # STOP SHIFT REQUEST
@@ -47,6 +58,7 @@ class RiderService:
             # END SHIFT
             profile.is_online = False
             profile.is_available = False
+            transaction.on_commit(lambda: RiderLiveness.forget([profile.id]))
             
             # Close active shift
             active_shift = RiderShift.objects.filter(
@@ -56,11 +68,11 @@ class RiderService:
             
             if active_shift:
                 active_shift.end_time = now
-                active_shift.duration_minutes = (now - active_shift.start_time).seconds // 60
-                active_shift.status = "COMPLETED"
+                active_shift.duration_minutes = int((now - active_shift.start_time).total_seconds() // 60)
+                active_shift.status = RiderShift.Status.COMPLETED
                 active_shift.save()
 
-        profile.save(update_fields=['is_online', 'is_available'])
+        profile.save(update_fields=['is_online', 'is_available', 'last_heartbeat'])
         return profile
 
     @staticmethod
@@ -76,8 +88,50 @@ class RiderService:
         profile.current_location = Point(float(lng), float(lat), srid=4326)
         profile.last_heartbeat = timezone.now()
         profile.save(update_fields=['current_location', 'last_heartbeat'])
+        RiderLiveness.touch(profile.id)
         return profile
 
+    @staticmethod
+    @transaction.atomic
+    def mark_offline_batch(rider_ids):
+        """
+        Liveness sweeper: flips unreachable riders offline and closes their shifts.
+        Riders mid-delivery only lose availability (the job still needs them).
+        Returns the ids actually taken offline.
+        """
+        busy = set(
+            DeliveryJob.objects.filter(
+                rider__rider_profile__id__in=rider_ids,
+                status__in=[DeliveryJob.Status.ASSIGNED, DeliveryJob.Status.PICKED_UP]
+            ).values_list('rider__rider_profile__id', flat=True)
+        )
+        RiderProfile.objects.filter(id__in=busy).update(is_available=False)
+
+        profiles = list(
+            RiderProfile.objects.select_for_update(skip_locked=True)
+            .filter(id__in=rider_ids, is_online=True)
+            .exclude(id__in=busy)
+            .only('id', 'last_heartbeat')
+        )
+        if not profiles:
+            return []
+
+        now = timezone.now()
+        last_seen = {p.id: p.last_heartbeat or now for p in profiles}
+        RiderProfile.objects.filter(id__in=last_seen.keys()).update(is_online=False, is_available=False)
+
+        shifts = list(RiderShift.objects.filter(rider_id__in=last_seen.keys(), end_time__isnull=True))
+        for shift in shifts:
+            # Shift ends when the rider was last seen, not when we noticed
+            shift.end_time = max(last_seen[shift.rider_id], shift.start_time)
+            shift.duration_minutes = int((shift.end_time - shift.start_time).total_seconds() // 60)
+            shift.status = RiderShift.Status.COMPLETED
+        RiderShift.objects.bulk_update(shifts, ['end_time', 'duration_minutes', 'status', 'updated_at'])
+
+        offline_ids = list(last_seen.keys())
+        transaction.on_commit(lambda: RiderLiveness.forget(offline_ids))
+        return offline_ids
+
     @staticmethod
     def mark_busy(user):
         """Called when a job is assigned"""
@@ -93,18 +147,98 @@ class RiderService:
             profile.save(update_fields=['is_available'])
 
     @staticmethod
-    def credit_earnings(user, order_id: str, amount: float):
+    @transaction.atomic
+    def credit_earnings(user, order_id: str, amount):
         """
         Called by Delivery Service upon job completion.
+        Ledger row + every aggregate move together in one transaction, so the
+        dashboard can read pre-computed buckets instead of scanning the ledger.
         """
         profile = user.rider_profile
+        amount = Decimal(str(amount))
+
         RiderEarnings.objects.create(
             rider=profile,
             order_id=order_id,
             amount=amount,
             description=f"Delivery payout for {order_id}"
         )
-        
-        # Update metrics
-        profile.total_deliveries += 1
-        profile.save(update_fields=['total_deliveries'])
\ No newline at end of file
+
+        # [CONCURRENCY] Atomic counters, no read-modify-write
+        RiderProfile.objects.filter(id=profile.id).update(
+            total_deliveries=F('total_deliveries') + 1,
+            lifetime_earnings=F('lifetime_earnings') + amount
+        )
+
+        today = timezone.localdate()
+        RiderService._bump_rollup(RiderEarningsDaily, profile, {'day': today}, amount)
+        RiderService._bump_rollup(
+            RiderEarningsWeekly, profile,
+            {'week_start': today - timedelta(days=today.weekday())}, amount
+        )
+
+        RiderShift.objects.filter(rider=profile, end_time__isnull=True).update(
+            deliveries=F('deliveries') + 1,
+            earnings=F('earnings') + amount
+        )
+
+    @staticmethod
+    def _bump_rollup(model, profile, bucket: dict, amount: Decimal):
+        """
+        Increment-or-create for one rollup bucket (safe under concurrent credits).
+        """
+        increments = {
+            'amount': F('amount') + amount,
+            'deliveries': F('deliveries') + 1,
+        }
+        if model.objects.filter(rider=profile, **bucket).update(**increments):
+            return
+
+        try:
+            with transaction.atomic():
+                model.objects.create(rider=profile, amount=amount, deliveries=1, **bucket)
+        except IntegrityError:
+            # Lost the race to create the bucket: it exists now
+            model.objects.filter(rider=profile, **bucket).update(**increments)
+
+    @staticmethod
+    def get_earnings_summary(profile):
+        """
+        O(1) dashboard read: a handful of unique-key lookups, independent of history size.
+        """
+        today = timezone.localdate()
+        week_start = today - timedelta(days=today.weekday())
+
+        day = RiderEarningsDaily.objects.filter(rider=profile, day=today).first()
+        week = RiderEarningsWeekly.objects.filter(rider=profile, week_start=week_start).first()
+        shift = RiderShift.objects.filter(rider=profile, end_time__isnull=True).first()
+        totals = RiderProfile.objects.values('total_deliveries', 'lifetime_earnings').get(id=profile.id)
+
+        def bucket(row):
+            return {
+                "amount": row.amount if row else Decimal('0.00'),
+                "deliveries": row.deliveries if row else 0,
+            }
+
+        return {
+            "today": bucket(day),
+            "this_week": bucket(week),
+            "current_shift": {
+                **bucket(shift),
+                "started_at": shift.start_time if shift else None,
+            },
+            "lifetime": {
+                "amount": totals['lifetime_earnings'],
+                "deliveries": totals['total_deliveries'],
+            },
+        }
+
+    @staticmethod
+    def payout_for_job(job):
+        """
+        Base fee + distance component for a completed delivery.
+        """
+        base = Decimal(str(getattr(settings, 'RIDER_PAYOUT_BASE', 25)))
+        per_km = Decimal(str(getattr(settings, 'RIDER_PAYOUT_PER_KM', 5)))
+        km = Decimal(str(job.distance_meters or 0)) / 1000
+        return (base + per_km * km).quantize(Decimal('0.01'))
@@ -0,0 +1,50 @@
+from datetime import timedelta
+from celery import shared_task
+from django.db.models import Q
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 500
+
+
+@shared_task
+def sweep_stale_riders():
+    """
+    Flips riders with an expired heartbeat offline (runs on beat, every ~30s).
+    Redis ZSET gives the stale set cheaply; the DB query catches riders whose
+    Redis entry was lost (flush/failover) so nobody stays "online" forever.
+    """
+    from .liveness import RiderLiveness
+    from .models import RiderProfile
+    from .services import RiderService
+
+    stale = set()
+    try:
+        stale.update(RiderLiveness.stale_ids(limit=SWEEP_BATCH_SIZE))
+    except Exception as e:
+        logger.warning(f"Liveness ZSET unavailable, using DB only: {e}")
+
+    cutoff = timezone.now() - timedelta(seconds=RiderLiveness.ttl_seconds())
+    stale.update(
+        str(pk) for pk in RiderProfile.objects.filter(is_online=True).filter(
+            Q(last_heartbeat__lt=cutoff) | Q(last_heartbeat__isnull=True)
+        ).values_list('id', flat=True)[:SWEEP_BATCH_SIZE]
+    )
+
+    if not stale:
+        return 0
+
+    offline = RiderService.mark_offline_batch(list(stale))
+
+    # Riders still online here are mid-delivery: keep them in the ZSET for the
+    # next sweep. Everyone else is offline now, so drop their entries.
+    still_online = {
+        str(pk) for pk in RiderProfile.objects.filter(id__in=stale, is_online=True).values_list('id', flat=True)
+    }
+    RiderLiveness.forget(stale - still_online)
+
+    if offline:
+        logger.info(f"Liveness sweep: {len(offline)} riders marked offline")
+    return len(offline)
@@ -0,0 +1,69 @@
+# apps/riders/tests.py
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+from .models import RiderProfile, RiderShift, RiderEarnings, RiderEarningsDaily, RiderEarningsWeekly
+from .services import RiderService
+
+User = get_user_model()
+
+
+class EarningsRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(phone="+919000000001", password="testpass")
+        self.profile = RiderProfile.objects.create(user=self.user, is_approved=True)
+        RiderService.toggle_status(self.user, True)
+
+    def test_credit_updates_ledger_and_rollups_together(self):
+        RiderService.credit_earnings(self.user, "ORD-1", "30.00")
+        RiderService.credit_earnings(self.user, "ORD-2", "45.50")
+
+        self.assertEqual(RiderEarnings.objects.filter(rider=self.profile).count(), 2)
+
+        daily = RiderEarningsDaily.objects.get(rider=self.profile)
+        weekly = RiderEarningsWeekly.objects.get(rider=self.profile)
+        self.assertEqual(daily.amount, Decimal("75.50"))
+        self.assertEqual(daily.deliveries, 2)
+        self.assertEqual(weekly.amount, Decimal("75.50"))
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.total_deliveries, 2)
+        self.assertEqual(self.profile.lifetime_earnings, Decimal("75.50"))
+
+    def test_summary_reads_rollups(self):
+        RiderService.credit_earnings(self.user, "ORD-1", "30.00")
+
+        summary = RiderService.get_earnings_summary(self.profile)
+        self.assertEqual(summary["today"]["amount"], Decimal("30.00"))
+        self.assertEqual(summary["this_week"]["deliveries"], 1)
+        self.assertEqual(summary["current_shift"]["deliveries"], 1)
+        self.assertEqual(summary["lifetime"]["deliveries"], 1)
+
+
+class LivenessSweepTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(phone="+919000000002", password="testpass")
+        self.profile = RiderProfile.objects.create(user=self.user, is_approved=True)
+        RiderService.toggle_status(self.user, True)
+
+    def test_mark_offline_batch_closes_shift_at_last_heartbeat(self):
+        last_seen = timezone.now() - timedelta(minutes=5)
+        RiderProfile.objects.filter(id=self.profile.id).update(last_heartbeat=last_seen)
+
+        offline = RiderService.mark_offline_batch([self.profile.id])
+
+        self.assertEqual(offline, [self.profile.id])
+        self.profile.refresh_from_db()
+        self.assertFalse(self.profile.is_online)
+        self.assertFalse(self.profile.is_available)
+        shift = RiderShift.objects.get(rider=self.profile)
+        self.assertEqual(shift.status, RiderShift.Status.COMPLETED)
+        self.assertEqual(shift.end_time, last_seen)
+
+    def test_offline_riders_are_ignored(self):
+        RiderService.toggle_status(self.user, False)
+        self.assertEqual(RiderService.mark_offline_batch([self.profile.id]), [])
@@ -3,8 +3,12 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 
-from .models import RiderProfile, RiderEarnings
-from .serializers import RiderProfileSerializer, RiderEarningsSerializer, LocationUpdateSerializer
+from apps.utils.pagination import StandardResultsSetPagination
+from .models import RiderProfile, RiderEarnings, RiderEarningsDaily
+from .serializers import (
+    RiderProfileSerializer, RiderEarningsSerializer, LocationUpdateSerializer,
+    RiderEarningsDailySerializer, EarningsSummarySerializer
+)
 from .services import RiderService
 
 class RiderProfileViewSet(viewsets.ReadOnlyModelViewSet):
@@ -42,10 +46,38 @@ class RiderProfileViewSet(viewsets.ReadOnlyModelViewSet):
         return Response({"status": "Updated"}, status=status.HTTP_200_OK)
 
 class RiderEarningsViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Raw ledger is paginated; dashboard numbers come from pre-aggregated rollups.
+    """
     serializer_class = RiderEarningsSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = StandardResultsSetPagination
 
     def get_queryset(self):
         if not hasattr(self.request.user, 'rider_profile'):
             return RiderEarnings.objects.none()
-        return RiderEarnings.objects.filter(rider=self.request.user).order_by('-created_at')
\ No newline at end of file
+        return RiderEarnings.objects.filter(rider=self.request.user.rider_profile).order_by('-created_at')
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Today / this week / current shift / lifetime totals.
+        """
+        if not hasattr(request.user, 'rider_profile'):
+            return Response({"error": "Rider profile not found"}, status=status.HTTP_404_NOT_FOUND)
+        data = RiderService.get_earnings_summary(request.user.rider_profile)
+        return Response(EarningsSummarySerializer(data).data)
+
+    @action(detail=False, methods=['get'])
+    def daily(self, request):
+        """
+        Last N days from the daily rollup (default 30, max 90).
+        """
+        if not hasattr(request.user, 'rider_profile'):
+            return Response([], status=status.HTTP_200_OK)
+        try:
+            days = max(1, min(int(request.query_params.get('days', 30)), 90))
+        except ValueError:
+            days = 30
+        rows = RiderEarningsDaily.objects.filter(rider=request.user.rider_profile)[:days]
+        return Response(RiderEarningsDailySerializer(rows, many=True).data)
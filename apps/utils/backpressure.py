@@ -0,0 +1,161 @@
+"""
+Per-connection send queues for websocket consumers.
+
+A slow client must never back up the shared channel layer: every consumer
+drains its group messages immediately into a local queue, and a writer task
+pushes them to the socket at whatever pace the client can take.
+
+Two lanes per connection:
+- control:  status/state changes, delivered first; only shed once a client
+            is hopelessly behind (WS_CONTROL_QUEUE_SIZE)
+- location: high-frequency position pings, bounded, oldest dropped first
+            (only the latest position matters to the client)
+
+Queue depth and drop counts are published to Redis per worker process so
+ops can see backpressure across the fleet (see health.websocket_metrics).
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from collections import deque
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY_PREFIX = "ws_metrics:"
+
+
+class QueueMetrics:
+    """
+    Process-wide gauges for all live SendQueues.
+    """
+
+    def __init__(self):
+        self.queues = set()
+        self.dropped_total = 0
+        self.sent_total = 0
+        self._last_flush = 0.0
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    def snapshot(self):
+        depths = [q.depth for q in self.queues]
+        return {
+            "connections": len(depths),
+            "queued_total": sum(depths),
+            "queued_max": max(depths, default=0),
+            "dropped_total": self.dropped_total,
+            "sent_total": self.sent_total,
+        }
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'WS_METRICS_FLUSH_SECONDS', 10)
+
+    def flush_due(self):
+        """
+        True at most once per interval (cheap enough to call per message).
+        """
+        now = time.monotonic()
+        if now - self._last_flush < self.flush_interval:
+            return False
+        self._last_flush = now
+        return True
+
+    def flush(self):
+        """
+        Publishes the snapshot to Redis. Blocking: run it off the event loop.
+        """
+        interval = self.flush_interval
+        try:
+            from django_redis import get_redis_connection
+            conn = get_redis_connection("default")
+            key = f"{METRICS_KEY_PREFIX}{self.worker_id}"
+            pipe = conn.pipeline()
+            pipe.hset(key, mapping=self.snapshot())
+            pipe.expire(key, interval * 6)
+            pipe.execute()
+        except Exception as e:
+            # Metrics must never break the socket path
+            logger.debug(f"WS metrics flush failed: {e}")
+
+
+queue_metrics = QueueMetrics()
+
+
+class SendQueue:
+    """
+    Bounded, two-lane outbound queue for one websocket connection.
+    """
+
+    def __init__(self, send, location_capacity=None, control_capacity=None):
+        self._send = send
+        self.location_capacity = location_capacity or getattr(settings, 'WS_LOCATION_QUEUE_SIZE', 5)
+        self.control_capacity = control_capacity or getattr(settings, 'WS_CONTROL_QUEUE_SIZE', 100)
+        self._location = deque(maxlen=self.location_capacity)
+        self._control = deque()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.dropped = 0
+
+    @property
+    def depth(self):
+        return len(self._control) + len(self._location)
+
+    def start(self):
+        queue_metrics.queues.add(self)
+        self._task = asyncio.ensure_future(self._writer())
+
+    async def stop(self):
+        queue_metrics.queues.discard(self)
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def put_location(self, text):
+        if len(self._location) == self.location_capacity:
+            # deque(maxlen) evicts the oldest ping on append
+            self._record_drop()
+        self._location.append(text)
+        self._wakeup.set()
+
+    def put_control(self, text):
+        if len(self._control) >= self.control_capacity:
+            # A client this far behind is effectively dead; shed the oldest
+            self._control.popleft()
+            self._record_drop()
+        self._control.append(text)
+        self._wakeup.set()
+
+    def _record_drop(self):
+        self.dropped += 1
+        queue_metrics.dropped_total += 1
+
+    def _next(self):
+        if self._control:
+            return self._control.popleft()
+        if self._location:
+            return self._location.popleft()
+        return None
+
+    async def _writer(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            text = self._next()
+            while text is not None:
+                try:
+                    await self._send(text_data=text)
+                except Exception as e:
+                    logger.info(f"WS send failed, stopping writer: {e}")
+                    return
+                queue_metrics.sent_total += 1
+                if queue_metrics.flush_due():
+                    asyncio.get_running_loop().run_in_executor(None, queue_metrics.flush)
+                text = self._next()
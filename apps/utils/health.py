@@ -1,6 +1,9 @@
 from django.http import JsonResponse
 from django.db import connection
 from django_redis import get_redis_connection
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
 
 def health_check(request):
     status = {"db": "unknown", "redis": "unknown"}
@@ -20,4 +23,29 @@ def health_check(request):
         return JsonResponse(
             {"status": "error", "detail": str(e), "components": status}, 
             status=503
-        )
\ No newline at end of file
+        )
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def websocket_metrics(request):
+    """
+    Fleet-wide websocket send-queue depth, aggregated from per-worker snapshots.
+    Ops only: exposes connection counts and per-worker internals.
+    """
+    from .backpressure import METRICS_KEY_PREFIX
+
+    conn = get_redis_connection("default")
+    workers = {}
+    totals = {"connections": 0, "queued_total": 0, "queued_max": 0, "dropped_total": 0}
+
+    for key in conn.scan_iter(match=f"{METRICS_KEY_PREFIX}*", count=100):
+        raw = conn.hgetall(key)
+        stats = {k.decode(): int(v) for k, v in raw.items()}
+        workers[key.decode()[len(METRICS_KEY_PREFIX):]] = stats
+
+        totals["connections"] += stats.get("connections", 0)
+        totals["queued_total"] += stats.get("queued_total", 0)
+        totals["dropped_total"] += stats.get("dropped_total", 0)
+        totals["queued_max"] = max(totals["queued_max"], stats.get("queued_max", 0))
+
+    return Response({"totals": totals, "workers": workers})
\ No newline at end of file
@@ -0,0 +1,209 @@
+"""
+K-sortable ID generation (Snowflake layout), no DB round trip.
+
+63-bit integer:
+    41 bits  milliseconds since ID_EPOCH (~69 years)
+    12 bits  node id (one per worker process, 4096 live processes)
+    10 bits  per-millisecond sequence (1024 ids/ms/process)
+
+Rendered as fixed-width Crockford base32 behind a prefix, e.g. "ORD-0F3K9Q2M7XA4B",
+so string order == time order: new rows land at the right edge of the
+B-tree instead of splitting random pages.
+
+Node ids come from ORDER_ID_NODE (if a deployment pins them) or are leased
+per process in Redis: `ids:node:<n>` is taken with SET NX EX and renewed
+while the process issues ids, so two live workers never share one and a
+dead worker's node frees itself after ORDER_ID_NODE_LEASE_SECONDS.
+"""
+import os
+import threading
+import time
+import uuid
+import zlib
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+ID_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+
+TIMESTAMP_BITS = 41
+NODE_BITS = 12
+SEQUENCE_BITS = 10
+
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+NODE_KEY = "ids:node:{}"
+NODE_CURSOR_KEY = "ids:node_counter"
+
+# Extend our lease only if we still hold it; take it back if it lapsed unclaimed
+RENEW_SCRIPT = """
+local owner = redis.call('GET', KEYS[1])
+if owner == ARGV[1] or not owner then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ENCODED_LENGTH = 13  # ceil(63 / 5)
+
+
+def encode_base32(value, length=ENCODED_LENGTH):
+    chars = []
+    for _ in range(length):
+        chars.append(CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def decode_base32(text):
+    value = 0
+    for char in text.upper():
+        value = (value << 5) | CROCKFORD.index(char)
+    return value
+
+
+class KSortableIdGenerator:
+
+    def __init__(self, prefix="", node_id=None):
+        self.prefix = prefix
+        self._fixed_node = node_id
+        self._node = None
+        self._pid = None
+        self._token = None      # lease value in Redis; None = not leased (pinned or fallback)
+        self._renewed_at = 0.0  # monotonic time of the last lease/renewal
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Node id
+    # ------------------------------------------------------------------
+    @property
+    def node_id(self):
+        # Re-lease after fork: a forked child must not reuse the parent's node
+        pid = os.getpid()
+        if self._node is None or self._pid != pid:
+            self._node = self._fixed_node & MAX_NODE if self._fixed_node is not None else self._lease_node()
+            self._pid = pid
+            self._last_ms, self._sequence = -1, 0
+        elif self._fixed_node is None:
+            self._renew_node()
+        return self._node
+
+    @staticmethod
+    def _lease_seconds():
+        return int(getattr(settings, 'ORDER_ID_NODE_LEASE_SECONDS', 60))
+
+    @staticmethod
+    def _redis():
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+
+    def _lease_node(self):
+        pinned = getattr(settings, 'ORDER_ID_NODE', None)
+        if pinned not in (None, ''):
+            self._token = None
+            return int(pinned) & MAX_NODE
+
+        token = uuid.uuid4().hex
+        ttl = self._lease_seconds()
+        try:
+            conn = self._redis()
+            # Start probing at a rotating offset so workers don't all contend for node 0
+            start = conn.incr(NODE_CURSOR_KEY) - 1
+            for i in range(MAX_NODE + 1):
+                node = (start + i) & MAX_NODE
+                if conn.set(NODE_KEY.format(node), token, ex=ttl, nx=True):
+                    self._token, self._renewed_at = token, time.monotonic()
+                    return node
+            raise RuntimeError(f"all {MAX_NODE + 1} node ids are leased")
+        except Exception as e:
+            # Last resort: hash of host + pid (collision-unlikely, not guaranteed)
+            logger.warning(f"ID node lease failed, deriving from host/pid: {e}")
+            self._token, self._renewed_at = None, time.monotonic()
+            return zlib.crc32(f"{os.uname().nodename}:{os.getpid()}".encode()) & MAX_NODE
+
+    def _renew_node(self):
+        """
+        Heartbeat, piggybacked on id generation: renews the lease once a third
+        of its TTL has passed. If another process took the node while this one
+        sat idle past the TTL, leases a fresh node before issuing anything.
+        """
+        ttl = self._lease_seconds()
+        elapsed = time.monotonic() - self._renewed_at
+        if elapsed < ttl / 3:
+            return
+        if self._token is None:
+            # Pinned or hash fallback: retry a real lease once per TTL
+            if elapsed >= ttl and getattr(settings, 'ORDER_ID_NODE', None) in (None, ''):
+                self._node = self._lease_node()
+                self._last_ms, self._sequence = -1, 0
+            else:
+                self._renewed_at = time.monotonic()
+            return
+        try:
+            held = self._redis().eval(RENEW_SCRIPT, 1, NODE_KEY.format(self._node), self._token, ttl)
+        except Exception as e:
+            # Redis down: nobody else can lease it either, keep the node
+            logger.warning(f"ID node {self._node} lease renewal failed: {e}")
+            return
+        if held:
+            self._renewed_at = time.monotonic()
+        else:
+            logger.warning(f"ID node {self._node} lease was lost, leasing a new node")
+            self._node = self._lease_node()
+            self._last_ms, self._sequence = -1, 0
+
+    # ------------------------------------------------------------------
+    # Generation
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _now_ms():
+        return int(time.time() * 1000) - ID_EPOCH_MS
+
+    def next_int(self):
+        with self._lock:
+            node = self.node_id
+            now = self._now_ms()
+            if now < self._last_ms:
+                # Clock stepped back (NTP): keep issuing from the last timestamp
+                now = self._last_ms
+
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    # 1024 ids this millisecond: wait for the next one
+                    while now <= self._last_ms:
+                        now = self._now_ms()
+            else:
+                self._sequence = 0
+
+            self._last_ms = now
+            return (now << (NODE_BITS + SEQUENCE_BITS)) | (node << SEQUENCE_BITS) | self._sequence
+
+    def next_id(self):
+        return f"{self.prefix}{encode_base32(self.next_int())}"
+
+    # ------------------------------------------------------------------
+    # Introspection (support / debugging)
+    # ------------------------------------------------------------------
+    def parse(self, value):
+        """
+        -> (unix_ms, node, sequence)
+        """
+        if self.prefix and value.startswith(self.prefix):
+            value = value[len(self.prefix):]
+        raw = decode_base32(value)
+        return (
+            (raw >> (NODE_BITS + SEQUENCE_BITS)) + ID_EPOCH_MS,
+            (raw >> SEQUENCE_BITS) & MAX_NODE,
+            raw & MAX_SEQUENCE,
+        )
+
+
+order_ids = KSortableIdGenerator(prefix="ORD-")
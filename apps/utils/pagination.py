@@ -1,7 +1,162 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = "page_size"
     max_page_size = 200
+
+
+class KeysetPagination(BasePagination):
+    """
+    Seek pagination on (created_at, id), newest first.
+    Cost is independent of how deep the client scrolls (no OFFSET), and rows
+    inserted while paging don't shift pages. Needs an index on the ordering
+    columns (plus any equality filter in front, e.g. user).
+    """
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    ordering = ("created_at", "id")
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    @staticmethod
+    def encode_cursor(created_at, pk):
+        raw = f"{created_at.isoformat()}|{pk}"
+        return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            created_at, pk = urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+            return datetime.fromisoformat(created_at), pk
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound("Invalid cursor.")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        time_field, id_field = self.ordering
+        size = self.get_page_size(request)
+
+        queryset = queryset.order_by(f"-{time_field}", f"-{id_field}")
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{f"{time_field}__lt": created_at}) |
+                Q(**{time_field: created_at, f"{id_field}__lt": pk})
+            )
+
+        # One extra row tells us whether there is a next page (no COUNT(*))
+        rows = list(queryset[:size + 1])
+        self.has_next = len(rows) > size
+        rows = rows[:size]
+        self.next_cursor = None
+        if self.has_next:
+            last = rows[-1]
+            get = last.get if isinstance(last, dict) else lambda f: getattr(last, f)
+            self.next_cursor = self.encode_cursor(get(time_field), get(id_field))
+        return rows
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "results": data,
+        })
+
+
+class SortedKeysetPagination(KeysetPagination):
+    """
+    Keyset pagination over a fixed menu of sort orders (?sort=<key>).
+
+    `orderings` maps each key to its order_by columns; the last one must be
+    unique (the pk) so ties break deterministically. Each sort needs a
+    matching index. The cursor is opaque and carries the sort key, so a
+    cursor from one sort is rejected by another instead of skipping rows.
+    """
+    sort_query_param = "sort"
+    orderings = {"newest": ("-created_at", "-id")}
+    default_sort = "newest"
+
+    def get_sort(self, request):
+        sort = request.query_params.get(self.sort_query_param) or self.default_sort
+        if sort not in self.orderings:
+            raise NotFound(f"Unknown sort '{sort}'. Use one of: {', '.join(self.orderings)}.")
+        return sort
+
+    @staticmethod
+    def encode_values(sort, values):
+        raw = json.dumps([sort, [v.isoformat() if hasattr(v, "isoformat") else str(v) for v in values]])
+        return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_values(cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            sort, values = json.loads(urlsafe_b64decode(padded.encode()).decode())
+        except (ValueError, TypeError, UnicodeDecodeError):
+            raise NotFound("Invalid cursor.")
+        return sort, values
+
+    @staticmethod
+    def seek_filter(columns, values):
+        """
+        Rows strictly after `values` in `columns` order, as an OR of prefixes:
+        (a > x) OR (a = x AND b > y) ... with > / < per column direction.
+        Field to_python() converts the string cursor values back.
+        """
+        condition = Q()
+        for i, column in enumerate(columns):
+            field = column.lstrip("-")
+            op = "lt" if column.startswith("-") else "gt"
+            term = Q(**{f"{field}__{op}": values[i]})
+            for prev, value in zip(columns[:i], values[:i]):
+                term &= Q(**{prev.lstrip("-"): value})
+            condition |= term
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.sort = self.get_sort(request)
+        columns = self.orderings[self.sort]
+        size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*columns)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            sort, values = self.decode_values(cursor)
+            if sort != self.sort or len(values) != len(columns):
+                raise NotFound("Cursor does not match this sort order.")
+            queryset = queryset.filter(self.seek_filter(columns, values))
+
+        rows = list(queryset[:size + 1])
+        self.has_next = len(rows) > size
+        rows = rows[:size]
+        self.next_cursor = None
+        if self.has_next:
+            last = rows[-1]
+            get = last.get if isinstance(last, dict) else lambda f: getattr(last, f)
+            self.next_cursor = self.encode_values(self.sort, [get(c.lstrip("-")) for c in columns])
+        return rows
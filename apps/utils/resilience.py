@@ -1,56 +1,112 @@
 import time
+import logging
 import functools
 from django.core.cache import cache
 from apps.utils.exceptions import BusinessLogicException
 
+logger = logging.getLogger(__name__)
+
 class CircuitBreaker:
-    def __init__(self, service_name, failure_threshold=5, recovery_timeout=60):
+    def __init__(self, service_name, failure_threshold=5, recovery_timeout=60,
+                 failure_window=120, ignore=()):
         self.service_name = service_name
         self.failure_threshold = failure_threshold
         self.recovery_timeout = recovery_timeout
+        self.failure_window = failure_window
+        # Exceptions that are the caller's fault (bad input, bad signature), not an outage
+        self.ignore = tuple(ignore)
         self.cache_key_failures = f"cb_failures:{service_name}"
         self.cache_key_open = f"cb_open:{service_name}"
 
     def __call__(self, func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            # 1. Check if Circuit is OPEN
-            if cache.get(self.cache_key_open):
-                raise BusinessLogicException(
-                    f"{self.service_name} is temporarily unavailable. Please try again later."
-                )
-
-            try:
-                # 2. Attempt Call
-                result = func(*args, **kwargs)
-                
-                # 3. Success? Reset failures (optional, or rely on TTL)
-                # For strictness, we don't reset on every success to avoid flapping,
-                # but clearing it here is common for "stable" state.
-                # cache.delete(self.cache_key_failures)
-                return result
-
-            except Exception as e:
-                # 4. Failure: Increment Counter
-                failures = cache.incr(self.cache_key_failures)
-                
-                # First failure? Set expiry for the counter window (e.g. 5 errors in 2 mins)
-                if failures == 1:
-                    cache.expire(self.cache_key_failures, 120)
-
-                # 5. Threshold Reached? OPEN Circuit
-                if failures >= self.failure_threshold:
-                    cache.set(self.cache_key_open, "OPEN", timeout=self.recovery_timeout)
-                    cache.delete(self.cache_key_failures) # Reset counter for next cycle
-                
-                raise e
+            return self.call(func, *args, **kwargs)
 
         return wrapper
 
-# Usage Example in PaymentService:
-# from apps.utils.resilience import CircuitBreaker
-# 
-# @staticmethod
-# @CircuitBreaker(service_name="razorpay", failure_threshold=5, recovery_timeout=30)
-# def _get_client():
-#     ...
\ No newline at end of file
+    @property
+    def is_open(self):
+        return bool(cache.get(self.cache_key_open))
+
+    def call(self, func, *args, **kwargs):
+        # 1. Check if Circuit is OPEN
+        if self.is_open:
+            raise BusinessLogicException(
+                f"{self.service_name} is temporarily unavailable. Please try again later."
+            )
+
+        try:
+            # 2. Attempt Call
+            # For strictness, we don't reset failures on every success to avoid
+            # flapping; the counter window expires on its own.
+            return func(*args, **kwargs)
+
+        except self.ignore:
+            raise
+
+        except Exception:
+            self.record_failure()
+            raise
+
+    def record_failure(self):
+        # 3. Failure: Increment Counter
+        # add() is a no-op if the window is already running (portable across cache backends)
+        cache.add(self.cache_key_failures, 0, timeout=self.failure_window)
+        try:
+            failures = cache.incr(self.cache_key_failures)
+        except ValueError:
+            # Window expired between add() and incr()
+            cache.set(self.cache_key_failures, 1, timeout=self.failure_window)
+            failures = 1
+
+        # 4. Threshold Reached? OPEN Circuit
+        if failures >= self.failure_threshold:
+            cache.set(self.cache_key_open, "OPEN", timeout=self.recovery_timeout)
+            cache.delete(self.cache_key_failures) # Reset counter for next cycle
+
+# Usage: see apps/payments/gateway.py
+
+
+class TokenBucket:
+    """
+    Distributed token bucket in Redis (shared by every worker), e.g. to stay
+    under a gateway's per-account rate limit. Refill + take is one Lua call.
+    """
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local requested = tonumber(ARGV[4])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local allowed = 0
+    if tokens >= requested then
+        tokens = tokens - requested
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+    return allowed
+    """
+
+    def __init__(self, name, rate, capacity):
+        self.key = f"tb:{name}"
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._script = None
+
+    def consume(self, tokens=1):
+        """
+        True if the caller may proceed. Fails open if Redis is unavailable.
+        """
+        try:
+            if self._script is None:
+                from django_redis import get_redis_connection
+                self._script = get_redis_connection("default").register_script(self.SCRIPT)
+            return bool(self._script(keys=[self.key], args=[self.rate, self.capacity, time.time(), tokens]))
+        except Exception as e:
+            logger.warning(f"Token bucket {self.key} unavailable, allowing call: {e}")
+            return True
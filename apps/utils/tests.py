@@ -1,7 +1,15 @@
 # apps/utils/tests.py
-from django.test import TestCase
+import asyncio
+
+from django.core.cache import cache
+from django.test import TestCase, SimpleTestCase, override_settings
 from rest_framework.exceptions import ValidationError
+from .exceptions import BusinessLogicException
 from .validators import validate_phone, validate_lat_lng
+from .backpressure import SendQueue
+from .resilience import CircuitBreaker
+from .pagination import KeysetPagination, SortedKeysetPagination
+from .ids import KSortableIdGenerator, ENCODED_LENGTH
 
 class ValidatorTests(TestCase):
     def test_phone_validator(self):
@@ -19,4 +27,165 @@ class ValidatorTests(TestCase):
             
         # Invalid Longitude
         with self.assertRaises(ValueError):
-            validate_lat_lng(12.9716, 181.0)
\ No newline at end of file
+            validate_lat_lng(12.9716, 181.0)
+
+class SendQueueTests(SimpleTestCase):
+    def _run(self, coro):
+        return asyncio.run(coro)
+
+    def test_location_lane_drops_oldest(self):
+        async def scenario():
+            sent = []
+
+            async def send(text_data):
+                sent.append(text_data)
+
+            queue = SendQueue(send, location_capacity=2)
+            for i in range(5):
+                queue.put_location(f"loc-{i}")
+            queue.put_control("status")
+
+            self.assertEqual(queue.depth, 3)
+            self.assertEqual(queue.dropped, 3)
+
+            queue.start()
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            await queue.stop()
+            return sent
+
+        # Control messages jump ahead of queued location pings
+        self.assertEqual(self._run(scenario()), ["status", "loc-3", "loc-4"])
+
+    def test_control_lane_is_bounded(self):
+        async def scenario():
+            async def send(text_data):
+                pass
+
+            queue = SendQueue(send, control_capacity=3)
+            for i in range(4):
+                queue.put_control(f"c-{i}")
+            return list(queue._control), queue.dropped
+
+        self.assertEqual(self._run(scenario()), (["c-1", "c-2", "c-3"], 1))
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.breaker = CircuitBreaker("test-gw", failure_threshold=2, recovery_timeout=30, ignore=(KeyError,))
+
+    def _boom(self, exc):
+        raise exc
+
+    def test_opens_after_threshold(self):
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                self.breaker.call(self._boom, ConnectionError())
+
+        self.assertTrue(self.breaker.is_open)
+        with self.assertRaises(BusinessLogicException):
+            self.breaker.call(lambda: "ok")
+
+    def test_ignored_errors_do_not_count(self):
+        for _ in range(3):
+            with self.assertRaises(KeyError):
+                self.breaker.call(self._boom, KeyError())
+
+        self.assertFalse(self.breaker.is_open)
+        self.assertEqual(self.breaker.call(lambda: "ok"), "ok")
+
+
+class KeysetCursorTests(SimpleTestCase):
+    def test_cursor_round_trip(self):
+        from datetime import datetime, timezone as dt_timezone
+        created_at = datetime(2024, 5, 1, 10, 30, 15, 123456, tzinfo=dt_timezone.utc)
+        cursor = KeysetPagination.encode_cursor(created_at, "ORD-42")
+
+        self.assertEqual(KeysetPagination.decode_cursor(cursor), (created_at, "ORD-42"))
+
+    def test_garbage_cursor_is_rejected(self):
+        from rest_framework.exceptions import NotFound
+        with self.assertRaises(NotFound):
+            KeysetPagination.decode_cursor("not-a-cursor")
+
+
+    def test_sorted_cursor_is_bound_to_its_sort(self):
+        from decimal import Decimal
+        cursor = SortedKeysetPagination.encode_values("price_asc", [Decimal("60.00"), "a1"])
+        self.assertEqual(SortedKeysetPagination.decode_values(cursor), ("price_asc", ["60.00", "a1"]))
+
+        condition = SortedKeysetPagination.seek_filter(("-sale_price", "-id"), ["60.00", "a1"])
+        self.assertIn(("sale_price__lt", "60.00"), condition.children)
+
+
+class KSortableIdTests(SimpleTestCase):
+    def setUp(self):
+        self.gen = KSortableIdGenerator(prefix="ORD-", node_id=7)
+
+    def test_ids_are_unique_fixed_width_and_sorted(self):
+        ids = [self.gen.next_id() for _ in range(5000)]
+
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids, sorted(ids))
+        self.assertTrue(all(len(i) == len("ORD-") + ENCODED_LENGTH for i in ids))
+
+    def test_parse_recovers_components(self):
+        import time
+        before = int(time.time() * 1000)
+        unix_ms, node, _ = self.gen.parse(self.gen.next_id())
+
+        self.assertEqual(node, 7)
+        self.assertLessEqual(abs(unix_ms - before), 1000)
+
+    def test_leased_nodes_are_exclusive_and_released_on_loss(self):
+        from unittest import mock
+
+        class FakeRedis:
+            def __init__(self):
+                self.data, self.counter = {}, 0
+
+            def incr(self, key):
+                self.counter += 1
+                return self.counter
+
+            def set(self, key, value, ex=None, nx=False):
+                if nx and key in self.data:
+                    return None
+                self.data[key] = value
+                return True
+
+            def eval(self, script, numkeys, key, token, ttl):
+                if self.data.get(key, token) != token:
+                    return 0
+                self.data[key] = token
+                return 1
+
+        fake = FakeRedis()
+        first = KSortableIdGenerator(prefix="ORD-")
+        second = KSortableIdGenerator(prefix="ORD-")
+        with mock.patch.object(KSortableIdGenerator, "_redis", return_value=fake), \
+                self.settings(ORDER_ID_NODE=None, ORDER_ID_NODE_LEASE_SECONDS=60):
+            self.assertNotEqual(first.node_id, second.node_id)
+
+            # Lease lapsed while idle and someone else took the node
+            fake.data[f"ids:node:{first.node_id}"] = "other-process"
+            first._renewed_at -= 60
+            taken = int(next(k for k, v in fake.data.items() if v == "other-process").rsplit(":", 1)[1])
+
+            self.assertNotEqual(first.node_id, taken)
+
+    def test_nodes_never_collide(self):
+        other = KSortableIdGenerator(prefix="ORD-", node_id=8)
+        mine = {self.gen.next_id() for _ in range(1000)}
+        theirs = {other.next_id() for _ in range(1000)}
+        self.assertFalse(mine & theirs)
+
+
+class WebsocketMetricsTests(TestCase):
+    def test_requires_admin(self):
+        from rest_framework.test import APIRequestFactory
+        from .health import websocket_metrics
+        response = websocket_metrics(APIRequestFactory().get("/metrics/websockets/"))
+        self.assertIn(response.status_code, (401, 403))
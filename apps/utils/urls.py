@@ -1,11 +1,12 @@
 from django.urls import path
-from .health import health_check
+from .health import health_check, websocket_metrics
 from .views import ServerInfoView
 from .views import GlobalConfigView
 
 
 urlpatterns = [
     path("health/", health_check, name="health-check"),
+    path("metrics/websockets/", websocket_metrics, name="websocket-metrics"),
     path("info/", ServerInfoView.as_view(), name="server-info"),
     path("config/", GlobalConfigView.as_view(), name="global-config"),
     
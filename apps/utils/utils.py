@@ -10,6 +10,14 @@ def generate_code(prefix=""):
     return prefix + uuid.uuid4().hex[:8].upper()
 
 
+def generate_order_id():
+    """
+    Time-ordered, collision-free order id (see apps/utils/ids.py), e.g. ORD-0F3K9Q2M7XA4B.
+    """
+    from .ids import order_ids
+    return order_ids.next_id()
+
+
 def dict_clean(d: dict):
     """
     Remove keys where value is None or empty
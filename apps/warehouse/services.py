@@ -5,6 +5,7 @@ from django.db.models import F
 from apps.utils.exceptions import BusinessLogicException
 from apps.inventory.services import InventoryService
 from apps.utils.utils import generate_code
+from apps.orders.projections import OrderProjection
 from .models import Warehouse, PickingTask, PickItem, BinInventory, PackingTask, DispatchRecord
 
 logger = logging.getLogger(__name__)
@@ -67,6 +68,7 @@ class WarehouseOpsService:
                 logger.error(f"Shortage for Order {order_id} SKU {sku_id}. Allocated: {qty_allocated}/{qty_needed}")
 
         PickItem.objects.bulk_create(pick_items)
+        OrderProjection.refresh(order_id, 'fulfilment')
         return task
 
     @staticmethod
@@ -106,6 +108,7 @@ class WarehouseOpsService:
             task.save(update_fields=['status', 'completed_at'])
             
             PackingTask.objects.create(picking_task=task, status=PackingTask.Status.PENDING)
+            OrderProjection.refresh(task.order_id, 'fulfilment')
 
     @staticmethod
     @transaction.atomic
@@ -4,10 +4,15 @@ from django.contrib.gis.db.models.functions import Distance
 from django.db.models import F
 from apps.warehouse.models import Warehouse, ServiceArea, BinInventory
 from apps.inventory.models import InventoryStock
+from apps.delivery.eta import eta_engine, point_to_latlng
+from rest_framework.exceptions import ValidationError
 import logging
 
 logger = logging.getLogger(__name__)
 
+ACTIVE_IDS_KEY = "warehouse:active_ids"
+ACTIVE_IDS_TTL = 60  # a deactivated warehouse stops resolving within a minute
+
 class WarehouseSelector:
     @staticmethod
     def get_serviceable_warehouse(lat, lng):
@@ -44,6 +49,41 @@ class WarehouseSelector:
             logger.error(f"Error checking serviceability: {e}")
             return None
 
+    @staticmethod
+    def active_warehouse_ids():
+        """
+        Ids of active warehouses (a small table), cached briefly so storefront
+        reads can validate ?warehouse_id= without a query per request.
+        """
+        from django.core.cache import cache
+        return cache.get_or_set(
+            ACTIVE_IDS_KEY,
+            lambda: set(Warehouse.objects.filter(is_active=True).values_list('id', flat=True)),
+            ACTIVE_IDS_TTL,
+        )
+
+    @staticmethod
+    def warehouse_id_from_request(request):
+        """
+        Storefront reads: explicit ?warehouse_id=, else ?lat=&lng=, else None.
+        Raises ValidationError (400) for an id that isn't an active warehouse,
+        so junk ids never reach cache keys or the price tables.
+        """
+        warehouse_id = request.query_params.get('warehouse_id')
+        if warehouse_id:
+            try:
+                warehouse_id = int(warehouse_id)
+            except ValueError:
+                warehouse_id = None
+            if warehouse_id not in WarehouseSelector.active_warehouse_ids():
+                raise ValidationError({"warehouse_id": "Unknown or inactive warehouse."})
+            return warehouse_id
+        lat, lng = request.query_params.get('lat'), request.query_params.get('lng')
+        if lat and lng:
+            warehouse = WarehouseSelector.get_serviceable_warehouse(lat, lng)
+            return warehouse.id if warehouse and warehouse.is_active else None
+        return None
+
 def get_nearest_service_area(lat, lng):
     """
     Returns dict with service area details for 'Locate Me' functionality.
@@ -65,12 +105,18 @@ def get_nearest_service_area(lat, lng):
             ).filter(distance__lte=F('radius_km') * 1000).order_by('distance').first() # *1000 if distance in meters? PostGIS depends on SRID. Assuming km logic handles elsewhere or using raw check.
 
         if area:
+            eta_mins = area.delivery_time_minutes
+            if area.warehouse.location:
+                # Road-network ETA from the in-process matrix (no extra query / API call)
+                eta_mins = eta_engine.promise_minutes(
+                    point_to_latlng(area.warehouse.location), (float(lat), float(lng))
+                )
             return {
                 "serviceable": True,
                 "warehouse_id": area.warehouse.id,
                 "warehouse_name": area.warehouse.name,
                 "service_area": area.name,
-                "eta_mins": area.delivery_time_minutes
+                "eta_mins": eta_mins
             }
         return {"serviceable": False}
     except Exception:
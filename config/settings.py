@@ -37,6 +37,7 @@ CELERY_TASK_QUEUES = (
     Queue('default', Exchange('default'), routing_key='default'),
     Queue('warehouse', Exchange('warehouse'), routing_key='warehouse'),
     Queue('delivery', Exchange('delivery'), routing_key='delivery'),
+    Queue('payments', Exchange('payments'), routing_key='payments'),
 )
 CELERY_TASK_DEFAULT_QUEUE = 'default'
 
@@ -57,6 +58,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.gis', # PostGIS
+    'django.contrib.postgres', # Full-text search / pg_trgm lookups
     
     # Third Party
     'rest_framework',
@@ -142,6 +144,11 @@ CACHES = {
     }
 }
 
+# Tracking sockets get their own Redis pool. channels_redis shards groups and
+# channels across all listed hosts by consistent hash, so adding URLs here
+# spreads the evening-peak fan-out without touching the order-processing Redis.
+CHANNEL_REDIS_URLS = [u for u in os.getenv('CHANNEL_REDIS_URLS', '').split(',') if u] or [REDIS_URL]
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
@@ -149,8 +156,24 @@ CHANNEL_LAYERS = {
             "hosts": [REDIS_URL],
         },
     },
+    "tracking": {
+        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "CONFIG": {
+            "hosts": CHANNEL_REDIS_URLS,
+            "prefix": "trk",
+            # Per-channel inbox cap: group_send silently skips full channels
+            "capacity": int(os.getenv('CHANNEL_CAPACITY', '100')),
+            "expiry": 30,
+            "group_expiry": 3600,
+        },
+    },
 }
 
+# Per-connection outbound queues (apps/utils/backpressure.py)
+WS_LOCATION_QUEUE_SIZE = int(os.getenv('WS_LOCATION_QUEUE_SIZE', '5'))
+WS_CONTROL_QUEUE_SIZE = int(os.getenv('WS_CONTROL_QUEUE_SIZE', '100'))
+WS_METRICS_FLUSH_SECONDS = int(os.getenv('WS_METRICS_FLUSH_SECONDS', '10'))
+
 # Celery
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
@@ -162,8 +185,81 @@ CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
 CELERY_TASK_ROUTES = {
     'apps.warehouse.tasks.process_warehouse_order_task': {'queue': 'warehouse'},
     'apps.delivery.tasks.assign_rider_task': {'queue': 'delivery'},
+    'apps.delivery.tasks.dispatch_trip_task': {'queue': 'delivery'},
+    'apps.delivery.tasks.assign_trip_rider_task': {'queue': 'delivery'},
+    'apps.riders.tasks.sweep_stale_riders': {'queue': 'delivery'},
+    'apps.payments.tasks.create_gateway_order_task': {'queue': 'payments'},
+    'apps.payments.tasks.drain_webhook_events_task': {'queue': 'payments'},
+    'apps.payments.tasks.reconcile_payments_task': {'queue': 'payments'},
+    'apps.payments.tasks.process_refunds_task': {'queue': 'payments'},
+}
+
+CELERY_BEAT_SCHEDULE = {
+    'sweep-stale-riders': {
+        'task': 'apps.riders.tasks.sweep_stale_riders',
+        'schedule': float(os.getenv('RIDER_SWEEP_INTERVAL_SECONDS', '30')),
+    },
+    'drain-webhook-events': {
+        'task': 'apps.payments.tasks.drain_webhook_events_task',
+        'schedule': 15.0,
+    },
+    'reconcile-payments': {
+        'task': 'apps.payments.tasks.reconcile_payments_task',
+        'schedule': float(os.getenv('PAYMENT_RECONCILE_INTERVAL_SECONDS', '600')),
+    },
+    'process-refunds': {
+        'task': 'apps.payments.tasks.process_refunds_task',
+        'schedule': 60.0,
+    },
+    'rebuild-suggest-index': {
+        # Catalog edits rebuild on their own; this keeps popularity ranking fresh
+        'task': 'apps.catalog.tasks.rebuild_suggest_index_task',
+        'schedule': 3600.0,
+    },
+    'flush-flash-sales': {
+        'task': 'apps.catalog.tasks.flush_flash_sales_task',
+        'schedule': float(os.getenv('FLASH_SALE_FLUSH_INTERVAL_SECONDS', '10')),
+    },
 }
 
+# Home feed (apps/catalog/home_feed.py)
+HOME_FEED_TTL_SECONDS = int(os.getenv('HOME_FEED_TTL_SECONDS', '3600'))
+HOME_FEED_REBUILD_DELAY_SECONDS = int(os.getenv('HOME_FEED_REBUILD_DELAY_SECONDS', '5'))
+HOME_FEED_FEATURED_LIMIT = int(os.getenv('HOME_FEED_FEATURED_LIMIT', '20'))
+HOME_FEED_PERSONAL_TTL_SECONDS = int(os.getenv('HOME_FEED_PERSONAL_TTL_SECONDS', '600'))
+
+# Bulk SKU import (apps/catalog/importer.py): rows per validate + upsert round
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', '1000'))
+
+# Catalog response cache (apps/catalog/cache.py)
+CATALOG_CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', '3600'))
+CATALOG_CACHE_MAX_AGE = int(os.getenv('CATALOG_CACHE_MAX_AGE', '60'))
+
+# Flash sales (apps/catalog/flash_sales.py): listing cache bucket, so ended/started sales show up on time
+FLASH_SALE_LISTING_BUCKET_SECONDS = int(os.getenv('FLASH_SALE_LISTING_BUCKET_SECONDS', '30'))
+
+# Cart pricing (apps/catalog/pricing.py): compiled per-warehouse tables kept per process (LRU)
+PRICING_MAX_TABLES = int(os.getenv('PRICING_MAX_TABLES', '64'))
+
+# Product search (apps/catalog/search.py)
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', 'simple')
+SEARCH_TRIGRAM_THRESHOLD = float(os.getenv('SEARCH_TRIGRAM_THRESHOLD', '0.4'))
+
+# Typeahead (apps/catalog/suggest.py)
+SUGGEST_REFRESH_SECONDS = int(os.getenv('SUGGEST_REFRESH_SECONDS', '30'))
+SUGGEST_POPULARITY_DAYS = int(os.getenv('SUGGEST_POPULARITY_DAYS', '30'))
+
+# Order timeline storage: 'compact' | 'dual' (also legacy rows, for rollback) | 'legacy'
+ORDER_TIMELINE_STORAGE = os.getenv('ORDER_TIMELINE_STORAGE', 'compact')
+
+# Order id node (0-4095). Unset: each worker process leases one from Redis
+ORDER_ID_NODE = os.getenv('ORDER_ID_NODE')
+# Unpinned workers lease a node id in Redis for this long, renewed while in use
+ORDER_ID_NODE_LEASE_SECONDS = int(os.getenv('ORDER_ID_NODE_LEASE_SECONDS', 60))
+
+# Rider liveness (apps/riders/liveness.py): no heartbeat within TTL => offline
+RIDER_HEARTBEAT_TTL_SECONDS = int(os.getenv('RIDER_HEARTBEAT_TTL_SECONDS', '90'))
+
 # =========================================================
 # DRF & AUTH
 # =========================================================
@@ -247,10 +343,59 @@ TWILIO_FROM_NUMBER = os.getenv('TWILIO_FROM_NUMBER')
 RAZORPAY_KEY_ID = os.getenv('RAZORPAY_KEY_ID')
 RAZORPAY_KEY_SECRET = os.getenv('RAZORPAY_KEY_SECRET')
 RAZORPAY_WEBHOOK_SECRET = os.getenv('RAZORPAY_WEBHOOK_SECRET')
+# Pooled client (apps/payments/gateway.py)
+RAZORPAY_CONNECT_TIMEOUT = float(os.getenv('RAZORPAY_CONNECT_TIMEOUT', '3'))
+RAZORPAY_READ_TIMEOUT = float(os.getenv('RAZORPAY_READ_TIMEOUT', '10'))
+RAZORPAY_POOL_SIZE = int(os.getenv('RAZORPAY_POOL_SIZE', '20'))
+RAZORPAY_CB_FAILURE_THRESHOLD = int(os.getenv('RAZORPAY_CB_FAILURE_THRESHOLD', '5'))
+RAZORPAY_CB_RECOVERY_SECONDS = int(os.getenv('RAZORPAY_CB_RECOVERY_SECONDS', '30'))
+# Checkout returns the order immediately; the gateway order is created by a worker
+CHECKOUT_ASYNC_GATEWAY = os.getenv('CHECKOUT_ASYNC_GATEWAY', 'False') == 'True'
+# 'queue': store + 200 immediately, workers process in batches. 'inline': process in the request
+PAYMENT_WEBHOOK_MODE = os.getenv('PAYMENT_WEBHOOK_MODE', 'queue')
+PAYMENT_WEBHOOK_BATCH_SIZE = int(os.getenv('PAYMENT_WEBHOOK_BATCH_SIZE', '200'))
+PAYMENT_WEBHOOK_MAX_ATTEMPTS = int(os.getenv('PAYMENT_WEBHOOK_MAX_ATTEMPTS', '5'))
+# Failed webhook groups wait base * 2^(attempt-1) seconds, capped
+PAYMENT_WEBHOOK_RETRY_BASE_SECONDS = int(os.getenv('PAYMENT_WEBHOOK_RETRY_BASE_SECONDS', '10'))
+PAYMENT_WEBHOOK_RETRY_MAX_SECONDS = int(os.getenv('PAYMENT_WEBHOOK_RETRY_MAX_SECONDS', '1800'))
+# Overlapping windows: every run re-checks the last 2h, beat runs every 10 min
+PAYMENT_RECONCILE_WINDOW_MINUTES = int(os.getenv('PAYMENT_RECONCILE_WINDOW_MINUTES', '120'))
+# Refund worker: token bucket per gateway account (shared by all workers)
+REFUND_RATE_PER_SECOND = float(os.getenv('REFUND_RATE_PER_SECOND', '5'))
+REFUND_BURST = int(os.getenv('REFUND_BURST', '10'))
+REFUND_BATCH_SIZE = int(os.getenv('REFUND_BATCH_SIZE', '50'))
+REFUND_MAX_ATTEMPTS = int(os.getenv('REFUND_MAX_ATTEMPTS', '8'))
+# Failed submits wait base * 2^(attempt-1) seconds, capped
+REFUND_RETRY_BASE_SECONDS = int(os.getenv('REFUND_RETRY_BASE_SECONDS', '30'))
+REFUND_RETRY_MAX_SECONDS = int(os.getenv('REFUND_RETRY_MAX_SECONDS', '3600'))
+# Post-checkout status polling (apps/payments/status.py)
+PAYMENT_STATUS_LONGPOLL_SECONDS = int(os.getenv('PAYMENT_STATUS_LONGPOLL_SECONDS', '20'))
+PAYMENT_STATUS_SSE_SECONDS = int(os.getenv('PAYMENT_STATUS_SSE_SECONDS', '120'))
 
 # Google Maps (For Frontend)
 GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY', '')
 
+# =========================================================
+# DELIVERY / ETA ENGINE
+# =========================================================
+# Directory of per-city travel-time matrices (<city>.npz, built offline from OSM)
+ETA_MATRIX_DIR = os.getenv('ETA_MATRIX_DIR', str(BASE_DIR / 'data' / 'eta'))
+ETA_FALLBACK_SPEED_KMPH = float(os.getenv('ETA_FALLBACK_SPEED_KMPH', '18'))
+ETA_DETOUR_FACTOR = float(os.getenv('ETA_DETOUR_FACTOR', '1.35'))
+ETA_HANDLING_MINUTES = int(os.getenv('ETA_HANDLING_MINUTES', '6'))
+ETA_LRU_SIZE = int(os.getenv('ETA_LRU_SIZE', '50000'))
+
+# Multi-drop batching
+DELIVERY_BATCHING_ENABLED = os.getenv('DELIVERY_BATCHING_ENABLED', 'True') == 'True'
+DELIVERY_BATCH_WINDOW_SECONDS = int(os.getenv('DELIVERY_BATCH_WINDOW_SECONDS', '120'))
+DELIVERY_MAX_STOPS_PER_TRIP = int(os.getenv('DELIVERY_MAX_STOPS_PER_TRIP', '3'))
+DELIVERY_STOP_SERVICE_SECONDS = int(os.getenv('DELIVERY_STOP_SERVICE_SECONDS', '180'))
+DELIVERY_PROMISE_BUFFER_MINUTES = int(os.getenv('DELIVERY_PROMISE_BUFFER_MINUTES', '5'))
+
+# Rider payouts (per completed drop)
+RIDER_PAYOUT_BASE = os.getenv('RIDER_PAYOUT_BASE', '25.00')
+RIDER_PAYOUT_PER_KM = os.getenv('RIDER_PAYOUT_PER_KM', '5.00')
+
 # =========================================================
 # STATIC & MEDIA
 # =========================================================
@@ -261,6 +406,12 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Image variants (apps/catalog/images.py). Served from /media/variants/ with immutable cache headers (nginx);
+# point IMAGE_CDN_BASE_URL at a CDN in front of it in production.
+IMAGE_VARIANT_WIDTHS = [int(w) for w in os.getenv('IMAGE_VARIANT_WIDTHS', '160,320,640').split(',')]
+IMAGE_CDN_BASE_URL = os.getenv('IMAGE_CDN_BASE_URL', MEDIA_URL)
+IMAGE_MAX_SOURCE_BYTES = int(os.getenv('IMAGE_MAX_SOURCE_BYTES', str(10 * 1024 * 1024)))
+
 # =========================================================
 # I18N
 # =========================================================